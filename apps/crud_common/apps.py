@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+class CrudCommonConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.crud_common"
+
+    def ready(self):
+        from .search import create_index_tables
+        from .timing import install_execute_wrapper
+
+        # The search index tables aren't models, so migrate doesn't create them (see search.py)
+        post_migrate.connect(create_index_tables, sender=self, dispatch_uid="crud_common_search_tables")
+        # Time the queries of the requests ServerTimingMiddleware samples (see timing.py)
+        connection_created.connect(install_execute_wrapper, dispatch_uid="crud_common_timing_execute_wrapper")
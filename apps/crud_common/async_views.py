@@ -0,0 +1,282 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import EmptyPage, PageNotAnInteger
+from django.http import Http404, JsonResponse
+from django.views.generic import View
+from django.views.generic.base import TemplateResponseMixin
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+from apps.teams.decorators import login_and_team_required
+
+from .columns import only_columns
+from .counts import CountingPaginator
+from .fragment_cache import fragment_cache_timeout
+from .pagination import CURSOR_PARAM, KeysetPaginator, api_max_page_size, api_page_size
+from .utils import is_team_model
+
+# Support for async views.
+# Under ASGI, a sync view holds a thread for as long as it runs, including all the time it spends waiting for the
+# database. The async views await their queries instead (with the async ORM: aget(), async for, ...), so a slow
+# database doesn't use up the thread pool.
+# - Access checks are the very same ones the sync views use: the sync decorator is run (in a thread, since it may
+#   need the database to load the user and the team) around a stand-in view, and if the stand-in is reached the
+#   check has passed. Otherwise its response (a redirect, a 404, ...) is returned.
+# - Templates are rendered with TemplateResponse, which Django's async handler renders in a thread: context
+#   processors and templates may touch the database, which async code can't do directly.
+# - DRF views can't be async, so the async API view is a plain Django view. It runs its viewset's authentication,
+#   permission and throttle classes (in a thread, like the access checks), so API clients get the same 401, 403 and
+#   429 responses as from the viewset, not a redirect to the login page.
+
+# What the stand-in view returns, when the access checks let the request through
+PASSED = object()
+
+
+def _passed(request, *args, **kwargs):
+    return PASSED
+
+
+def async_access_check(sync_decorator):
+    """Make a decorator for async views out of a sync one, like login_required, that only checks access."""
+    check = sync_to_async(sync_decorator(_passed))
+
+    def decorator(view_func):
+        @wraps(view_func)
+        async def _inner(request, *args, **kwargs):
+            response = await check(request, *args, **kwargs)
+            if response is not PASSED:
+                return response
+            return await view_func(request, *args, **kwargs)
+
+        return _inner
+
+    return decorator
+
+
+async_login_required = async_access_check(login_required)
+async_login_and_team_required = async_access_check(login_and_team_required)
+
+
+class AsyncAccessMixin:
+    """Mixin for async CBVs: run async_check (a decorator made by async_access_check()) before the view."""
+
+    async_check = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        return await self.async_check(super().dispatch)(request, *args, **kwargs)
+
+
+class AsyncLoginRequiredMixin(AsyncAccessMixin):
+    """Like LoginRequiredMixin, for async CBVs."""
+
+    async_check = staticmethod(async_login_required)
+
+
+class AsyncLoginAndTeamRequiredMixin(AsyncAccessMixin):
+    """Like LoginAndTeamRequiredMixin, for async CBVs."""
+
+    async_check = staticmethod(async_login_and_team_required)
+
+
+async def apage(paginator, number):
+    """paginator.page(number) for async views, with the same fallbacks as the FBVs, and the page's objects
+    fetched with the async ORM."""
+    # A CountingPaginator may get its count from the counter table or the database's estimate, so work it out in a
+    # thread, the way the async ORM runs its own queries
+    await sync_to_async(getattr)(paginator, "count")
+    try:
+        page = paginator.page(number)
+    except PageNotAnInteger:
+        page = paginator.page(1)
+    except EmptyPage:
+        page = paginator.page(paginator.num_pages)
+    page.object_list = [obj async for obj in page.object_list]
+    return page
+
+
+def _default_template_name(model, suffix):
+    return f"{model._meta.app_label}/{model._meta.model_name}{suffix}.html"
+
+
+class AsyncListView(TemplateResponseMixin, View):
+    """Async counterpart of our list CBVs (ListView with ListPaginationMixin and ListColumnsMixin).
+    Provides the same context to the template, with page_obj and object_list. Add search.AsyncSearchMixin for
+    SearchMixin's ?q=."""
+
+    model = None
+    paginate_by = None
+    keyset_pagination = False
+    estimate_count = False
+    list_columns = None
+    list_excerpts = ()
+
+    def get_queryset(self):
+        queryset = self.model._default_manager.all()
+        if self.list_columns is not None:
+            queryset = only_columns(queryset, self.list_columns, self.list_excerpts)
+        return queryset
+
+    async def aget_queryset(self):
+        """get_queryset(), for anything that needs to query the database to make the queryset."""
+        return self.get_queryset()
+
+    async def get_page(self, queryset):
+        # Search results are in rank order, so like ListPaginationMixin, they get numbered pages, counted exactly
+        searching = bool(getattr(self, "search_query", ""))
+        if self.keyset_pagination and not searching:
+            return await KeysetPaginator(queryset, self.paginate_by).apage(self.request.GET.get(CURSOR_PARAM))
+        team = self.request.team if is_team_model(self.model) else None
+        paginator = CountingPaginator(
+            queryset, self.paginate_by, team=team, estimate=self.estimate_count and not searching, counted=not searching
+        )
+        return await apage(paginator, self.request.GET.get("page", 1))
+
+    def get_template_names(self):
+        if self.template_name is None:
+            return [_default_template_name(self.model, "_list")]
+        return [self.template_name]
+
+    def get_context_data(self, **kwargs):
+        kwargs.setdefault("view", self)
+        return kwargs
+
+    async def get(self, request, *args, **kwargs):
+        page = await self.get_page(await self.aget_queryset())
+        context = self.get_context_data(
+            paginator=page.paginator,
+            page_obj=page,
+            is_paginated=page.has_other_pages(),
+            object_list=page.object_list,
+            elided_page_range=list(page.paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1)),
+        )
+        # Used by the {% cache %} tag around each row of the htmx partials
+        context["fragment_cache_timeout"] = fragment_cache_timeout()
+        return self.render_to_response(context)
+
+
+class AsyncDetailView(TemplateResponseMixin, View):
+    """Async counterpart of DetailView, for the pk URLs."""
+
+    model = None
+
+    def get_queryset(self):
+        return self.model._default_manager.all()
+
+    async def get_object(self):
+        try:
+            return await self.get_queryset().aget(pk=self.kwargs["pk"])
+        except self.model.DoesNotExist:
+            raise Http404(f"No {self.model._meta.verbose_name} found matching the query")
+
+    def get_template_names(self):
+        if self.template_name is None:
+            return [_default_template_name(self.model, "_detail")]
+        return [self.template_name]
+
+    def get_context_data(self, **kwargs):
+        kwargs.setdefault("view", self)
+        return kwargs
+
+    async def get(self, request, *args, **kwargs):
+        self.object = await self.get_object()
+        context = self.get_context_data(object=self.object, **{self.model._meta.model_name: self.object})
+        return self.render_to_response(context)
+
+
+class AsyncModelAPIView(View):
+    """Read-only async counterpart of the list() and retrieve() of viewset_class, a ModelViewSet: with its
+    serializer, and its authentication, permission and throttle classes.
+    Lists are paged by (name, id) with next/previous cursors, like NameCursorPagination (the cursors themselves
+    aren't interchangeable). Route the list URL without a pk, and the detail URL with one, on paths of their own: only
+    GET is supported, and none of the viewset's extras (bulk/, lookup/, ?since=, ?ids=, ?q=, ?fields=, ?omit=, the
+    browsable API, ETags)."""
+
+    model = None
+    viewset_class = None
+    # The viewset action being run, for permission classes that look at it
+    action = None
+
+    @property
+    def serializer_class(self):
+        return self.viewset_class.serializer_class
+
+    def get_queryset(self):
+        return self.model._default_manager.all()
+
+    def get_page_size(self):
+        try:
+            page_size = int(self.request.GET["page_size"])
+        except (KeyError, ValueError):
+            return api_page_size()
+        return min(page_size, api_max_page_size()) if page_size > 0 else api_page_size()
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.action = "list" if kwargs.get("pk") is None else "retrieve"
+        try:
+            await sync_to_async(self.check_access)(request)
+        except exceptions.APIException as exc:
+            return self._error_response(request, exc)
+        return await super().dispatch(request, *args, **kwargs)
+
+    def check_access(self, request):
+        """Authenticate the request and check its permissions and throttles, like APIView.initial(), and load the
+        team for team models. Raises an APIException if it may not go on."""
+        viewset = self.viewset_class
+        drf_request = Request(request, authenticators=[auth() for auth in viewset.authentication_classes])
+        # Authenticates, and sets request.user to the user found
+        drf_request.user
+        for permission in [permission() for permission in viewset.permission_classes]:
+            if not permission.has_permission(drf_request, self):
+                if drf_request.authenticators and not drf_request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, "message", None))
+        waits = []
+        for throttle in [throttle() for throttle in viewset.throttle_classes]:
+            if not throttle.allow_request(drf_request, self):
+                waits.append(throttle.wait())
+        if waits:
+            raise exceptions.Throttled(max((wait for wait in waits if wait is not None), default=None))
+        if is_team_model(self.model):
+            # request.team is loaded lazily, from the database, so load it here rather than in get_queryset()
+            getattr(request.team, "pk", None)
+
+    def _error_response(self, request, exc):
+        """The JSON response the viewset would give for exc."""
+        headers = {}
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            # Like APIView.handle_exception(): a 401 needs a WWW-Authenticate header, else it's a 403
+            authenticators = self.viewset_class.authentication_classes
+            header = authenticators[0]().authenticate_header(request) if authenticators else None
+            if header:
+                headers["WWW-Authenticate"] = header
+            else:
+                exc.status_code = 403
+        if getattr(exc, "wait", None):
+            headers["Retry-After"] = str(int(exc.wait))
+        return JsonResponse({"detail": exc.detail}, status=exc.status_code, headers=headers)
+
+    async def get(self, request, *args, pk=None, **kwargs):
+        if pk is not None:
+            try:
+                obj = await self.get_queryset().aget(pk=pk)
+            except self.model.DoesNotExist:
+                return JsonResponse({"detail": "Not found."}, status=404)
+            return JsonResponse(self.serializer_class(obj).data)
+
+        page = await KeysetPaginator(self.get_queryset(), self.get_page_size()).apage(request.GET.get(CURSOR_PARAM))
+        return JsonResponse(
+            {
+                "next": self._cursor_url(page.next_cursor),
+                "previous": self._cursor_url(page.previous_cursor),
+                "results": self.serializer_class(page.object_list, many=True).data,
+            }
+        )
+
+    def _cursor_url(self, cursor):
+        if cursor is None:
+            return None
+        query = self.request.GET.copy()
+        query[CURSOR_PARAM] = cursor
+        return self.request.build_absolute_uri(f"{self.request.path}?{query.urlencode()}")
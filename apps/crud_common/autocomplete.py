@@ -0,0 +1,220 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict, defaultdict
+from functools import partial
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse
+from django.template.response import TemplateResponse
+
+from . import replicas
+from .fragment_cache import get_fragment_cache, get_version
+from .object_urls import object_url
+from .utils import team_id_of
+
+# Name autocomplete for the type-ahead boxes.
+# Each process keeps, per model and team, the names of the team's objects in a sorted list (PrefixIndex), so a
+# lookup is a binary search and a slice of at most CRUD_AUTOCOMPLETE_LIMIT entries, with no query at all.
+# The crud_common save/delete handlers (see signals.py) keep the lists up to date: when a write commits, its names are
+# inserted into (or removed from) the writing process's list, in place. Each list is tagged with a count of the
+# team's writes, kept in the fragment cache (see fragment_cache.py) and incremented atomically by every write, in any
+# process. A write that moves the count on by exactly one from a list's tag is the only one since the list was
+# loaded, so the list stays good once the write is applied. Otherwise another process wrote too, and the next lookup
+# loads the names again (only pk and name, in one query). Lists are kept for the CRUD_AUTOCOMPLETE_INDEXES most
+# recently used teams.
+# A team with more than CRUD_AUTOCOMPLETE_MAX_NAMES objects isn't kept in memory: its lookups query the database,
+# with istartswith and a LIMIT.
+
+DEFAULT_AUTOCOMPLETE_LIMIT = 10
+DEFAULT_AUTOCOMPLETE_INDEXES = 100
+DEFAULT_AUTOCOMPLETE_MAX_NAMES = 50_000
+
+AUTOCOMPLETE_PARAM = "q"
+
+# (model label, team_id) -> (write count, PrefixIndex or None), least recently used first
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+# model -> True, for the models registered with track_model(..., autocomplete_names=True)
+_autocomplete_models = {}
+
+
+def autocomplete_limit():
+    return getattr(settings, "CRUD_AUTOCOMPLETE_LIMIT", DEFAULT_AUTOCOMPLETE_LIMIT)
+
+
+def max_names():
+    return getattr(settings, "CRUD_AUTOCOMPLETE_MAX_NAMES", DEFAULT_AUTOCOMPLETE_MAX_NAMES)
+
+
+def register(model):
+    _autocomplete_models[model] = True
+
+
+class PrefixIndex:
+    """The names of one team's objects, sorted case-insensitively, for prefix lookups."""
+
+    def __init__(self, rows):
+        self.entries = sorted((name.casefold(), name, pk) for pk, name in rows)
+        self.names = {pk: name for pk, name in rows}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, prefix, limit):
+        """The (pk, name) of the first limit objects whose name starts with prefix, in name order."""
+        prefix = prefix.casefold()
+        matches = []
+        for key, name, pk in islice(self.entries, bisect_left(self.entries, (prefix,)), None):
+            if len(matches) == limit or not key.startswith(prefix):
+                break
+            matches.append((pk, name))
+        return matches
+
+    def set(self, pk, name):
+        """Add an object, or change its name."""
+        self.remove(pk)
+        insort(self.entries, (name.casefold(), name, pk))
+        self.names[pk] = name
+
+    def remove(self, pk):
+        name = self.names.pop(pk, None)
+        if name is not None:
+            del self.entries[bisect_left(self.entries, (name.casefold(), name, pk))]
+
+
+def _write_count_key(model, team_id):
+    return f"crud:autocomplete:writes:{model._meta.label_lower}:{team_id}"
+
+
+def _get_write_count(model, team_id):
+    cache = get_fragment_cache()
+    key = _write_count_key(model, team_id)
+    count = cache.get(key)
+    if count is None:
+        # Like a version stamp (see fragment_cache.get_version()), an evicted count starts again from a value no list
+        # was tagged with
+        count = time.time_ns()
+        if not cache.add(key, count, timeout=None):
+            count = cache.get(key, count)
+    return count
+
+
+def _count_write(model, team_id):
+    """Count one more write of the team's objects. Returns the new count."""
+    cache = get_fragment_cache()
+    key = _write_count_key(model, team_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Never read, or evicted
+        cache.add(key, time.time_ns(), timeout=None)
+        return cache.incr(key)
+
+
+def _load_index(queryset):
+    rows = list(queryset.values_list("pk", "name")[: max_names() + 1])
+    return PrefixIndex(rows) if len(rows) <= max_names() else None
+
+
+def get_index(queryset, team_id=0):
+    """The up-to-date PrefixIndex of the queryset's objects (one team's objects), or None if there are too many."""
+    model = queryset.model
+    key = (model._meta.label, team_id)
+    count = _get_write_count(model, team_id)
+    with _lock:
+        cached = _indexes.get(key)
+        if cached is not None and cached[0] == count:
+            _indexes.move_to_end(key)
+            return cached[1]
+    # Loaded outside the lock, so a slow load doesn't hold up lookups for other teams, and from data at least as
+    # recent as the team's version stamp
+    replicas.read_from_primary_if_recent(get_version(model, team_id))
+    index = _load_index(queryset)
+    with _lock:
+        _indexes[key] = (count, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > getattr(settings, "CRUD_AUTOCOMPLETE_INDEXES", DEFAULT_AUTOCOMPLETE_INDEXES):
+            _indexes.popitem(last=False)
+    return index
+
+
+def clear_indexes():
+    with _lock:
+        _indexes.clear()
+
+
+def _apply(model, team_id, changes):
+    """Count a committed write, and apply its changes, a list of (pk, name, or None if deleted), to this process's
+    list of the team's names, if nothing else was written since it was loaded."""
+    count = _count_write(model, team_id)
+    key = (model._meta.label, team_id)
+    with _lock:
+        cached = _indexes.get(key)
+        if cached is None or cached[0] != count - 1:
+            return
+        index = cached[1]
+        if index is not None:
+            for pk, name in changes:
+                if name is None:
+                    index.remove(pk)
+                else:
+                    index.set(pk, name)
+            if len(index) > max_names():
+                index = None
+        _indexes[key] = (count, index)
+
+
+def _apply_on_commit(model, objs, deleted=False):
+    if model not in _autocomplete_models:
+        return
+    changes = defaultdict(list)
+    for obj in objs:
+        # A deferred name isn't written by the save
+        if deleted or "name" in obj.__dict__:
+            changes[team_id_of(obj)].append((obj.pk, None if deleted else obj.name))
+    for team_id, team_changes in changes.items():
+        # The names as they are now, applied once they are in the database
+        transaction.on_commit(partial(_apply, model, team_id, team_changes))
+
+
+def object_saved(model, instance, update_fields=None):
+    if update_fields is None or "name" in update_fields:
+        _apply_on_commit(model, [instance])
+
+
+def objects_saved(model, objs):
+    """For bulk creates and updates."""
+    _apply_on_commit(model, objs)
+
+
+def objects_deleted(model, objs):
+    _apply_on_commit(model, objs, deleted=True)
+
+
+def complete(queryset, prefix, team_id=0, limit=None):
+    """The (pk, name) of the objects whose name starts with prefix, in name order, at most limit of them."""
+    limit = limit or autocomplete_limit()
+    if not prefix:
+        return []
+    index = get_index(queryset, team_id)
+    if index is not None:
+        # Under the lock, as writes change the index in place
+        with _lock:
+            return index.lookup(prefix, limit)
+    return list(queryset.filter(name__istartswith=prefix).order_by("name", "pk").values_list("pk", "name")[:limit])
+
+
+def autocomplete_response(request, queryset, detail_route, team=None):
+    """The names starting with ?q=, as the htmx partial for the type-ahead box, or as JSON for other requests.
+    queryset holds the objects to complete from (for team models, filtered to the team)."""
+    prefix = request.GET.get(AUTOCOMPLETE_PARAM, "").strip()
+    matches = complete(queryset, prefix, team.pk if team else 0)
+    kwargs = {"team_slug": team.slug} if team else {}
+    results = [{"id": pk, "name": name, "url": object_url(request, detail_route, pk, **kwargs)} for pk, name in matches]
+    if not request.htmx:
+        return JsonResponse({"results": results})
+    return TemplateResponse(request, "web/components/autocomplete_results.html", {"results": results})
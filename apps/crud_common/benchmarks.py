@@ -0,0 +1,86 @@
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .view_registry import ViewClient
+
+# Benchmarks of every implementation of every view of the installed example apps (see view_registry.py).
+# The benchmark_views command routes them all with a ViewURLConf, and runs them in a test database, at each data
+# size, through the test client as a logged-in team member, and reports:
+# - latency percentiles (p50, p95, p99) and the mean, in milliseconds, over a number of timed requests
+# - the number of queries of one request
+# - the peak memory allocated by one request (from tracemalloc), in KB
+# Queries and memory are measured on a separate request, so the timed requests aren't slowed down by either.
+
+
+class BenchmarkRun(ViewClient):
+    """Runs the benchmarks against the current database, as a new user who is a member of a new team."""
+
+    def __init__(self, requests=50, warmup=5, memory=True):
+        super().__init__()
+        self.requests = requests
+        self.warmup = warmup
+        self.memory = memory
+
+    def run(self, benchmark):
+        """Returns the results of one benchmark, as a dict."""
+        for _ in range(self.warmup):
+            self.check(benchmark, self.request(benchmark)())
+        timings = []
+        for _ in range(self.requests):
+            request = self.request(benchmark)
+            start = time.perf_counter()
+            response = request()
+            timings.append((time.perf_counter() - start) * 1000)
+            self.check(benchmark, response)
+        request = self.request(benchmark)
+        if self.memory:
+            tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            request()
+        peak = tracemalloc.get_traced_memory()[1] if self.memory else None
+        if self.memory:
+            tracemalloc.stop()
+        percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+        return {
+            "p50": percentiles[49],
+            "p95": percentiles[94],
+            "p99": percentiles[98],
+            "mean": statistics.fmean(timings),
+            "queries": len(queries),
+            "peak_kb": round(peak / 1024, 1) if peak is not None else None,
+        }
+
+
+def result_key(benchmark_name, rows):
+    return f"{benchmark_name}@{rows}"
+
+
+def load_baseline(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, results):
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+
+def compare(result, baseline, tolerance):
+    """How result compares to its baseline: a list of what got worse (p50 slower by more than tolerance, as a
+    fraction, or more queries). Empty if nothing did, or if there is no baseline."""
+    if baseline is None:
+        return []
+    worse = []
+    if result["p50"] > baseline["p50"] * (1 + tolerance):
+        worse.append(f"p50 {baseline['p50']:.2f} -> {result['p50']:.2f} ms")
+    if result["queries"] > baseline["queries"]:
+        worse.append(f"queries {baseline['queries']} -> {result['queries']}")
+    return worse
@@ -0,0 +1,86 @@
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+# Query budgets: the most queries a view may run, however many objects there are.
+# A budget is declared on the view itself: with the @query_budget(n) decorator on an FBV, or as a query_budget
+# attribute on a CBV or a viewset. Views that stream their response (the exports) have none, since most of their
+# queries run while the response is streamed, after the view has returned and the middleware has finished.
+# Two things check them:
+# - QueryBudgetTestMixin (see testing.py) requests each view at growing data sizes, and fails if the number of
+#   queries grows with the number of rows (an N+1), or goes over the budget.
+# - QueryBudgetMiddleware, an opt-in debug middleware, counts the queries of every request, and logs a warning (or
+#   raises QueryBudgetExceeded, with CRUD_QUERY_BUDGET_RAISE = True) when a view goes over its budget.
+# The budgets in the example apps are the queries each view was measured to run, plus one to spare, in a project with
+# Pegasus's team middleware and a base template that runs no queries of its own. A project whose middleware, context
+# processors or base template run queries on every page sets CRUD_QUERY_BUDGET_EXTRA to how many, and they're added
+# to every budget.
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(queries):
+    """Decorator for FBVs: the view may run at most this many queries. The attribute it sets is copied by any
+    decorators applied after it (they use functools.wraps), so it can go anywhere in the list."""
+
+    def decorator(view_func):
+        view_func.query_budget = queries
+        return view_func
+
+    return decorator
+
+
+def query_budget_extra():
+    return getattr(settings, "CRUD_QUERY_BUDGET_EXTRA", 0)
+
+
+def get_query_budget(view_func):
+    """The query budget of a view, as routed in a URLconf: an FBV, CBV.as_view() or ViewSet.as_view(...), plus
+    CRUD_QUERY_BUDGET_EXTRA. None if it has none."""
+    for obj in (view_func, getattr(view_func, "view_class", None), getattr(view_func, "cls", None)):
+        budget = getattr(obj, "query_budget", None)
+        if budget is not None:
+            return budget + query_budget_extra()
+    return None
+
+
+class QueryCounter:
+    """A database execute_wrapper that counts the queries it sees."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMiddleware:
+    """Checks each request's queries against the view's budget. Put it near the top of MIDDLEWARE, so the session
+    and user lookups done by the later middleware (which the budgets include) are counted too."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(counter))
+            response = self.get_response(request)
+        budget = getattr(request, "_query_budget", None)
+        if budget is not None and counter.count > budget:
+            message = f"{request.method} {request.path} ran {counter.count} queries, over its budget of {budget}"
+            if getattr(settings, "CRUD_QUERY_BUDGET_RAISE", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = get_query_budget(view_func)
@@ -0,0 +1,186 @@
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from . import signals
+from .utils import auto_now_fields, is_team_model
+
+# Bulk create/update/delete for the DRF viewsets, at <api-prefix>/bulk/, and batch lookups by id.
+# Sending thousands of objects one POST at a time costs a round trip, a serializer pass and an INSERT each. These take
+# a whole batch in one request, validate it in one go, and write it with bulk_create(), bulk_update() or a single
+# DELETE ... WHERE id IN (...). A batch is all-or-nothing: if any item is invalid nothing is written, and the response
+# lists the errors item by item, in the same order as the request (with {} for the items that were fine).
+# Batch lookups fetch many objects by id with a single in_bulk() query, instead of a GET per object.
+# Everything goes through the viewset's get_queryset(), so team scoping works the same as for single objects.
+
+IDS_PARAM = "ids"
+
+DEFAULT_BULK_MAX_ITEMS = 1000
+DEFAULT_BULK_BATCH_SIZE = 500
+
+
+def bulk_max_items():
+    return getattr(settings, "CRUD_BULK_MAX_ITEMS", DEFAULT_BULK_MAX_ITEMS)
+
+
+def bulk_batch_size():
+    return getattr(settings, "CRUD_BULK_BATCH_SIZE", DEFAULT_BULK_BATCH_SIZE)
+
+
+def delete_rows(model, pks, using):
+    """Delete the rows of model with these pks, with raw DELETE ... WHERE id IN (...) statements, a batch at a time.
+    QuerySet.delete() would load every object again and send a signal for each, since we have signal handlers.
+    Nothing cascades from the example models, so that isn't needed, and the caller does the bookkeeping for the
+    whole batch (with signals.objects_deleted()). Only for models that nothing refers to."""
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    batch_size = bulk_batch_size()
+    with connection.cursor() as cursor:
+        for start in range(0, len(pks), batch_size):
+            batch = pks[start : start + batch_size]
+            cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(batch))})", batch)
+
+
+class BulkViewSetMixin:
+    """Adds a bulk/ action to a ModelViewSet:
+    - POST a list of objects to create them all
+    - PATCH a list of partial objects, each with its "id", to update them all
+    - DELETE with {"ids": [...]} to delete them all
+    And batch lookups, which fetch many objects by id in one query:
+    - GET the list with ?ids=1,2,3
+    - POST {"ids": [...]} to lookup/, for more ids than fit in a URL
+    Both answer with the objects found, in the order asked for, and the ids that weren't found:
+    {"results": [...], "missing": [...]}"""
+
+    def list(self, request, *args, **kwargs):
+        if IDS_PARAM not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        try:
+            ids = [int(item_id) for item_id in request.query_params[IDS_PARAM].split(",") if item_id.strip()]
+        except ValueError:
+            return Response({"detail": "Expected a list of integer ids."}, status=status.HTTP_400_BAD_REQUEST)
+        return self.lookup_ids(ids)
+
+    @action(detail=False, methods=["post"], url_path="lookup")
+    def lookup(self, request, *args, **kwargs):
+        data = request.data if isinstance(request.data, dict) else {}
+        return self.lookup_ids(data.get("ids"))
+
+    def lookup_ids(self, ids):
+        ids, error = self._get_ids(ids)
+        if error:
+            return error
+        # One query for the whole batch, limited to the objects this viewset may see
+        found = self.get_queryset().in_bulk(ids)
+        objs = [found[item_id] for item_id in ids if item_id in found]
+        missing = [item_id for item_id in ids if item_id not in found]
+        return Response({"results": self.get_serializer(objs, many=True).data, "missing": missing})
+
+    @action(detail=False, methods=["post", "patch", "delete"], url_path="bulk")
+    def bulk(self, request, *args, **kwargs):
+        if request.method == "POST":
+            return self.bulk_create(request)
+        if request.method == "PATCH":
+            return self.bulk_update(request)
+        return self.bulk_destroy(request)
+
+    def bulk_create(self, request):
+        items, error = self._get_items(request.data)
+        if error:
+            return error
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            return Response({"errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.queryset.model
+        # New team objects belong to the requesting team, as with a single create
+        scope = {"team": request.team} if is_team_model(model) else {}
+        objs = [model(**attrs, **scope) for attrs in serializer.validated_data]
+        with transaction.atomic():
+            objs = signals.create_objects(model, objs, batch_size=bulk_batch_size())
+        return Response(self.get_serializer(objs, many=True).data, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request):
+        items, error = self._get_items(request.data)
+        if error:
+            return error
+        ids, error = self._get_ids([item.get("id") if isinstance(item, dict) else None for item in items])
+        if error:
+            return error
+        # One query for the whole batch, limited to the objects this viewset may see
+        instances = self.get_queryset().in_bulk(ids)
+
+        errors = []
+        fields = set()
+        objs = []
+        for item_id, item in zip(ids, items):
+            instance = instances.get(item_id)
+            if instance is None:
+                errors.append({"id": ["Not found."]})
+                continue
+            serializer = self.get_serializer(instance, data=item, partial=True)
+            if not serializer.is_valid():
+                errors.append(serializer.errors)
+                continue
+            errors.append({})
+            for name, value in serializer.validated_data.items():
+                setattr(instance, name, value)
+                fields.add(name)
+            objs.append(instance)
+        if any(errors):
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.queryset.model
+        if fields:
+            now = timezone.now()
+            stamped = auto_now_fields(model)
+            for obj in objs:
+                for name in stamped:
+                    setattr(obj, name, now)
+            with transaction.atomic():
+                model.objects.bulk_update(objs, [*fields, *stamped], batch_size=bulk_batch_size())
+                signals.objects_updated(model, objs)
+        return Response(self.get_serializer(objs, many=True).data)
+
+    def bulk_destroy(self, request):
+        data = request.data if isinstance(request.data, dict) else {}
+        ids, error = self._get_ids(data.get("ids"))
+        if error:
+            return error
+        model = self.queryset.model
+        db = router.db_for_write(model)
+        queryset = self.get_queryset().using(db).filter(pk__in=ids)
+        with transaction.atomic(using=db):
+            # Lock the rows, so what we report and account for is exactly what gets deleted
+            objs = list(queryset.select_for_update().only(*signals.deleted_object_fields(model)))
+            found = {obj.pk for obj in objs}
+            missing = [item_id for item_id in ids if item_id not in found]
+            if missing:
+                return Response({"missing": missing}, status=status.HTTP_404_NOT_FOUND)
+            delete_rows(model, list(found), db)
+            signals.objects_deleted(model, objs)
+        return Response({"deleted": len(objs)})
+
+    def _get_items(self, data):
+        """Check the payload is a list of a sensible size. Returns (items, error_response)."""
+        if not isinstance(data, list):
+            return None, Response({"detail": "Expected a list of items."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(data) > bulk_max_items():
+            return None, Response(
+                {"detail": f"Too many items, the maximum is {bulk_max_items()}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return data, None
+
+    def _get_ids(self, ids):
+        """Check ids is a list of distinct integers of a sensible size. Returns (ids, error_response)."""
+        # bool is a subclass of int, but true and false aren't ids
+        if not isinstance(ids, list) or not all(type(item_id) is int for item_id in ids):
+            return None, Response({"detail": "Expected a list of integer ids."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(set(ids)) != len(ids):
+            return None, Response({"detail": "Each id may only appear once."}, status=status.HTTP_400_BAD_REQUEST)
+        return self._get_items(ids)
@@ -0,0 +1,31 @@
+from django.db.models.functions import Left
+
+# List pages load only the columns they show.
+# Each list view declares its columns, and its queryset loads just those (and the pk) with .only(). Long text fields,
+# like the 4096-character notes, are shown as an excerpt: an <field>_excerpt annotation made with the database's
+# LEFT(), so only the first few characters are ever read. Anything else on the page that touches an object (the
+# {% cache %} key, keyset pagination, select_related) needs its column in the list too, or it costs a query per row.
+
+# The templates show excerpts with |truncatechars:80, so keep the two in step
+EXCERPT_LENGTH = 80
+
+
+def only_columns(queryset, columns, excerpts=()):
+    """Load only columns of queryset's objects, plus an <field>_excerpt for each field in excerpts.
+    An excerpt has one character more than EXCERPT_LENGTH, so truncatechars can tell when it has been cut short."""
+    return queryset.only(*columns).annotate(
+        **{f"{field}_excerpt": Left(field, EXCERPT_LENGTH + 1) for field in excerpts}
+    )
+
+
+class ListColumnsMixin:
+    """Mixin for the list CBVs: load only list_columns, and excerpts of list_excerpts (see only_columns())."""
+
+    list_columns = None
+    list_excerpts = ()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.list_columns is None:
+            return queryset
+        return only_columns(queryset, self.list_columns, self.list_excerpts)
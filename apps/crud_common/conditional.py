@@ -0,0 +1,161 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags
+from rest_framework.response import Response
+
+from . import replicas
+from .fragment_cache import get_version
+from .utils import is_team_model
+
+# Conditional GET.
+# The ETag and Last-Modified validators come from the version stamp of the model's objects for the current team
+# (see fragment_cache.py), which every create/update/delete bumps. They can be worked out without loading a single
+# row, so a client that already has the current version gets a 304 before the view touches the database.
+# The stamp is per team rather than per object, so a change to any of the team's objects makes the clients fetch
+# again, but it can never hand out a stale object.
+# The ETag also covers the full path (pk, page, query parameters) and, for HTML pages (including DRF's browsable
+# API), the user, since those change the response. On the API it also covers the format (JSON or HTML).
+# ETags are weak: the HTML pages aren't byte-for-byte identical from one request to the next.
+# On the API, a PUT, PATCH or DELETE whose If-Match doesn't match the current ETag gets a 412.
+
+
+def get_validators(request, model, vary=None, per_user=True):
+    """Return (etag, last_modified) for the request. last_modified is a timestamp, in seconds.
+    vary: optional callable(request) giving anything else that changes the response, e.g. the user's permissions."""
+    team_id = request.team.pk if is_team_model(model) else 0
+    version = get_version(model, team_id)
+    # The response tagged with this version must be made from data at least this recent
+    replicas.read_from_primary_if_recent(version)
+    user_id = request.user.pk if per_user else None
+    extra = vary(request) if vary else None
+    digest = hashlib.md5(repr((user_id, request.get_full_path(), extra)).encode(), usedforsecurity=False).hexdigest()
+    return f'W/"{version}-{digest}"', version // 1_000_000_000
+
+
+def if_match_passes(request, etag):
+    """Whether an unsafe request's If-Match header (if any) matches the current ETag.
+    Compares weakly, since all our ETags are weak (a strict RFC 9110 comparison would never match them)."""
+    header = request.headers.get("If-Match")
+    if not header:
+        return True
+    etags = parse_etags(header)
+    if etags == ["*"]:
+        return True
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in etags)
+
+
+def check_preconditions(request, etag, last_modified):
+    """A 304 (or 412) response if the request's conditional headers say so, else None."""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None and response.status_code == 304:
+        response.headers["ETag"] = etag
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code == 200:
+        response.headers.setdefault("ETag", etag)
+        response.headers.setdefault("Last-Modified", http_date(last_modified))
+        # Let clients keep the response, but have them check back with the validators every time
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_get(model, vary=None):
+    """Decorator for FBVs, sync or async. Goes below the login/team decorators, so those checks still run first."""
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+
+            @wraps(view_func)
+            async def _async_inner(request, *args, **kwargs):
+                # vary may need the database (e.g. for permissions), which async code can't use directly
+                etag, last_modified = await sync_to_async(get_validators)(request, model, vary)
+                response = check_preconditions(request, etag, last_modified)
+                if response is not None:
+                    return response
+                return set_validators(await view_func(request, *args, **kwargs), etag, last_modified)
+
+            return _async_inner
+
+        @wraps(view_func)
+        def _inner(request, *args, **kwargs):
+            etag, last_modified = get_validators(request, model, vary)
+            response = check_preconditions(request, etag, last_modified)
+            if response is not None:
+                return response
+            return set_validators(view_func(request, *args, **kwargs), etag, last_modified)
+
+        return _inner
+
+    return decorator
+
+
+class ConditionalGetMixin:
+    """Mixin for the detail CBVs, after the login/team mixin, so those checks still run first."""
+
+    def get_conditional_vary(self, request):
+        """Anything else, beyond the user and the path, that changes the response."""
+        return None
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = get_validators(request, self.model, self.get_conditional_vary)
+        response = check_preconditions(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(super().get(request, *args, **kwargs), etag, last_modified)
+
+
+class AsyncConditionalGetMixin:
+    """ConditionalGetMixin for the async detail CBVs."""
+
+    def get_conditional_vary(self, request):
+        """Anything else, beyond the user and the path, that changes the response."""
+        return None
+
+    async def get(self, request, *args, **kwargs):
+        etag, last_modified = await sync_to_async(get_validators)(request, self.model, self.get_conditional_vary)
+        response = check_preconditions(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(await super().get(request, *args, **kwargs), etag, last_modified)
+
+
+def _renderer_format(request):
+    return request.accepted_renderer.format
+
+
+class ConditionalViewSetMixin:
+    """Mixin for the DRF viewsets. list() and retrieve() answer with a 304 while the client's copy is current,
+    and update(), partial_update() and destroy() answer with a 412 if the client's If-Match is out of date.
+    The client should send the ETag it got from retrieve() (the same URL) in the If-Match header.
+    These run after DRF's authentication and permission checks."""
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        # The JSON doesn't depend on who asks, so a client can use an ETag that came from another user's request.
+        # The browsable API's HTML does (it shows the user's name, and forms), so it gets ETags of its own, per user
+        html = request.accepted_renderer.media_type.startswith("text/html")
+        etag, last_modified = get_validators(request, self.queryset.model, _renderer_format, per_user=html)
+        if request.method in ("GET", "HEAD"):
+            response = check_preconditions(request, etag, last_modified)
+            if response is not None:
+                return response
+            return set_validators(handler(request, *args, **kwargs), etag, last_modified)
+        if not if_match_passes(request, etag):
+            return Response({"detail": "The object has changed since you fetched it."}, status=412)
+        return handler(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return self._conditional(super().update, request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        return self._conditional(super().destroy, request, *args, **kwargs)
@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections, router
+from django.db.models import F
+from django.utils.functional import cached_property
+
+from .models import RowCount
+from .utils import is_team_model
+
+# Row counts for pagination.
+# Django's Paginator runs a COUNT(*) on every list request, just to know how many pages there are. That is cheap for
+# a few hundred rows but grows with the table. CountingPaginator instead reads the per-team count kept in RowCount
+# (one indexed lookup), or for big unfiltered tables the database's own row estimate.
+# Small tables, below CRUD_EXACT_COUNT_LIMIT rows, still get an exact COUNT(*), which also re-syncs the cached count
+# in case something (e.g. a bulk operation or a raw SQL delete) went around the signals.
+
+DEFAULT_EXACT_COUNT_LIMIT = 10_000
+
+
+def exact_count_limit():
+    return getattr(settings, "CRUD_EXACT_COUNT_LIMIT", DEFAULT_EXACT_COUNT_LIMIT)
+
+
+def get_cached_count(model, team_id=0):
+    """The cached row count for a model (and team), or None if we don't have one yet."""
+    return (
+        RowCount.objects.filter(model_label=model._meta.label, team_id=team_id)
+        .values_list("count", flat=True)
+        .first()
+    )
+
+
+def set_cached_count(model, team_id, count):
+    RowCount.objects.update_or_create(model_label=model._meta.label, team_id=team_id, defaults={"count": count})
+
+
+def adjust_cached_count(model, team_id, delta):
+    """Add delta to the cached count. If there is no cached count yet, the next exact count will create it."""
+    RowCount.objects.filter(model_label=model._meta.label, team_id=team_id).update(count=F("count") + delta)
+
+
+def estimated_count(model):
+    """The database's own estimate of the table's row count, or None if the database doesn't keep one.
+    This is only meaningful for an unfiltered queryset."""
+    connection = connections[router.db_for_read(model)]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == "mysql":
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+                [table],
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    # Postgres reports -1 for a table that has never been vacuumed or analyzed
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class CountingPaginator(Paginator):
+    """Paginator that gets its count from the RowCount cache, or from the database's estimate, once the table is
+    bigger than CRUD_EXACT_COUNT_LIMIT rows.
+    - team: the team the list is scoped to. Required for the cache to be used with team models.
+    - estimate: use the database's row estimate. Only for querysets that aren't filtered at all.
+    - counted: set to False if the queryset is filtered (beyond the team), so the cached count doesn't apply."""
+
+    def __init__(
+        self, object_list, per_page, orphans=0, allow_empty_first_page=True, team=None, estimate=False, counted=True
+    ):
+        super().__init__(object_list, per_page, orphans=orphans, allow_empty_first_page=allow_empty_first_page)
+        self.estimate = estimate
+        model = object_list.model
+        if not counted or (is_team_model(model) and team is None):
+            self.team_id = None
+        else:
+            self.team_id = team.pk if team is not None else 0
+
+    @cached_property
+    def count(self):
+        model = self.object_list.model
+        limit = exact_count_limit()
+        if self.estimate:
+            estimate = estimated_count(model)
+            if estimate is not None and estimate >= limit:
+                return estimate
+        if self.team_id is None:
+            return super().count
+        cached = get_cached_count(model, self.team_id)
+        if cached is not None and cached >= limit:
+            return cached
+        count = super().count
+        if cached != count:
+            set_cached_count(model, self.team_id, count)
+        return count
+
+
+class ChangeListPaginator(CountingPaginator):
+    """Paginator for admin changelists: estimates the count of an unfiltered changelist on a big table,
+    and counts exactly once the changelist is filtered or searched."""
+
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True):
+        unfiltered = not object_list.query.where
+        super().__init__(
+            object_list, per_page, orphans, allow_empty_first_page, estimate=unfiltered, counted=unfiltered
+        )
@@ -0,0 +1,60 @@
+from rest_framework.exceptions import ValidationError
+
+# Sparse fieldsets for the API.
+# ?fields=id,name returns only those fields, and ?omit=notes returns all but those (the two can be combined). The
+# serializer drops the other fields, and the viewset loads only the matching columns with .only(), so a client that
+# only wants ids never has the notes read from the database. Only reads are trimmed: writes validate every field.
+
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+
+
+def _param_fields(request, param, available):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = sorted(names.difference(available))
+    if unknown:
+        raise ValidationError({param: [f"Unknown field(s): {', '.join(unknown)}"]})
+    return names
+
+
+def requested_fields(request, available):
+    """The fields of available (a list of serializer field names) that the request asks for, in the same order.
+    Raises a ValidationError (a 400) for names that aren't available."""
+    fields = _param_fields(request, FIELDS_PARAM, available)
+    omit = _param_fields(request, OMIT_PARAM, available) or set()
+    return [name for name in available if (fields is None or name in fields) and name not in omit]
+
+
+def _is_read(request):
+    return request is not None and request.method in ("GET", "HEAD")
+
+
+class SparseFieldsetSerializerMixin:
+    """Mixin for a ModelSerializer: on reads, drop the fields that ?fields=/?omit= leave out."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if not _is_read(request):
+            return
+        keep = requested_fields(request, list(self.fields))
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewSetMixin:
+    """Mixin for a ModelViewSet whose serializer uses SparseFieldsetSerializerMixin: list() and retrieve() load only
+    the columns of the fields asked for, plus those the pagination orders by (it reads them to make its cursors)."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not _is_read(self.request) or self.action not in ("list", "retrieve"):
+            return queryset
+        fields = requested_fields(self.request, list(self.get_serializer_class().Meta.fields))
+        concrete = {field.name for field in queryset.model._meta.concrete_fields}
+        ordering = [name.lstrip("-") for name in getattr(self.pagination_class, "ordering", ())]
+        return queryset.only(*{name for name in [*fields, *ordering] if name in concrete})
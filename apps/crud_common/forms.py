@@ -0,0 +1,13 @@
+from django import forms
+
+from .imports import IMPORT_FORMATS, import_format
+
+
+class ImportFileForm(forms.Form):
+    file = forms.FileField(help_text="A CSV file with a header row, or an NDJSON file with one JSON object per line.")
+
+    def clean_file(self):
+        file = self.cleaned_data["file"]
+        if import_format(file.name) is None:
+            raise forms.ValidationError(f"The file name must end in one of: {', '.join(IMPORT_FORMATS)}")
+        return file
@@ -0,0 +1,100 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+from django.http import HttpResponse
+
+from . import replicas
+from .utils import is_team_model
+
+# Fragment caching for the htmx list partials, in two levels ("Russian-doll" caching):
+# - Each row of the partial is wrapped in {% cache %}, keyed by the object's pk and updated_at, so a row is only
+#   rendered again after that object changes.
+# - FragmentCacheMixin caches the whole rendered partial, keyed by team, page and the team's version stamp. Every
+#   create/update/delete bumps the stamp (see signals.py), so a repeat view of an unchanged page skips both the ORM
+#   and the template engine.
+# Like Django's {% cache %} tag, we use the "template_fragments" cache if there is one, else "default". A LocMemCache
+# there gives an in-process LRU cache with a TTL; with several server processes, use a shared cache (memcached or
+# Redis) so that a write in one process invalidates the pages cached by the others.
+
+DEFAULT_FRAGMENT_CACHE_TIMEOUT = 300
+
+
+def get_fragment_cache():
+    try:
+        return caches["template_fragments"]
+    except InvalidCacheBackendError:
+        return caches["default"]
+
+
+def fragment_cache_timeout():
+    return getattr(settings, "CRUD_FRAGMENT_CACHE_TIMEOUT", DEFAULT_FRAGMENT_CACHE_TIMEOUT)
+
+
+def _version_key(model, team_id):
+    return f"crud:version:{model._meta.label_lower}:{team_id}"
+
+
+def get_version(model, team_id=0):
+    """The current version stamp of a model's objects for one team (0 for non-team models).
+    Stamps are timestamps rather than counters, so a stamp that was evicted from the cache is replaced by a value
+    that can't match anything cached under an earlier stamp."""
+    cache = get_fragment_cache()
+    key = _version_key(model, team_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        # add() rather than set(), so that concurrent first readers all end up with the same stamp
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(model, team_id=0):
+    get_fragment_cache().set(_version_key(model, team_id), time.time_ns(), timeout=None)
+
+
+class FragmentCacheMixin:
+    """Mixin for the htmx list CBVs: serve the object-list partial from the cache when this team's objects haven't
+    changed since it was rendered. Full-page requests are rendered as usual."""
+
+    def is_fragment_request(self):
+        # The same test get_template_names() uses to pick the partial template
+        return self.request.htmx.target == "object-list"
+
+    def get_fragment_cache_vary(self):
+        """Anything else, beyond the team and the query string, that changes the rendered partial."""
+        return ()
+
+    def get_fragment_cache_key(self):
+        team_id = self.request.team.pk if is_team_model(self.model) else 0
+        query = sorted(self.request.GET.lists())
+        digest = hashlib.md5(repr((query, self.get_fragment_cache_vary())).encode(), usedforsecurity=False)
+        version = get_version(self.model, team_id)
+        # The page cached under this version must be rendered from data at least this recent
+        replicas.read_from_primary_if_recent(version)
+        return f"crud:page:{self.model._meta.label_lower}:{team_id}:{version}:{digest.hexdigest()}"
+
+    def get(self, request, *args, **kwargs):
+        if not self.is_fragment_request():
+            return super().get(request, *args, **kwargs)
+        cache = get_fragment_cache()
+        key = self.get_fragment_cache_key()
+        content = cache.get(key)
+        if content is not None:
+            return HttpResponse(content)
+        response = super().get(request, *args, **kwargs)
+
+        def store(rendered):
+            if rendered.status_code == 200:
+                cache.set(key, rendered.content, fragment_cache_timeout())
+
+        response.add_post_render_callback(store)
+        return response
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Used by the {% cache %} tag around each row of the partial
+        context["fragment_cache_timeout"] = fragment_cache_timeout()
+        return context
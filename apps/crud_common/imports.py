@@ -0,0 +1,158 @@
+import csv
+import json
+import logging
+import os
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+
+from . import signals
+from .utils import is_team_model
+
+# Bulk import of CSV or NDJSON files.
+# The upload is spooled to a temporary file and the request returns straight away, with a job id. A local thread pool
+# then reads the file a row at a time, validates each row with the model's usual form (so the rules are the same as
+# for the create view), and inserts the valid rows with bulk_create(), CRUD_IMPORT_BATCH_SIZE rows per transaction.
+# Invalid rows are skipped and reported, with their row number and form errors, in the job's status.
+# Job status lives in the default cache, so any server process can report on it, but the work itself runs in the
+# process that took the upload.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMPORT_BATCH_SIZE = 1000
+DEFAULT_IMPORT_WORKERS = 2
+# Stop collecting errors after this many, so a completely wrong file doesn't make a huge report
+MAX_REPORTED_ERRORS = 1000
+# How long the status of a job is kept, in seconds
+JOB_STATUS_TIMEOUT = 24 * 60 * 60
+
+IMPORT_FORMATS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
+
+_executor = None
+
+
+def import_batch_size():
+    return getattr(settings, "CRUD_IMPORT_BATCH_SIZE", DEFAULT_IMPORT_BATCH_SIZE)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, "CRUD_IMPORT_WORKERS", DEFAULT_IMPORT_WORKERS)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crud-import")
+    return _executor
+
+
+def import_format(filename):
+    """The import format for a file name, or None if we can't import it."""
+    return IMPORT_FORMATS.get(os.path.splitext(filename)[1].lower())
+
+
+def start_import(uploaded_file, form_class, user, team=None):
+    """Queue an import of uploaded_file, validating each row with form_class. Returns the job id."""
+    file_format = import_format(uploaded_file.name)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_format}") as spool:
+        for chunk in uploaded_file.chunks():
+            spool.write(chunk)
+    job_id = uuid.uuid4().hex
+    status = {
+        "state": "queued",
+        "user_id": user.pk,
+        "team_id": team.pk if team else None,
+        "filename": uploaded_file.name,
+        "rows": 0,
+        "created": 0,
+        "errors": [],
+        "error_count": 0,
+    }
+    _set_status(job_id, status)
+    _get_executor().submit(_run_import, job_id, spool.name, file_format, form_class, dict(status))
+    return job_id
+
+
+def get_import_status(job_id, user, team=None):
+    """The status of an import job, or None if there is no such job for this user (and team)."""
+    status = cache.get(_status_key(job_id))
+    if status is None or status["user_id"] != user.pk or status["team_id"] != (team.pk if team else None):
+        return None
+    return status
+
+
+def _status_key(job_id):
+    return f"crud:import:{job_id}"
+
+
+def _set_status(job_id, status):
+    cache.set(_status_key(job_id), status, JOB_STATUS_TIMEOUT)
+
+
+def _run_import(job_id, path, file_format, form_class, status):
+    """Run an import job. status is the job's status as start_import() set it: it's handed over rather than read back
+    from the cache, where it may have been evicted already, or (with a per-process cache) never be visible."""
+    model = form_class._meta.model
+    team_id = status["team_id"]
+    try:
+        status["state"] = "running"
+        _set_status(job_id, status)
+        with open(path, newline="", encoding="utf-8-sig") as file:
+            rows = enumerate(_read_rows(file, file_format), start=1)
+            while batch := list(islice(rows, import_batch_size())):
+                objs = []
+                for row_number, row in batch:
+                    form = form_class(data=row) if isinstance(row, dict) else None
+                    if form is not None and form.is_valid():
+                        obj = form.save(commit=False)
+                        if is_team_model(model):
+                            obj.team_id = team_id
+                        objs.append(obj)
+                    else:
+                        errors = form.errors.get_json_data() if form else {"__all__": [{"message": str(row)}]}
+                        _add_error(status, row_number, errors)
+                with transaction.atomic():
+                    signals.create_objects(model, objs)
+                status["rows"] += len(batch)
+                status["created"] += len(objs)
+                _set_status(job_id, status)
+        status["state"] = "done"
+    except Exception as e:
+        logger.exception("Import job %s failed", job_id)
+        status["state"] = "failed"
+        status["message"] = str(e)
+    finally:
+        try:
+            _set_status(job_id, status)
+        finally:
+            os.remove(path)
+            # This thread's connections won't be closed at the end of a request, so close them here
+            connections.close_all()
+
+
+def _add_error(status, row_number, errors):
+    status["error_count"] += 1
+    if len(status["errors"]) < MAX_REPORTED_ERRORS:
+        status["errors"].append({"row": row_number, "errors": errors})
+
+
+def _read_rows(file, file_format):
+    """Yield each row of the file as a dict of field values, or as an error message if it can't be read."""
+    if file_format == "csv":
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield f"Not valid JSON: {e}"
+            continue
+        yield row if isinstance(row, dict) else "Each line must be a JSON object"
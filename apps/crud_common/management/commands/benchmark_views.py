@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from ...benchmarks import BenchmarkRun, compare, load_baseline, result_key, save_baseline
+from ...view_registry import ViewError, ViewURLConf, registered_views
+
+DEFAULT_ROWS = "10,100,1000"
+DEFAULT_BASELINE = "benchmarks/views.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks every implementation of every view of the installed example apps, in a test database, at each "
+        "data size: latency percentiles, queries and peak memory, compared with a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", default=DEFAULT_ROWS, help="Comma-separated numbers of objects per model")
+        parser.add_argument("--requests", type=int, default=50, help="Timed requests per benchmark")
+        parser.add_argument("--warmup", type=int, default=5, help="Untimed requests before the timed ones")
+        parser.add_argument("--only", default="", help="Only run the benchmarks whose name contains this")
+        parser.add_argument("--seed", type=int, default=0, help="Seed for the made-up objects")
+        parser.add_argument("--no-memory", action="store_true", help="Don't measure memory with tracemalloc")
+        parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="JSON file of the baseline results")
+        parser.add_argument("--save-baseline", action="store_true", help="Save these results as the baseline")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.2, help="How much slower (as a fraction) p50 may be than the baseline"
+        )
+        parser.add_argument("--fail-on-regression", action="store_true", help="Exit with an error if anything is worse")
+        parser.add_argument("--keepdb", action="store_true", help="Keep the test database between runs")
+
+    def handle(self, *args, **options):
+        sizes = sorted({int(size) for size in options["rows"].split(",") if size.strip()})
+        benchmarks = [b for b in registered_views() if options["only"] in b.name]
+        baseline = load_baseline(options["baseline"])
+        results = {}
+        regressions = []
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            with override_settings(ROOT_URLCONF=ViewURLConf(settings.ROOT_URLCONF)):
+                run = BenchmarkRun(options["requests"], options["warmup"], memory=not options["no_memory"])
+                for rows in sizes:
+                    run.seed(rows, seed=options["seed"])
+                    self.stdout.write(f"\n{rows} rows per model")
+                    self.stdout.write(
+                        f"{'benchmark':<45} {'p50':>8} {'p95':>8} {'p99':>8} {'mean':>8} {'queries':>8} {'peak KB':>9}"
+                    )
+                    for benchmark in benchmarks:
+                        key = result_key(benchmark.name, rows)
+                        try:
+                            result = results[key] = run.run(benchmark)
+                        except ViewError as e:
+                            self.stdout.write(self.style.ERROR(str(e)))
+                            continue
+                        worse = compare(result, baseline.get(key), options["tolerance"])
+                        line = (
+                            f"{benchmark.name:<45} {result['p50']:>8.2f} {result['p95']:>8.2f} {result['p99']:>8.2f} "
+                            f"{result['mean']:>8.2f} {result['queries']:>8} {result['peak_kb'] or '-':>9}"
+                        )
+                        if worse:
+                            regressions.append(f"{key}: {', '.join(worse)}")
+                            line = self.style.WARNING(f"{line}  worse: {', '.join(worse)}")
+                        self.stdout.write(line)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        if options["save_baseline"]:
+            save_baseline(options["baseline"], results)
+            self.stdout.write(f"\nSaved the baseline to {options['baseline']}")
+        if regressions:
+            self.stdout.write(self.style.WARNING(f"\n{len(regressions)} worse than the baseline:"))
+            for regression in regressions:
+                self.stdout.write(f"  {regression}")
+            if options["fail_on_regression"]:
+                raise CommandError("Some benchmarks are worse than the baseline")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ... import sync
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the tombstones of deleted objects older than CRUD_SYNC_TOMBSTONE_DAYS. Delta-sync tokens older than "
+        "that are refused, so their clients sync again from the start."
+    )
+
+    def handle(self, *args, **options):
+        deleted = sync.prune_tombstones()
+        self.stdout.write(f"Deleted {deleted} tombstones")
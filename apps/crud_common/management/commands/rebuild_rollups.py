@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from ... import rollups
+
+BATCH_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = "Computes the stats rollups of each model that keeps them again, from all of its objects."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="How many objects to read at a time")
+
+    def handle(self, *args, **options):
+        for model in rollups.rolled_up_models():
+            read = rollups.rebuild(model, options["batch_size"])
+            self.stdout.write(f"{model._meta.label}: rolled up {read} objects")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+
+from ... import search
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Creates the search index tables if needed, and fills them again from the objects of each searchable model."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="How many objects to index at a time")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        for model in search.searchable_models():
+            using = router.db_for_write(model)
+            search.create_index_tables(using)
+            fields = search.search_field_names(model)
+            queryset = model._default_manager.using(using).order_by("pk").only(*fields)
+            indexed = 0
+            with transaction.atomic(using=using):
+                search.clear_index(model, using)
+                batch = []
+                for obj in queryset.iterator(chunk_size=batch_size):
+                    batch.append(obj)
+                    if len(batch) == batch_size:
+                        search.index_objects(model, batch)
+                        indexed += len(batch)
+                        batch = []
+                search.index_objects(model, batch)
+                indexed += len(batch)
+            self.stdout.write(f"{model._meta.label}: indexed {indexed} objects")
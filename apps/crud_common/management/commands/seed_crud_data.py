@@ -0,0 +1,146 @@
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from apps.teams.models import Team
+
+from ... import seeding
+from ...utils import is_team_model
+
+DEFAULT_MODELS = "crud_example1.Thing,crud_example2.TeamThing,crud_example3.PermThing,crud_example4.InputThing"
+DEFAULT_BATCH_SIZE = 5000
+# Batches per job: each job is seeded on its own, so the data doesn't depend on the number of workers
+BATCHES_PER_JOB = 10
+# Seconds between progress lines
+PROGRESS_INTERVAL = 2.0
+TEAM_SLUG_PREFIX = "seed-team-"
+
+
+def _parse_range(value):
+    """ "100" -> (100, 100), "10-1000" -> (10, 1000)"""
+    low, _, high = value.partition("-")
+    low, high = int(low), int(high or low)
+    if low < 0 or high < low:
+        raise CommandError(f"Invalid range: {value}")
+    return low, high
+
+
+def _init_worker():
+    django.setup()
+
+
+def _seed_job(label, team_id, count, seed, batch_size, notes_words, bookkeeping):
+    model = apps.get_model(label)
+    team = Team.objects.get(pk=team_id) if team_id is not None else None
+    return label, seeding.seed_objects(model, count, team, seed, batch_size, notes_words, bookkeeping)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the example models with made-up objects, fast, for load tests: bulk inserts, in parallel worker "
+        "processes if wanted. The same options (and --seed) make the same objects."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--models", default=DEFAULT_MODELS, help="Comma-separated labels of the models to fill")
+        parser.add_argument("--rows", type=int, default=10000, help="Objects of each model that has no team")
+        parser.add_argument("--teams", type=int, default=10, help="Teams to fill (created as needed)")
+        parser.add_argument(
+            "--rows-per-team",
+            default="1000",
+            help='Objects of each team model per team: "1000", or "10-5000" for a random number in that range per team',
+        )
+        parser.add_argument("--notes-words", default="0-40", help="Range of the number of words of the notes fields")
+        parser.add_argument("--seed", type=int, default=0, help="Seed for the made-up objects")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Objects per transaction")
+        parser.add_argument("--workers", type=int, default=1, help="Worker processes inserting in parallel")
+        parser.add_argument(
+            "--no-bookkeeping",
+            action="store_true",
+            help=(
+                "Faster: don't update the search index and rollups (the row counts still are), and run "
+                "rebuild_search_index and rebuild_rollups after"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        try:
+            models = [apps.get_model(label.strip()) for label in options["models"].split(",") if label.strip()]
+        except LookupError as e:
+            raise CommandError(str(e))
+        rows_per_team = _parse_range(options["rows_per_team"])
+        notes_words = _parse_range(options["notes_words"])
+        workers = options["workers"]
+        if workers > 1 and connection.vendor == "sqlite":
+            self.stdout.write(self.style.WARNING("SQLite only has one writer at a time: using one worker"))
+            workers = 1
+
+        teams = self._teams(options["teams"]) if any(is_team_model(model) for model in models) else []
+        jobs = self._jobs(models, teams, options["rows"], rows_per_team, options["seed"], options["batch_size"])
+        job_options = (options["batch_size"], notes_words, not options["no_bookkeeping"])
+        total = sum(job[2] for job in jobs)
+        self.stdout.write(f"Adding {total:,} objects, in {len(jobs)} jobs, with {workers} worker(s)")
+
+        done = {model._meta.label: 0 for model in models}
+        start = time.monotonic()
+        if workers == 1:
+            self._add_up(done, total, start, (_seed_job(*job, *job_options) for job in jobs))
+        else:
+            # The workers open their own connections: a forked one must not share the parent's
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                futures = [executor.submit(_seed_job, *job, *job_options) for job in jobs]
+                self._add_up(done, total, start, (future.result() for future in as_completed(futures)))
+
+        elapsed = time.monotonic() - start
+        for label, created in done.items():
+            self.stdout.write(f"{label}: added {created:,} objects")
+        added = sum(done.values())
+        rate = added / max(elapsed, 1e-9)
+        self.stdout.write(self.style.SUCCESS(f"Added {added:,} objects in {elapsed:.1f}s ({rate:,.0f} objects/s)"))
+        if options["no_bookkeeping"]:
+            self.stdout.write("Now run rebuild_search_index and rebuild_rollups")
+
+    def _add_up(self, done, total, start, results):
+        """Count the objects added by each job as it finishes, with a progress line every few seconds."""
+        last_report = start
+        for label, created in results:
+            done[label] += created
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                added = sum(done.values())
+                self.stdout.write(f"  {added:,}/{total:,} objects, {added / (now - start):,.0f} objects/s")
+
+    def _teams(self, count):
+        """The seed teams, created if they don't exist yet."""
+        slugs = [f"{TEAM_SLUG_PREFIX}{i}" for i in range(1, count + 1)]
+        existing = set(Team.objects.filter(slug__in=slugs).values_list("slug", flat=True))
+        Team.objects.bulk_create(
+            [Team(name=f"Seed Team {i}", slug=slug) for i, slug in enumerate(slugs, 1) if slug not in existing]
+        )
+        teams = dict(Team.objects.filter(slug__in=slugs).values_list("slug", "pk"))
+        return [teams[slug] for slug in slugs]
+
+    def _jobs(self, models, teams, rows, rows_per_team, seed, batch_size):
+        """(label, team id, count, seed) for each job. Each has its own seed, made from the options and the team's
+        number (not its id, which depends on the database)."""
+        jobs = []
+        job_size = batch_size * BATCHES_PER_JOB
+        for model in models:
+            label = model._meta.label
+            if is_team_model(model):
+                rng = random.Random(f"{seed}:{label}:rows")
+                targets = [(team_id, rng.randint(*rows_per_team)) for team_id in teams]
+            else:
+                targets = [(None, rows)]
+            for team_number, (team_id, count) in enumerate(targets):
+                for number, offset in enumerate(range(0, count, job_size)):
+                    job_seed = f"{seed}:{label}:{team_number}:{number}"
+                    jobs.append((label, team_id, min(job_size, count - offset), job_seed))
+        return jobs
@@ -0,0 +1,67 @@
+from django.db import models
+
+
+class RowCount(models.Model):
+    """Cached number of rows of one of the example models, kept per team.
+    Kept up to date by the save/delete signals in signals.py, and read by CountingPaginator."""
+
+    # Model label, e.g. "crud_example2.TeamThing"
+    model_label = models.CharField(max_length=100)
+    # Plain integer rather than a ForeignKey, so non-team models can use 0, and writes don't need to touch the team
+    team_id = models.BigIntegerField(default=0)
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.model_label} team {self.team_id}: {self.count}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["model_label", "team_id"], name="crud_common_rowcount_unique"),
+        ]
+
+
+class NumberRollup(models.Model):
+    """Count, sum, min and max of one integer field of one of the example models, for one team and one bucket of
+    values: [bucket * width, (bucket + 1) * width). The buckets are also the histogram.
+    Kept up to date by the save/delete signals in signals.py, and read by rollups.get_stats()."""
+
+    # Model label, e.g. "crud_example2.TeamThing"
+    model_label = models.CharField(max_length=100)
+    # Plain integer rather than a ForeignKey, like RowCount.team_id
+    team_id = models.BigIntegerField(default=0)
+    bucket = models.BigIntegerField()
+    count = models.BigIntegerField(default=0)
+    total = models.BigIntegerField(default=0)
+    min_value = models.BigIntegerField(null=True)
+    max_value = models.BigIntegerField(null=True)
+
+    def __str__(self):
+        return f"{self.model_label} team {self.team_id} bucket {self.bucket}: {self.count}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model_label", "team_id", "bucket"], name="crud_common_numberrollup_unique"
+            ),
+        ]
+
+
+class Tombstone(models.Model):
+    """A record that an object of one of the example models was deleted, so delta-sync clients can drop it too.
+    Written by the delete signals in signals.py, read by sync.py, and pruned by the prune_tombstones command."""
+
+    # Model label, e.g. "crud_example2.TeamThing"
+    model_label = models.CharField(max_length=100)
+    # Plain integer rather than a ForeignKey, like RowCount.team_id
+    team_id = models.BigIntegerField(default=0)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model_label} {self.object_id}, deleted {self.deleted_at}"
+
+    class Meta:
+        indexes = [
+            # Serves the sync's seek through a team's deletions, in order
+            models.Index(fields=["model_label", "team_id", "deleted_at", "id"]),
+        ]
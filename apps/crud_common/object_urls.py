@@ -0,0 +1,33 @@
+from django.urls import reverse
+
+# Building a URL with reverse() means searching the URL patterns and then quoting and checking the result, and
+# get_absolute_url() on a team object also needs object.team.slug, which costs a query unless the team was preloaded.
+# A list page does that once per row. ObjectUrlBuilder instead reverses the route once, with a placeholder pk,
+# and then just fills in each row's pk.
+
+# Stands in for the pk while reversing. Only the last occurrence is replaced, and the pk always comes last in our URLs.
+PK_PLACEHOLDER = 2147483647
+
+
+class ObjectUrlBuilder:
+    """Builds the URLs of one route (e.g. "crud_example2:teamthing_detail" for one team) for any pk."""
+
+    def __init__(self, viewname, **kwargs):
+        url = reverse(viewname, kwargs={**kwargs, "pk": PK_PLACEHOLDER})
+        self.prefix, _, self.suffix = url.rpartition(str(PK_PLACEHOLDER))
+
+    def url(self, pk):
+        return f"{self.prefix}{pk}{self.suffix}"
+
+
+def object_url(request, viewname, pk, **kwargs):
+    """URL of the object with this pk on the route viewname, reversing each route only once per request.
+    Pass the route's other arguments as keywords, e.g. team_slug=request.team.slug."""
+    key = (viewname, tuple(sorted(kwargs.items())))
+    if request is None:
+        return ObjectUrlBuilder(viewname, **kwargs).url(pk)
+    builders = request.__dict__.setdefault("_object_url_builders", {})
+    builder = builders.get(key)
+    if builder is None:
+        builder = builders[key] = ObjectUrlBuilder(viewname, **kwargs)
+    return builder.url(pk)
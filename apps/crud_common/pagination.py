@@ -0,0 +1,219 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.pagination import CursorPagination
+
+from .counts import CountingPaginator
+from .utils import is_team_model
+
+# Keyset ("seek") pagination.
+# Numbered pages turn into ORDER BY name LIMIT n OFFSET m, and the database has to walk past all m skipped rows,
+# so deep pages get slower and slower. A keyset page instead remembers the (name, id) of the row at its edge and
+# asks for the rows that sort after (or before) it, so every page costs the same as the first one.
+# The trade-off is that there are no page numbers: the paginator hands back opaque next/previous cursors.
+
+# Query-string parameter that carries the cursor
+CURSOR_PARAM = "cursor"
+# Seek on name first, with id as the tie-breaker so the ordering is total even when names repeat
+KEYSET_ORDERING = ("name", "id")
+
+DEFAULT_API_PAGE_SIZE = 50
+DEFAULT_API_MAX_PAGE_SIZE = 1000
+
+
+def api_page_size():
+    return getattr(settings, "CRUD_API_PAGE_SIZE", DEFAULT_API_PAGE_SIZE)
+
+
+def api_max_page_size():
+    return getattr(settings, "CRUD_API_MAX_PAGE_SIZE", DEFAULT_API_MAX_PAGE_SIZE)
+
+
+class KeysetPaginator:
+    """Paginate a queryset by seeking on KEYSET_ORDERING (ascending), rather than by OFFSET."""
+
+    # Present so templates written against Django's Paginator keep working
+    ELLIPSIS = Paginator.ELLIPSIS
+
+    def __init__(self, object_list, per_page, ordering=KEYSET_ORDERING):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+
+    def page(self, cursor=None):
+        """Return the page following (or preceding) the cursor, or the first page if there is no valid cursor."""
+        position, backwards = self.decode_cursor(cursor)
+        rows = list(self._page_queryset(position, backwards))
+        if not rows and position is not None:
+            # The rows around the cursor have gone away, start again from the top
+            return self.page()
+        return self._make_page(rows, position, backwards)
+
+    async def apage(self, cursor=None):
+        """page(), for async views: the rows are fetched with the async ORM."""
+        position, backwards = self.decode_cursor(cursor)
+        rows = [obj async for obj in self._page_queryset(position, backwards)]
+        if not rows and position is not None:
+            return await self.apage()
+        return self._make_page(rows, position, backwards)
+
+    def _page_queryset(self, position, backwards):
+        queryset = self.object_list
+        if position is not None:
+            queryset = queryset.filter(self._seek(position, backwards))
+        if backwards:
+            queryset = queryset.order_by(*[f"-{field}" for field in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        # Fetch one extra row, which tells us whether there is anything beyond this page
+        return queryset[: self.per_page + 1]
+
+    def _make_page(self, rows, position, backwards):
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+            return KeysetPage(rows, self, has_previous=has_more, has_next=True)
+        return KeysetPage(rows, self, has_previous=position is not None, has_next=has_more)
+
+    def get_elided_page_range(self, number=None, **kwargs):
+        """Keyset pages have no numbers, so there is no page range to show."""
+        return []
+
+    def encode_cursor(self, obj, backwards=False):
+        position = [getattr(obj, field) for field in self.ordering]
+        data = json.dumps({"p": position, "b": backwards}, cls=DjangoJSONEncoder).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """Return (position, backwards), or (None, False) if the cursor is missing or not one of ours."""
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            position, backwards = data["p"], bool(data["b"])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            return None, False
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            return None, False
+        # Each value must be one its field can hold, or seeking on it would fail in the query
+        model = self.object_list.model
+        try:
+            position = [model._meta.get_field(field).to_python(value) for field, value in zip(self.ordering, position)]
+        except (ValidationError, FieldDoesNotExist):
+            return None, False
+        if None in position:
+            return None, False
+        return position, backwards
+
+    def _seek(self, position, backwards):
+        """Build the filter for rows that sort after (or before) position. For (name, id) that is:
+        name > n OR (name = n AND id > i)"""
+        lookup = "lt" if backwards else "gt"
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            term = Q(**{f"{field}__{lookup}": position[i]})
+            for earlier_field, earlier_value in zip(self.ordering[:i], position[:i]):
+                term &= Q(**{earlier_field: earlier_value})
+            condition |= term
+        return condition
+
+
+class KeysetPage(Sequence):
+    """One page from a KeysetPaginator. Looks enough like Django's Page for our templates and list views."""
+
+    is_keyset = True
+    # Keyset pages have no numbers
+    number = None
+
+    def __init__(self, object_list, paginator, has_previous, has_next):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def __repr__(self):
+        return f"<Keyset page of {len(self.object_list)} objects>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next() or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous() or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], backwards=True)
+
+
+class ListPaginationMixin:
+    """ListView mixin that pages with a KeysetPaginator when keyset_pagination is set,
+    and with Django's numbered pages otherwise. Numbered pages get their count from a CountingPaginator,
+    and estimate_count lets it use the database's row estimate (only for lists that aren't filtered).
+    Search results (see search.SearchMixin) are in rank order, so they always get numbered pages, counted exactly."""
+
+    keyset_pagination = False
+    estimate_count = False
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        team = self.request.team if is_team_model(queryset.model) else None
+        searching = self._searching()
+        return CountingPaginator(
+            queryset,
+            per_page,
+            orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+            team=team,
+            estimate=self.estimate_count and not searching,
+            counted=not searching,
+            **kwargs,
+        )
+
+    def _searching(self):
+        return bool(getattr(self, "search_query", ""))
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.keyset_pagination or self._searching():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get(CURSOR_PARAM))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+class NameCursorPagination(CursorPagination):
+    """Cursor pagination for the API viewsets, in (name, id) order, so a list request costs the same however big
+    the table is. Pages hold CRUD_API_PAGE_SIZE objects, and clients can ask for up to CRUD_API_MAX_PAGE_SIZE
+    with ?page_size=."""
+
+    ordering = KEYSET_ORDERING
+    page_size_query_param = "page_size"
+
+    def __init__(self):
+        # Read when the paginator is made, not at import, so the settings can change (e.g. in tests).
+        # paginate_queryset() overwrites page_size with the one the client asked for.
+        self.page_size = api_page_size()
+        self.max_page_size = api_max_page_size()
@@ -0,0 +1,120 @@
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Reads from read replicas, with read-your-writes.
+# ReplicaRouter sends the reads of the example apps' models to one of CRUD_REPLICA_DATABASES (if there are any), but
+# only while ReplicaMiddleware says the request may use them: a GET or HEAD, from a client that hasn't written lately.
+# Everything else (writes, reads in a POST, other apps' models like users and teams) goes to the primary, "default".
+# A replica lags behind the primary, so right after a write (e.g. the redirect from a create to the new object's
+# detail page) it may not have the change yet. So after any POST, PUT, PATCH or DELETE, the middleware sets a cookie
+# that pins the client to the primary for CRUD_REPLICA_PIN_SECONDS (default 10): longer than the replicas lag.
+# Clients that don't keep cookies (e.g. API scripts) aren't pinned, and may read their writes late.
+# The caches keyed by version stamps (cached list pages, ETags, autocomplete indexes, see fragment_cache.py) must not
+# be filled from a replica that hasn't caught up with the stamp yet, or they would keep the stale data until the next
+# write. So the code filling them calls read_from_primary_if_recent() with the stamp, which sends the rest of the
+# request to the primary when the stamp is younger than the pin.
+
+DEFAULT_REPLICA_APPS = ("crud_example1", "crud_example2", "crud_example3", "crud_example4")
+DEFAULT_REPLICA_PIN_SECONDS = 10
+PIN_COOKIE = "crud_use_primary"
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Whether the request being run may read from a replica
+_use_replica = ContextVar("crud_use_replica", default=False)
+
+
+def replica_databases():
+    return getattr(settings, "CRUD_REPLICA_DATABASES", [])
+
+
+def replica_apps():
+    """The app labels whose models are read from the replicas."""
+    return getattr(settings, "CRUD_REPLICA_APPS", DEFAULT_REPLICA_APPS)
+
+
+def pin_seconds():
+    return getattr(settings, "CRUD_REPLICA_PIN_SECONDS", DEFAULT_REPLICA_PIN_SECONDS)
+
+
+class ReplicaRouter:
+    """Add it to DATABASE_ROUTERS. It only chooses the database for reads: everything else is left to the next
+    router, or to "default"."""
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_databases()
+        if replicas and _use_replica.get() and model._meta.app_label in replica_apps():
+            return random.choice(replicas)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary, so an object read from one can point to one from another
+        databases = {"default", *replica_databases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+def read_from_primary():
+    """Send the rest of the request's reads to the primary."""
+    _use_replica.set(False)
+
+
+def read_from_primary_if_recent(stamp):
+    """Send the rest of the request's reads to the primary if stamp (from time.time_ns(), like a version stamp) is
+    younger than the pin, as a replica may not have the data it stands for yet."""
+    if time.time_ns() - stamp < pin_seconds() * 1_000_000_000:
+        read_from_primary()
+
+
+def is_pinned(request):
+    """Whether the client wrote recently, so must read from the primary."""
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaMiddleware:
+    """Lets the reads of GET and HEAD requests use the replicas, unless the client is pinned to the primary, and
+    pins the client after a write. Works under WSGI and ASGI."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _use_replica.set(self._may_use_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        self._pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = _use_replica.set(self._may_use_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        self._pin(request, response)
+        return response
+
+    def _may_use_replica(self, request):
+        return request.method in SAFE_METHODS and not is_pinned(request)
+
+    def _pin(self, request, response):
+        if request.method not in SAFE_METHODS and replica_databases():
+            seconds = pin_seconds()
+            response.set_cookie(PIN_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True, samesite="Lax")
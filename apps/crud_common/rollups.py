@@ -0,0 +1,268 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.db.models.signals import post_init, pre_delete, pre_save
+from django.http import JsonResponse
+from django.template.response import TemplateResponse
+
+from .models import NumberRollup
+from .utils import is_team_model, team_id_of
+
+# Statistics (count, sum, min, max and a histogram) of an integer field, per team, without reading the table.
+# The values are kept in buckets of CRUD_STATS_BUCKET_WIDTH (default 10), with a NumberRollup row per team and
+# non-empty bucket holding the bucket's count, sum, min and max. The stats of a team are then the sum of a handful of
+# rows, and the buckets are the histogram.
+# The crud_common save/delete handlers (see signals.py) update the rows as objects change:
+# - Adding a value adds to the count and sum of its bucket, and widens its min and max, with one UPDATE.
+# - Removing a value subtracts from the count and sum, unless it was the bucket's min or max, which can't be undone
+#   like that: the bucket is then computed again from the table, which only reads the rows in the bucket (each model
+#   has an index on team and the field). So does a bucket's first value.
+# An update that changes the value removes the old one and adds the new one. The old value is remembered when the
+# object is loaded (or looked up before the save, if the field was deferred).
+# After changing CRUD_STATS_BUCKET_WIDTH, or if anything went around the signals (e.g. a raw SQL update), run the
+# rebuild_rollups command.
+
+DEFAULT_STATS_BUCKET_WIDTH = 10
+
+# The value of the field when the object was loaded, so a save can tell what changed
+ORIGINAL_ATTR = "_rollup_original"
+
+# model -> the field it keeps rollups of, for the models registered with track_model(..., rollup_field=...)
+_rollup_fields = {}
+
+
+def bucket_width():
+    return getattr(settings, "CRUD_STATS_BUCKET_WIDTH", DEFAULT_STATS_BUCKET_WIDTH)
+
+
+def register(model, field):
+    _rollup_fields[model] = field
+    label = model._meta.label
+    post_init.connect(_remember_value, sender=model, dispatch_uid=f"crud_common_rollup_init_{label}")
+    pre_save.connect(_load_original, sender=model, dispatch_uid=f"crud_common_rollup_pre_save_{label}")
+    pre_delete.connect(_load_original, sender=model, dispatch_uid=f"crud_common_rollup_pre_delete_{label}")
+
+
+def rolled_up_models():
+    return list(_rollup_fields)
+
+
+def rollup_fields(model):
+    """The fields the handlers need loaded for the model: its rollup field, if it has one."""
+    return [_rollup_fields[model]] if model in _rollup_fields else []
+
+
+def _remember_value(sender, instance, **kwargs):
+    # __dict__ rather than getattr(), which would load a deferred field
+    instance.__dict__[ORIGINAL_ATTR] = instance.__dict__.get(_rollup_fields[sender])
+
+
+def _load_original(sender, instance, **kwargs):
+    field = _rollup_fields[sender]
+    if instance._state.adding or instance.__dict__.get(ORIGINAL_ATTR) is not None:
+        return
+    if field not in instance.__dict__ and kwargs.get("signal") is pre_save:
+        # Still deferred, so the save won't write it
+        return
+    original = sender._default_manager.filter(pk=instance.pk).values_list(field, flat=True).first()
+    instance.__dict__[ORIGINAL_ATTR] = original
+
+
+def object_saved(model, instance, created, update_fields=None):
+    if model not in _rollup_fields:
+        return
+    field = _rollup_fields[model]
+    value = instance.__dict__.get(field)
+    original = instance.__dict__.get(ORIGINAL_ATTR)
+    written = created or update_fields is None or field in update_fields
+    if not written:
+        # The database still has the original value, and a later save that writes the field must remove it
+        return
+    instance.__dict__[ORIGINAL_ATTR] = value
+    if created:
+        _apply(model, team_id_of(instance), added=[value])
+    elif value is not None and value != original:
+        _apply(model, team_id_of(instance), added=[value], removed=[] if original is None else [original])
+
+
+def object_deleted(model, instance):
+    if model not in _rollup_fields:
+        return
+    original = instance.__dict__.get(ORIGINAL_ATTR)
+    if original is not None:
+        _apply(model, team_id_of(instance), removed=[original])
+
+
+def objects_created(model, objs):
+    if model not in _rollup_fields:
+        return
+    field = _rollup_fields[model]
+    for team_id, values in _by_team(objs, lambda obj: getattr(obj, field)).items():
+        _apply(model, team_id, added=values)
+    for obj in objs:
+        obj.__dict__[ORIGINAL_ATTR] = getattr(obj, field)
+
+
+def objects_updated(model, objs):
+    """objs must have been loaded before they were changed, so their original values are known."""
+    if model not in _rollup_fields:
+        return
+    field = _rollup_fields[model]
+    changed = [obj for obj in objs if obj.__dict__.get(ORIGINAL_ATTR) != getattr(obj, field)]
+    added = _by_team(changed, lambda obj: getattr(obj, field))
+    removed = _by_team(
+        [obj for obj in changed if obj.__dict__.get(ORIGINAL_ATTR) is not None],
+        lambda obj: obj.__dict__[ORIGINAL_ATTR],
+    )
+    for team_id in added.keys() | removed.keys():
+        _apply(model, team_id, added=added.get(team_id, []), removed=removed.get(team_id, []))
+    for obj in objs:
+        obj.__dict__[ORIGINAL_ATTR] = getattr(obj, field)
+
+
+def objects_deleted(model, objs):
+    if model not in _rollup_fields:
+        return
+    field = _rollup_fields[model]
+    for team_id, values in _by_team(objs, lambda obj: getattr(obj, field)).items():
+        _apply(model, team_id, removed=values)
+
+
+def _by_team(objs, get_value):
+    values = defaultdict(list)
+    for obj in objs:
+        values[team_id_of(obj)].append(get_value(obj))
+    return values
+
+
+def _apply(model, team_id, added=(), removed=()):
+    width = bucket_width()
+    changes = defaultdict(lambda: ([], []))
+    for value in added:
+        changes[value // width][0].append(value)
+    for value in removed:
+        changes[value // width][1].append(value)
+    rollups = NumberRollup.objects.filter(model_label=model._meta.label, team_id=team_id)
+    for bucket, (adds, removes) in changes.items():
+        if removes:
+            row = rollups.filter(bucket=bucket).first()
+            if (
+                row is None
+                or row.count <= len(removes)
+                or any(value <= row.min_value or value >= row.max_value for value in removes)
+            ):
+                _recompute_bucket(model, team_id, bucket)
+                continue
+        updates = {
+            "count": F("count") + len(adds) - len(removes),
+            "total": F("total") + sum(adds) - sum(removes),
+        }
+        if adds:
+            updates["min_value"] = Least(Coalesce(F("min_value"), min(adds)), min(adds))
+            updates["max_value"] = Greatest(Coalesce(F("max_value"), max(adds)), max(adds))
+        if not rollups.filter(bucket=bucket).update(**updates):
+            # The bucket's first values
+            _recompute_bucket(model, team_id, bucket)
+
+
+def _recompute_bucket(model, team_id, bucket):
+    field = _rollup_fields[model]
+    width = bucket_width()
+    queryset = model._default_manager.filter(**{f"{field}__gte": bucket * width, f"{field}__lt": (bucket + 1) * width})
+    if is_team_model(model):
+        queryset = queryset.filter(team_id=team_id)
+    stats = queryset.aggregate(count=Count("pk"), total=Sum(field), min_value=Min(field), max_value=Max(field))
+    key = {"model_label": model._meta.label, "team_id": team_id, "bucket": bucket}
+    if not stats["count"]:
+        NumberRollup.objects.filter(**key).delete()
+        return
+    try:
+        with transaction.atomic():
+            NumberRollup.objects.update_or_create(**key, defaults=stats)
+    except IntegrityError:
+        # Another request created the row at the same time: it read the same rows, or will update after us
+        NumberRollup.objects.filter(**key).update(**stats)
+
+
+def get_stats(model, team_id=0):
+    """Count, sum, min, max, mean and histogram of the model's rollup field, for one team (0 for non-team models)."""
+    width = bucket_width()
+    rows = list(
+        NumberRollup.objects.filter(model_label=model._meta.label, team_id=team_id, count__gt=0)
+        .order_by("bucket")
+        .values_list("bucket", "count", "total", "min_value", "max_value")
+    )
+    count = sum(row[1] for row in rows)
+    total = sum(row[2] for row in rows)
+    largest = max((row[1] for row in rows), default=0)
+    return {
+        "field": _rollup_fields[model],
+        "count": count,
+        "sum": total,
+        "min": rows[0][3] if rows else None,
+        "max": rows[-1][4] if rows else None,
+        "mean": total / count if count else None,
+        "bucket_width": width,
+        "histogram": [
+            {
+                "start": bucket * width,
+                "end": (bucket + 1) * width - 1,
+                "count": bucket_count,
+                "percent": round(100 * bucket_count / largest),
+            }
+            for bucket, bucket_count, *_ in rows
+        ],
+    }
+
+
+def stats_response(request, model, team=None):
+    """The model's stats, as the htmx summary card for the list pages, or as JSON for other requests."""
+    stats = get_stats(model, team.pk if team else 0)
+    if not request.htmx:
+        return JsonResponse(stats)
+    context = {"stats": stats, "verbose_name_plural": model._meta.verbose_name_plural}
+    return TemplateResponse(request, "web/components/stats_card.html", context)
+
+
+def rebuild(model, batch_size):
+    """Compute all of the model's rollup rows again from the table, reading it batch_size rows at a time.
+    Returns the number of rows read."""
+    field = _rollup_fields[model]
+    width = bucket_width()
+    team_field = "team_id" if is_team_model(model) else "pk"
+    buckets = {}
+    read = 0
+    rows = model._default_manager.order_by("pk").values_list(team_field, field)
+    for team_id, value in rows.iterator(chunk_size=batch_size):
+        read += 1
+        key = (team_id if is_team_model(model) else 0, value // width)
+        stats = buckets.get(key)
+        if stats is None:
+            buckets[key] = [1, value, value, value]
+        else:
+            stats[0] += 1
+            stats[1] += value
+            stats[2] = min(stats[2], value)
+            stats[3] = max(stats[3], value)
+    label = model._meta.label
+    with transaction.atomic():
+        NumberRollup.objects.filter(model_label=label).delete()
+        NumberRollup.objects.bulk_create(
+            (
+                NumberRollup(
+                    model_label=label,
+                    team_id=team_id,
+                    bucket=bucket,
+                    count=count,
+                    total=total,
+                    min_value=min_value,
+                    max_value=max_value,
+                )
+                for (team_id, bucket), (count, total, min_value, max_value) in buckets.items()
+            ),
+            batch_size=batch_size,
+        )
+    return read
@@ -0,0 +1,284 @@
+import operator
+import re
+from functools import reduce
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Case, IntegerField, Q, Value, When
+from rest_framework.pagination import PageNumberPagination
+
+from .pagination import api_max_page_size, api_page_size
+from .utils import is_team_model, team_id_of
+
+# Full-text search over the models' text fields, ranked, with an inverted index kept by the database.
+# Each searchable model gets an index table next to its own table, named crud_search_<table>, keyed by the object's
+# id, with the object's team id alongside so a search only ranks the team's objects:
+# - SQLite: an FTS5 virtual table (with the porter stemmer), ranked with bm25()
+# - PostgreSQL: a table with a tsvector column and a GIN index on it, ranked with ts_rank()
+# The first search field is the title, which counts for more than the others when ranking.
+# The index tables aren't models (neither kind can be described with model fields on both databases), so they are
+# created after migrate, and rebuilt from the objects with the rebuild_search_index command. They are kept up to
+# date by the crud_common save/delete handlers (see signals.py), in the same transaction as the change itself.
+# On other databases there is no index: searching falls back to icontains on the search fields, unranked.
+
+SEARCH_PARAM = "q"
+
+# A search ranks at most this many objects, best first. Set CRUD_SEARCH_MAX_RESULTS to change it
+DEFAULT_SEARCH_MAX_RESULTS = 1000
+# The text search configuration (language) used on PostgreSQL. Set CRUD_SEARCH_CONFIG to change it
+DEFAULT_SEARCH_CONFIG = "english"
+
+# How much more a match in the title counts than a match in the other fields, with bm25() on SQLite.
+# (ts_rank() on PostgreSQL has its own weights for the A and B labels)
+TITLE_WEIGHT = 10.0
+
+# model -> its search fields, for the models registered with track_model(..., search_fields=...)
+_search_fields = {}
+
+
+def search_max_results():
+    return getattr(settings, "CRUD_SEARCH_MAX_RESULTS", DEFAULT_SEARCH_MAX_RESULTS)
+
+
+def search_config():
+    return getattr(settings, "CRUD_SEARCH_CONFIG", DEFAULT_SEARCH_CONFIG)
+
+
+def register(model, fields):
+    _search_fields[model] = list(fields)
+
+
+def searchable_models():
+    return list(_search_fields)
+
+
+def search_field_names(model):
+    """The fields index_objects() reads, including the team."""
+    return [*_search_fields[model], *(["team"] if is_team_model(model) else [])]
+
+
+def index_affected(model, update_fields):
+    """Whether a save(update_fields=...) of the model changes anything its index holds."""
+    return model in _search_fields and not set(update_fields).isdisjoint(search_field_names(model))
+
+
+def search_words(query):
+    """The words of a search query. Only words are kept, so nothing the user types can be taken as FTS syntax."""
+    return re.findall(r"\w+", query or "")
+
+
+def index_table(model):
+    return f"crud_search_{model._meta.db_table}"
+
+
+def _has_index(connection):
+    return connection.vendor in ("sqlite", "postgresql")
+
+
+def _create_statements(model, connection):
+    table = index_table(model)
+    if connection.vendor == "sqlite":
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} "
+            "USING fts5(title, body, team_id UNINDEXED, tokenize='porter unicode61')"
+        ]
+    return [
+        f"CREATE TABLE IF NOT EXISTS {table} "
+        "(object_id bigint PRIMARY KEY, team_id bigint NOT NULL, document tsvector NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS {table}_document ON {table} USING gin (document)",
+    ]
+
+
+def create_index_tables(using="default", **kwargs):
+    """Create any missing index tables. Connected to post_migrate."""
+    connection = connections[using]
+    if not _has_index(connection):
+        return
+    with connection.cursor() as cursor:
+        for model in _search_fields:
+            if router.allow_migrate_model(using, model):
+                for statement in _create_statements(model, connection):
+                    cursor.execute(statement)
+
+
+def _document(model, obj):
+    fields = _search_fields[model]
+    title = getattr(obj, fields[0]) or ""
+    body = "\n".join(getattr(obj, field) or "" for field in fields[1:])
+    return title, body
+
+
+def index_objects(model, objs):
+    """Add objs to the model's index, or update their entries."""
+    if model not in _search_fields or not objs:
+        return
+    connection = connections[router.db_for_write(model)]
+    if not _has_index(connection):
+        return
+    table = index_table(model)
+    rows = [(obj.pk, team_id_of(obj), *_document(model, obj)) for obj in objs]
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            # FTS5 tables have no upsert, but deleting by rowid is a lookup
+            _delete_rows(cursor, table, "rowid", [row[0] for row in rows])
+            cursor.executemany(f"INSERT INTO {table} (rowid, team_id, title, body) VALUES (%s, %s, %s, %s)", rows)
+        else:
+            config = search_config()
+            cursor.executemany(
+                f"INSERT INTO {table} (object_id, team_id, document) VALUES (%s, %s, "
+                "setweight(to_tsvector(%s::regconfig, %s), 'A') || setweight(to_tsvector(%s::regconfig, %s), 'B')) "
+                "ON CONFLICT (object_id) DO UPDATE SET team_id = EXCLUDED.team_id, document = EXCLUDED.document",
+                [(pk, team_id, config, title, config, body) for pk, team_id, title, body in rows],
+            )
+
+
+def unindex_objects(model, objs):
+    """Remove objs from the model's index. objs only need their pk."""
+    if model not in _search_fields or not objs:
+        return
+    connection = connections[router.db_for_write(model)]
+    if not _has_index(connection):
+        return
+    with connection.cursor() as cursor:
+        key = "rowid" if connection.vendor == "sqlite" else "object_id"
+        _delete_rows(cursor, index_table(model), key, [obj.pk for obj in objs])
+
+
+def _delete_rows(cursor, table, key, ids):
+    placeholders = ", ".join(["%s"] * len(ids))
+    cursor.execute(f"DELETE FROM {table} WHERE {key} IN ({placeholders})", ids)
+
+
+def clear_index(model, using):
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {index_table(model)}")
+
+
+def search_ids(model, words, team_id=None, using="default"):
+    """The ids of the model's objects that have all the words, best match first, or None if the database has no
+    index. team_id limits the search to one team's objects."""
+    connection = connections[using]
+    if not _has_index(connection):
+        return None
+    table = index_table(model)
+    team_filter = "" if team_id is None else "AND team_id = %s"
+    team_params = [] if team_id is None else [team_id]
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            # Quoted, each word is a plain term, and the terms are ANDed
+            match = " ".join(f'"{word}"' for word in words)
+            cursor.execute(
+                f"SELECT rowid FROM {table} WHERE {table} MATCH %s {team_filter} "
+                f"ORDER BY bm25({table}, {TITLE_WEIGHT}, 1.0) LIMIT %s",
+                [match, *team_params, search_max_results()],
+            )
+        else:
+            cursor.execute(
+                f"SELECT object_id FROM {table}, plainto_tsquery(%s::regconfig, %s) query "
+                f"WHERE document @@ query {team_filter} ORDER BY ts_rank(document, query) DESC, object_id LIMIT %s",
+                [search_config(), " ".join(words), *team_params, search_max_results()],
+            )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_queryset(queryset, query, team=None):
+    """Narrow queryset down to the objects matching the search query, best match first.
+    The objects are annotated with search_rank (0 for the best match). team limits the search to one team's objects
+    (the queryset should be filtered to the team as well)."""
+    model = queryset.model
+    words = search_words(query)
+    if not words:
+        return queryset
+    team_id = team.pk if team is not None and is_team_model(model) else None
+    ids = search_ids(model, words, team_id, using=queryset.db)
+    if ids is None:
+        # No index on this database: filter on the fields, which means reading every row
+        condition = Q()
+        for word in words:
+            condition &= reduce(operator.or_, (Q(**{f"{field}__icontains": word}) for field in _search_fields[model]))
+        return queryset.filter(condition).annotate(search_rank=Value(0)).order_by("name", "id")
+    if not ids:
+        return queryset.none()
+    rank = Case(*(When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)), output_field=IntegerField())
+    return queryset.filter(pk__in=ids).annotate(search_rank=rank).order_by("search_rank")
+
+
+async def asearch_queryset(queryset, query, team=None):
+    """search_queryset() for async views. Finding the ids is a query, so it runs in a thread, like the async ORM's."""
+    return await sync_to_async(search_queryset)(queryset, query, team)
+
+
+def search_query(request):
+    """The ?q= search query of a request, or an empty string."""
+    return request.GET.get(SEARCH_PARAM, "").strip()
+
+
+class SearchMixin:
+    """ListView mixin: narrow the list down with ?q= (see search_queryset()).
+    ListPaginationMixin pages search results by number, with an exact count."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        self.search_query = search_query(self.request)
+        if self.search_query:
+            team = self.request.team if is_team_model(queryset.model) else None
+            queryset = search_queryset(queryset, self.search_query, team)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["search_query"] = self.search_query
+        return context
+
+
+class AsyncSearchMixin:
+    """SearchMixin for AsyncListView, which then pages the results like ListPaginationMixin does."""
+
+    async def aget_queryset(self):
+        queryset = await super().aget_queryset()
+        self.search_query = search_query(self.request)
+        if self.search_query:
+            team = self.request.team if is_team_model(queryset.model) else None
+            queryset = await asearch_queryset(queryset, self.search_query, team)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["search_query"] = self.search_query
+        return context
+
+
+class SearchResultsPagination(PageNumberPagination):
+    """Numbered pages for API search results: these are in rank order, which a cursor on (name, id) can't follow."""
+
+    page_size_query_param = "page_size"
+
+    @property
+    def page_size(self):
+        return api_page_size()
+
+    @property
+    def max_page_size(self):
+        return api_max_page_size()
+
+
+class SearchViewSetMixin:
+    """ModelViewSet mixin: narrow the list down with ?q=, best match first, paged by SearchResultsPagination."""
+
+    def _search_query(self):
+        return self.action == "list" and search_query(self.request)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        query = self._search_query()
+        if query:
+            team = self.request.team if is_team_model(queryset.model) else None
+            queryset = search_queryset(queryset, query, team)
+        return queryset
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator") and self._search_query():
+            self._paginator = SearchResultsPagination()
+        return super().paginator
@@ -0,0 +1,71 @@
+import random
+
+from django.db import transaction
+
+from . import signals
+from .utils import is_team_model
+
+# Made-up objects for the example models, for benchmarks and load tests.
+# Values come from a random.Random seeded by the caller, so the same seed always makes the same objects.
+# Objects are inserted with bulk_create(), and signals.objects_created() does the bookkeeping (row counts, search
+# index, rollups) once per batch (see signals.create_objects(), which saves them one at a time on databases that can't
+# return the pks of a bulk insert). Without bookkeeping, only the row counts (which the paginators trust once they are
+# big, see counts.py) and version stamps are kept.
+
+DEFAULT_SEED_BATCH_SIZE = 1000
+
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike november oscar papa quebec "
+    "romeo sierra tango uniform victor whiskey xray yankee zulu amber cobalt crimson indigo olive silver "
+    "widget gadget sprocket gizmo bracket flange gasket spindle lever valve"
+).split()
+
+# The range of the number field
+NUMBER_RANGE = (0, 1000)
+# The range of the length of the notes, in words
+NOTES_WORDS = (0, 40)
+
+
+def fake_words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def fake_values(rng, notes_words=NOTES_WORDS):
+    """Values for every field any of the example models has. make_object() picks the ones its model has."""
+    name = fake_words(rng, rng.randint(1, 3)).title()
+    return {
+        "name": name,
+        "number": rng.randint(*NUMBER_RANGE),
+        "notes": fake_words(rng, rng.randint(*notes_words)),
+        "notes1": fake_words(rng, rng.randint(*notes_words)),
+        "notes2": fake_words(rng, rng.randint(*notes_words)),
+        "birthdate": f"{rng.randint(1940, 2010)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "email": f"{name.replace(' ', '.').lower()}{rng.randint(1, 9999)}@example.com",
+        "extra": rng.random() < 0.5,
+    }
+
+
+def make_object(model, rng, team=None, notes_words=NOTES_WORDS):
+    """An unsaved object of model, with made-up values."""
+    values = fake_values(rng, notes_words)
+    field_names = {field.name for field in model._meta.concrete_fields}
+    obj = model(**{name: value for name, value in values.items() if name in field_names})
+    if is_team_model(model):
+        obj.team = team
+    return obj
+
+
+def seed_objects(
+    model, count, team=None, seed=0, batch_size=DEFAULT_SEED_BATCH_SIZE, notes_words=NOTES_WORDS, bookkeeping=True
+):
+    """Insert count made-up objects of model (for team models, into team), batch_size per transaction.
+    The same seed (an int or a str) makes the same objects. Without bookkeeping, the search index and rollups must be
+    rebuilt afterwards (with the rebuild_search_index and rebuild_rollups commands), but the row counts are kept."""
+    rng = random.Random(seed)
+    created = 0
+    while created < count:
+        objs = [make_object(model, rng, team, notes_words) for _ in range(min(batch_size, count - created))]
+        with transaction.atomic():
+            signals.create_objects(model, objs, indexes=bookkeeping)
+        created += len(objs)
+    return created
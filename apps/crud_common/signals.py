@@ -0,0 +1,108 @@
+from collections import Counter
+
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete, post_save
+
+from . import autocomplete, counts, fragment_cache, rollups, search, sync
+from .utils import is_team_model, team_id_of
+
+# Each example app calls track_model() from its AppConfig.ready(), so the caches and indexes kept in crud_common
+# follow every save and delete of the app's model.
+
+
+def track_model(model, search_fields=None, rollup_field=None, tombstones=False, autocomplete_names=False):
+    """Connect the crud_common save/delete handlers to a model.
+    search_fields (title first) makes the model searchable, see search.py.
+    rollup_field (an integer field) keeps stats of its values, see rollups.py.
+    tombstones records deletions for the delta sync, see sync.py.
+    autocomplete_names keeps the in-memory name indexes of the autocomplete up to date, see autocomplete.py."""
+    if autocomplete_names:
+        autocomplete.register(model)
+    if search_fields:
+        search.register(model, search_fields)
+    if rollup_field:
+        rollups.register(model, rollup_field)
+    if tombstones:
+        sync.register(model)
+    post_save.connect(_on_save, sender=model, dispatch_uid=f"crud_common_save_{model._meta.label}")
+    post_delete.connect(_on_delete, sender=model, dispatch_uid=f"crud_common_delete_{model._meta.label}")
+
+
+def _on_save(sender, instance, created, update_fields=None, **kwargs):
+    team_id = team_id_of(instance)
+    if created:
+        counts.adjust_cached_count(sender, team_id, 1)
+    if update_fields is None or search.index_affected(sender, update_fields):
+        search.index_objects(sender, [instance])
+    rollups.object_saved(sender, instance, created, update_fields)
+    autocomplete.object_saved(sender, instance, update_fields)
+    _bump_version_on_commit(sender, team_id)
+
+
+def _on_delete(sender, instance, **kwargs):
+    team_id = team_id_of(instance)
+    counts.adjust_cached_count(sender, team_id, -1)
+    search.unindex_objects(sender, [instance])
+    rollups.object_deleted(sender, instance)
+    sync.objects_deleted(sender, [instance])
+    autocomplete.objects_deleted(sender, [instance])
+    _bump_version_on_commit(sender, team_id)
+
+
+# Bulk operations (bulk_create(), bulk_update(), a raw DELETE) don't send signals, so code doing those calls these
+# instead, which do the same bookkeeping once per team rather than once per object.
+
+
+def objects_created(model, objs, indexes=True):
+    """indexes=False skips the search index and rollups, which must then be rebuilt (with the rebuild_search_index
+    and rebuild_rollups commands). The row counts and versions are always kept."""
+    if indexes:
+        search.index_objects(model, objs)
+        rollups.objects_created(model, objs)
+    autocomplete.objects_saved(model, objs)
+    for team_id, count in Counter(team_id_of(obj) for obj in objs).items():
+        counts.adjust_cached_count(model, team_id, count)
+        _bump_version_on_commit(model, team_id)
+
+
+def create_objects(model, objs, batch_size=None, indexes=True):
+    """Insert objs with bulk_create(), and do the bookkeeping with objects_created(). Returns objs, with their pks.
+    Some databases (e.g. MySQL) can't return the pks of a bulk insert, and the bookkeeping and the callers need them:
+    there each object is saved on its own, and the save handlers do the bookkeeping (all of it, whatever indexes)."""
+    if not connections[router.db_for_write(model)].features.can_return_rows_from_bulk_insert:
+        for obj in objs:
+            obj.save(force_insert=True)
+        return objs
+    objs = model._default_manager.bulk_create(objs, batch_size=batch_size)
+    objects_created(model, objs, indexes)
+    return objs
+
+
+def objects_updated(model, objs):
+    """objs must have been loaded from the database before they were changed."""
+    search.index_objects(model, objs)
+    rollups.objects_updated(model, objs)
+    autocomplete.objects_saved(model, objs)
+    for team_id in {team_id_of(obj) for obj in objs}:
+        _bump_version_on_commit(model, team_id)
+
+
+def objects_deleted(model, objs):
+    """objs only need the fields in deleted_object_fields()."""
+    search.unindex_objects(model, objs)
+    rollups.objects_deleted(model, objs)
+    sync.objects_deleted(model, objs)
+    autocomplete.objects_deleted(model, objs)
+    for team_id, count in Counter(team_id_of(obj) for obj in objs).items():
+        counts.adjust_cached_count(model, team_id, -count)
+        _bump_version_on_commit(model, team_id)
+
+
+def deleted_object_fields(model):
+    """The fields objects_deleted() needs loaded, for use with only()."""
+    return ["pk", *(["team"] if is_team_model(model) else []), *rollups.rollup_fields(model)]
+
+
+def _bump_version_on_commit(model, team_id):
+    # Wait for the commit, otherwise a concurrent request could cache the old rows under the new version
+    transaction.on_commit(lambda: fragment_cache.bump_version(model, team_id))
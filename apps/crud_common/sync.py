@@ -0,0 +1,161 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .models import Tombstone
+from .pagination import api_max_page_size, api_page_size
+from .utils import is_team_model, team_id_of
+
+# Delta sync for the API: ?since=<token> lists only what changed since the token was handed out.
+# The response has the objects created or updated since then ("results"), the ids of those deleted ("deleted"), the
+# token to send next time ("since"), and whether there's more to fetch right away ("more"). An empty ?since= starts
+# from nothing: all the objects, a page at a time.
+# Changes are found with the updated_at timestamp of BaseModel, in (updated_at, id) order, which an index serves, so
+# a sync costs the same however big the table is. Deletions leave a Tombstone (see signals.py), read in the same way.
+# A token holds the (timestamp, id) position reached in each of the two, base64-encoded.
+# A transaction may commit after a later one, with an earlier timestamp. So the token never goes beyond
+# CRUD_SYNC_OVERLAP_SECONDS (default 5) ago: changes made since then are sent again next time. Clients apply the
+# changes by id, so getting one twice does no harm.
+# Tombstones are kept for CRUD_SYNC_TOMBSTONE_DAYS (default 30) by the prune_tombstones command. A token older than
+# that gets a 410 Gone, and the client must start again with an empty ?since=.
+
+SINCE_PARAM = "since"
+
+DEFAULT_SYNC_OVERLAP_SECONDS = 5
+DEFAULT_SYNC_TOMBSTONE_DAYS = 30
+
+# model -> True, for the models registered with track_model(..., tombstones=True)
+_tombstone_models = {}
+
+
+def sync_overlap():
+    return timedelta(seconds=getattr(settings, "CRUD_SYNC_OVERLAP_SECONDS", DEFAULT_SYNC_OVERLAP_SECONDS))
+
+
+def tombstone_days():
+    return getattr(settings, "CRUD_SYNC_TOMBSTONE_DAYS", DEFAULT_SYNC_TOMBSTONE_DAYS)
+
+
+def register(model):
+    _tombstone_models[model] = True
+
+
+def objects_deleted(model, objs):
+    if model not in _tombstone_models:
+        return
+    label = model._meta.label
+    Tombstone.objects.bulk_create(
+        [Tombstone(model_label=label, team_id=team_id_of(obj), object_id=obj.pk) for obj in objs]
+    )
+
+
+def prune_tombstones():
+    """Delete the tombstones older than CRUD_SYNC_TOMBSTONE_DAYS. Returns how many were deleted."""
+    cutoff = timezone.now() - timedelta(days=tombstone_days())
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
+
+
+def encode_token(changed, deleted):
+    data = {"changed": _encode_position(changed), "deleted": _encode_position(deleted)}
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode()).decode()
+
+
+def _encode_position(position):
+    return None if position is None else [position[0].isoformat(), position[1]]
+
+
+def decode_token(token):
+    """(changed, deleted) positions, each a (timestamp, id). Raises a ValidationError."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return _decode_position(data["changed"]), _decode_position(data["deleted"])
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError, IndexError):
+        raise ValidationError({SINCE_PARAM: ["Invalid token."]})
+
+
+def _decode_position(value):
+    # encode_token() never writes a null position, or a timestamp that can't be compared with timezone.now() (naive
+    # with USE_TZ, or aware without it)
+    timestamp = datetime.fromisoformat(value[0])
+    if timezone.is_aware(timestamp) != settings.USE_TZ:
+        raise ValueError("Timestamp with the wrong kind of time zone")
+    return timestamp, int(value[1])
+
+
+def _after(queryset, field, position):
+    if position is None:
+        return queryset
+    timestamp, pk = position
+    return queryset.filter(Q(**{f"{field}__gt": timestamp}) | Q(**{field: timestamp, "pk__gt": pk}))
+
+
+def _seek(queryset, field, position, limit):
+    """Up to limit rows after position, in (field, id) order, whether there are more, and the position reached."""
+    rows = list(_after(queryset, field, position).annotate(_sync_at=F(field)).order_by(field, "pk")[: limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        position = (rows[-1]._sync_at, rows[-1].pk)
+    return rows, more, position
+
+
+def _clamp(position, horizon):
+    """Don't go beyond horizon, so the changes since then are sent again (see above)."""
+    if position is None or position[0] > horizon:
+        return (horizon, 0)
+    return position
+
+
+def delta(queryset, team, since, limit):
+    """The changes to queryset (and deletions of its model, in team) since the token since (or the start, if empty).
+    Returns (changed objects, deleted ids, next token, more), or None if the token is too old."""
+    model = queryset.model
+    horizon = timezone.now() - sync_overlap()
+    changed_from, deleted_from = decode_token(since) if since else (None, (horizon, 0))
+    if deleted_from[0] < timezone.now() - timedelta(days=tombstone_days()):
+        return None
+
+    changed, more_changed, changed_to = _seek(queryset, "updated_at", changed_from, limit)
+    tombstones = Tombstone.objects.filter(model_label=model._meta.label, team_id=team.pk if team else 0)
+    deleted, more_deleted, deleted_to = _seek(tombstones, "deleted_at", deleted_from, limit)
+    # While there's more to come, the token is just where this page stopped
+    if not more_changed:
+        changed_to = _clamp(changed_to, horizon)
+    if not more_deleted:
+        deleted_to = _clamp(deleted_to, horizon)
+    token = encode_token(changed_to, deleted_to)
+    return changed, [tombstone.object_id for tombstone in deleted], token, more_changed or more_deleted
+
+
+class DeltaSyncViewSetMixin:
+    """Mixin for a ModelViewSet of a model with updated_at, registered with track_model(..., tombstones=True):
+    list() with ?since= returns the changes since the token (see above). ?page_size= sets how many at most."""
+
+    def list(self, request, *args, **kwargs):
+        since = request.query_params.get(SINCE_PARAM)
+        if since is None:
+            return super().list(request, *args, **kwargs)
+        try:
+            limit = min(int(request.query_params.get("page_size", api_page_size())), api_max_page_size())
+        except ValueError:
+            limit = api_page_size()
+        queryset = self.filter_queryset(self.get_queryset())
+        team = request.team if is_team_model(queryset.model) else None
+        result = delta(queryset, team, since, max(limit, 1))
+        if result is None:
+            return Response(
+                {"detail": "The token is too old: sync again from the start, with an empty since."},
+                status=status.HTTP_410_GONE,
+            )
+        changed, deleted, token, more = result
+        data = {"results": self.get_serializer(changed, many=True).data, "deleted": deleted}
+        return Response({**data, SINCE_PARAM: token, "more": more})
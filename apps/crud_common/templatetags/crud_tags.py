@@ -0,0 +1,12 @@
+from django import template
+
+from apps.crud_common import object_urls
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def object_url(context, viewname, pk, **kwargs):
+    """URL of an object, for use in list rows. Reverses the route once per request, e.g.:
+    {% object_url "crud_example2:teamthing_detail" object.pk team_slug=request.team.slug %}"""
+    return object_urls.object_url(context.get("request"), viewname, pk, **kwargs)
@@ -0,0 +1,101 @@
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+
+from .budgets import get_query_budget
+from .view_registry import ViewClient, ViewURLConf, registered_views
+
+# Test helpers for the example apps.
+
+# What a bad query plan looks like, for each database: a table read in full, or rows sorted after they're read.
+# Index scans are fine, e.g. reading a whole index in order for an unfiltered list.
+PLAN_PROBLEMS = {
+    # EXPLAIN QUERY PLAN: "SCAN thing" (vs "SCAN thing USING INDEX ..." or "SEARCH ..."), "USE TEMP B-TREE FOR ORDER BY"
+    "sqlite": (r"^SCAN (TABLE )?{table}\b(?!.*\bUSING\b)", r"TEMP B-TREE FOR (RIGHT PART OF )?ORDER BY"),
+    # EXPLAIN, with seq scans and sorts turned off, so the planner only uses them when no index will do
+    "postgresql": (r"Seq Scan on {table}\b", r"^\s*(->\s*)?(Incremental )?Sort\b"),
+}
+
+
+class QueryBudgetTestMixin:
+    """Mixin for a TestCase of one app: requests each of the app's views (every implementation it registered, see
+    view_registry.py) with each number of objects in sizes, and fails if a view has no query budget, if its
+    number of queries changes with the number of objects, or if it goes over its budget.
+    Each view is requested once before its queries are counted, so caches are warm, as they mostly are in use."""
+
+    app = None
+    # Enough objects for several pages of the lists
+    sizes = (1, 10, 50)
+
+    def test_query_budgets(self):
+        views = registered_views(self.app)
+        counts = defaultdict(list)
+        with override_settings(ROOT_URLCONF=ViewURLConf(settings.ROOT_URLCONF)):
+            client = ViewClient()
+            for rows in self.sizes:
+                # The version stamps are bumped on commit, which a TestCase never gets to
+                with self.captureOnCommitCallbacks(execute=True):
+                    client.seed(rows)
+                for view in views:
+                    with self.captureOnCommitCallbacks(execute=True):
+                        counts[view].append(client.count_queries(view))
+        for view, queries in counts.items():
+            with self.subTest(view.name):
+                budget = get_query_budget(view.view_func)
+                by_size = dict(zip(self.sizes, queries))
+                self.assertIsNotNone(budget, "The view has no query budget")
+                self.assertEqual(len(set(queries)), 1, f"The queries grow with the number of objects: {by_size}")
+                self.assertLessEqual(max(queries), budget, f"Over the budget of {budget} queries: {by_size}")
+
+
+def explain(sql):
+    """The lines of the database's plan for sql (a query as captured, with its parameters filled in)."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute("SET enable_seqscan = off; SET enable_sort = off")
+        try:
+            cursor.execute(f"EXPLAIN {sql}")
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.execute("RESET enable_seqscan; RESET enable_sort")
+
+
+def plan_problems(plan, table):
+    """The lines of plan that read table in full, or sort."""
+    patterns = [re.compile(pattern.format(table=re.escape(table))) for pattern in PLAN_PROBLEMS[connection.vendor]]
+    return [line for line in plan if any(pattern.search(line) for pattern in patterns)]
+
+
+class QueryPlanTestMixin:
+    """Mixin for a TestCase of one app: runs EXPLAIN on each query of the app's list, detail and API views (every
+    implementation) that reads the app's model, and fails if the plan reads the whole table or sorts the rows,
+    i.e. if the model's indexes don't serve the query."""
+
+    app = None
+    rows = 100
+    views = ("list", "detail", "api")
+
+    def test_query_plans(self):
+        if connection.vendor not in PLAN_PROBLEMS:
+            self.skipTest(f"No query plan checks for {connection.vendor}")
+        views = [view for view in registered_views(self.app) if view.view in self.views]
+        with override_settings(ROOT_URLCONF=ViewURLConf(settings.ROOT_URLCONF)):
+            client = ViewClient()
+            with self.captureOnCommitCallbacks(execute=True):
+                client.seed(self.rows)
+            for view in views:
+                table = view.model._meta.db_table
+                with self.captureOnCommitCallbacks(execute=True):
+                    queries = client.capture_queries(view)
+                for query in queries:
+                    sql = query["sql"]
+                    if f'"{table}"' not in sql or not sql.lstrip().upper().startswith("SELECT"):
+                        continue
+                    with self.subTest(view.name, sql=sql):
+                        plan = explain(sql)
+                        self.assertEqual(plan_problems(plan, table), [], "\n".join(plan))
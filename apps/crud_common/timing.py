@@ -0,0 +1,213 @@
+import json
+import logging
+import random
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.module_loading import import_string
+
+# Where the time of a request goes: database, template rendering, and DRF serialization.
+# ServerTimingMiddleware times a sample of the requests (CRUD_SERVER_TIMING_SAMPLE_RATE, default 1.0, i.e. all of
+# them), adds a Server-Timing header to their responses (which the browser's dev tools show under Timing), and sends a
+# record of each one to the sink (CRUD_SERVER_TIMING_SINK), by default a JSON log line.
+# The timings of a request live in a context variable, so they follow it into the threads and coroutines it runs in.
+# What's timed:
+# - db: every query, through an execute_wrapper added to each database connection as it's opened.
+# - template: every render, through TimedDjangoTemplates, a template backend to use in place of DjangoTemplates.
+#   That covers render() in the FBVs, and the TemplateResponses of the CBVs.
+# - serialize: to_representation() of the serializers with TimedSerializerMixin.
+# The times are exclusive: a query run while rendering a template (e.g. the page of a list, which is only read when
+# the template loops over it) counts as db time, not template time. So db + template + serialize <= total.
+# Requests that aren't sampled only pay for reading the context variable, once per query, render and object.
+
+DEFAULT_SERVER_TIMING_SAMPLE_RATE = 1.0
+DEFAULT_SERVER_TIMING_SINK = "apps.crud_common.timing.log_sink"
+
+# The names used in the Server-Timing header
+TIMING_NAMES = ("db", "template", "serialize")
+
+logger = logging.getLogger(__name__)
+
+_timings = ContextVar("crud_timings", default=None)
+
+
+def sample_rate():
+    return getattr(settings, "CRUD_SERVER_TIMING_SAMPLE_RATE", DEFAULT_SERVER_TIMING_SAMPLE_RATE)
+
+
+def server_timing_header():
+    """Whether to add the Server-Timing header, or only send the records to the sink."""
+    return getattr(settings, "CRUD_SERVER_TIMING_HEADER", True)
+
+
+def get_sink():
+    return import_string(getattr(settings, "CRUD_SERVER_TIMING_SINK", DEFAULT_SERVER_TIMING_SINK))
+
+
+class RequestTimings:
+    """The timings of one request, in seconds."""
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.durations = defaultdict(float)
+        self.queries = 0
+        # The time spent in nested timers, for each timer that's running
+        self._nested = []
+
+    @contextmanager
+    def timer(self, name):
+        start = perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - start
+            nested = self._nested.pop()
+            self.durations[name] += elapsed - nested
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def total(self):
+        return perf_counter() - self.start
+
+
+def current_timings():
+    """The timings of the request being run, or None if it isn't sampled."""
+    return _timings.get()
+
+
+def timed(name):
+    """Context manager that adds the time of its block to the request's timings, under name."""
+    timings = _timings.get()
+    return nullcontext() if timings is None else timings.timer(name)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    timings.queries += 1
+    with timings.timer("db"):
+        return execute(sql, params, many, context)
+
+
+def install_execute_wrapper(sender, connection, **kwargs):
+    """connection_created receiver (see apps.py)."""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed("template"):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with rendering timed. Use it as the BACKEND in TEMPLATES."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class TimedSerializerMixin:
+    """Mixin for a serializer: time its to_representation(). For a list, that's once per object."""
+
+    def to_representation(self, instance):
+        timings = _timings.get()
+        if timings is None:
+            return super().to_representation(instance)
+        with timings.timer("serialize"):
+            return super().to_representation(instance)
+
+
+def header_value(timings, total):
+    metrics = [f'db;desc="{timings.queries} queries";dur={timings.durations["db"] * 1000:.1f}']
+    metrics += [f"{name};dur={timings.durations[name] * 1000:.1f}" for name in TIMING_NAMES if name != "db"]
+    metrics.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(metrics)
+
+
+def make_record(request, response, timings, total):
+    match = request.resolver_match
+    return {
+        "method": request.method,
+        "path": request.path,
+        "view": match.view_name if match else None,
+        "status": response.status_code,
+        "total_ms": round(total * 1000, 1),
+        **{f"{name}_ms": round(timings.durations[name] * 1000, 1) for name in TIMING_NAMES},
+        "queries": timings.queries,
+    }
+
+
+def log_sink(record):
+    """The default sink: a log line with the record as JSON."""
+    logger.info(json.dumps(record))
+
+
+# The records collect_sink has kept, most recent last
+collected = deque(maxlen=1000)
+
+
+def collect_sink(record):
+    """A sink that keeps the last 1000 records in memory, in collected, e.g. to look at from a shell or a test."""
+    collected.append(record)
+
+
+class ServerTimingMiddleware:
+    """Times a sample of the requests. Put it first in MIDDLEWARE, so the total includes all the other middleware.
+    Works under WSGI and ASGI."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sink = get_sink()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        self._finish(request, response, timings)
+        return response
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timings.reset(token)
+        self._finish(request, response, timings)
+        return response
+
+    def _sampled(self):
+        rate = sample_rate()
+        return rate >= 1 or random.random() < rate
+
+    def _finish(self, request, response, timings):
+        total = timings.total()
+        if server_timing_header():
+            response["Server-Timing"] = header_value(timings, total)
+        self.sink(make_record(request, response, timings, total))
@@ -0,0 +1,54 @@
+from django.http import HttpResponseRedirect
+
+from .utils import auto_now_fields
+
+# Updates that only write the columns that changed.
+# A plain form.save() or serializer.save() writes every column of the row, including long text fields nobody
+# touched. These compare the submitted values with the loaded object, and save(update_fields=...) only the changed
+# fields (plus auto_now fields like updated_at). When nothing changed, nothing is written, and since no save signal
+# is sent, the caches and the search index are left alone too.
+
+
+def save_fields(instance, fields):
+    """Save only fields (and the auto_now fields) of an existing object, or nothing if fields is empty.
+    Returns True if it saved."""
+    if not fields:
+        return False
+    instance.save(update_fields=[*fields, *auto_now_fields(type(instance))])
+    return True
+
+
+def save_changed(form):
+    """Save a ModelForm's object like form.save() does, but for an existing object only write the fields whose
+    values changed (from form.changed_data). Returns the object."""
+    instance = form.save(commit=False)
+    if instance._state.adding:
+        instance.save()
+    else:
+        concrete = {field.name for field in instance._meta.concrete_fields}
+        save_fields(instance, [name for name in form.changed_data if name in concrete])
+    form.save_m2m()
+    return instance
+
+
+class SaveChangedFieldsMixin:
+    """Mixin for an UpdateView: save only the changed fields, see save_changed()."""
+
+    def form_valid(self, form):
+        self.object = save_changed(form)
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class SaveChangedFieldsSerializerMixin:
+    """Mixin for a ModelSerializer: update() (PUT and PATCH) only writes the fields whose values changed."""
+
+    def update(self, instance, validated_data):
+        concrete = {field.name for field in instance._meta.concrete_fields}
+        if not concrete.issuperset(validated_data):
+            # Relations to many and nested data need ModelSerializer's handling
+            return super().update(instance, validated_data)
+        changed = [name for name, value in validated_data.items() if getattr(instance, name) != value]
+        for name in changed:
+            setattr(instance, name, validated_data[name])
+        save_fields(instance, changed)
+        return instance
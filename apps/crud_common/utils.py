@@ -0,0 +1,16 @@
+# Small helpers shared by the crud_common modules
+
+
+def is_team_model(model):
+    """True if the model's objects belong to a team (i.e. it is a BaseTeamModel)."""
+    return any(field.name == "team" for field in model._meta.concrete_fields)
+
+
+def team_id_of(instance):
+    """The team id of an object, or 0 for objects that don't belong to a team."""
+    return getattr(instance, "team_id", None) or 0
+
+
+def auto_now_fields(model):
+    """Fields like updated_at, which save() sets, but bulk_update() and save(update_fields=...) only write if listed."""
+    return [field.name for field in model._meta.concrete_fields if getattr(field, "auto_now", False)]
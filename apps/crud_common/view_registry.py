@@ -0,0 +1,202 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+
+from apps.teams.models import Membership, Team
+from apps.teams.roles import ROLE_ADMIN
+
+from . import seeding
+from .utils import is_team_model
+
+# Every implementation of every view of the example apps, for the benchmarks (benchmarks.py) and the tests
+# (testing.py).
+# Each app registers its views with register_views(), from its AppConfig.ready(), so only the apps that are installed
+# are covered, and this module imports none of them.
+# Each app's urls.py only routes one implementation of each view, so ViewURLConf routes all of them, under
+# __benchmark__/, next to the project's own URLs (which the templates still need). ViewClient requests them through
+# the test client, as a logged-in team member.
+
+# app label -> its registration: the model, the views, and how to set up the user
+_registry = {}
+
+
+class RegisteredView:
+    """One implementation of one view, e.g. the htmx partial of the Thing list, and how to request it.
+    - detail: the URL takes the pk of an existing object
+    - data: form data for a POST, or None for a GET
+    - params: the query string of a GET, as a dict
+    - url_kwargs: more arguments of the URL, as a dict, e.g. {"perm_level": 4}
+    - new_object: the request changes or deletes the object, so each one gets a new object (made outside of what's
+      measured), which the data really changes
+    - htmx: send the headers of an htmx request for the object-list partial"""
+
+    def __init__(
+        self,
+        app,
+        view,
+        impl,
+        view_func,
+        model,
+        detail=False,
+        data=None,
+        params=None,
+        url_kwargs=None,
+        new_object=False,
+        htmx=False,
+    ):
+        self.app = app
+        self.view = view
+        self.impl = impl
+        self.view_func = view_func
+        self.model = model
+        self.detail = detail or new_object
+        self.data = data
+        self.params = params or {}
+        self.url_kwargs = url_kwargs or {}
+        self.new_object = new_object
+        self.htmx = htmx
+
+    @property
+    def name(self):
+        return f"{self.app}.{self.view}.{self.impl}"
+
+    @property
+    def url_name(self):
+        return f"benchmark-{self.app}-{self.view}-{self.impl}"
+
+    @property
+    def route(self):
+        team = "a/<slug:team_slug>/" if is_team_model(self.model) else ""
+        pk = "<int:pk>/" if self.detail else ""
+        kwargs = "".join(f"<{'int' if isinstance(v, int) else 'str'}:{k}>/" for k, v in self.url_kwargs.items())
+        return f"__benchmark__/{team}{self.app}/{self.view}/{self.impl}/{pk}{kwargs}"
+
+
+class _Registration:
+    def __init__(self, model, views, setup_user):
+        self.model = model
+        self.views = views
+        self.setup_user = setup_user
+
+
+def _views(app, model, impls, form_data, url_kwargs):
+    views = []
+    for (view, impl), view_func in impls.items():
+        if view == "list":
+            views.append(RegisteredView(app, view, impl, view_func, model))
+            if impl == "htmx":
+                views.append(RegisteredView(app, view, "htmx_partial", view_func, model, htmx=True))
+        elif view == "detail":
+            views.append(RegisteredView(app, view, impl, view_func, model, detail=True))
+        elif view == "create":
+            views.append(RegisteredView(app, "create_form", impl, view_func, model))
+            views.append(RegisteredView(app, view, impl, view_func, model, data=form_data))
+        elif view == "update":
+            views.append(RegisteredView(app, "update_form", impl, view_func, model, detail=True))
+            views.append(RegisteredView(app, view, impl, view_func, model, data=form_data, new_object=True))
+        elif view == "delete":
+            views.append(RegisteredView(app, view, impl, view_func, model, data={}, new_object=True))
+        elif view == "autocomplete":
+            views.append(RegisteredView(app, view, impl, view_func, model, params={"q": "a"}))
+        else:
+            detail = impl.endswith("retrieve")
+            views.append(RegisteredView(app, view, impl, view_func, model, detail, url_kwargs=url_kwargs.get(view)))
+    return views
+
+
+def register_views(app, model, impls, form_data, setup_user=None, url_kwargs=None):
+    """Register the usual views of one app.
+    - impls maps (view, implementation) names to the view, e.g. ("list", "htmx"): ThingListHtmxView.as_view().
+      The views are "list", "detail", "create", "update", "delete", "autocomplete", "api" (with "retrieve"
+      implementations taking a pk), and any other view that is a GET, e.g. "stats".
+    - form_data: valid data for the create and update forms
+    - setup_user: called with the user the views are requested as, e.g. to give it permissions
+    - url_kwargs: maps the names of other views to the arguments of their URLs, if they take any"""
+    _registry[app] = _Registration(model, _views(app, model, impls, form_data, url_kwargs or {}), setup_user)
+
+
+def registered_views(app=None):
+    """The registered views, of every app or of one."""
+    return [view for label, registration in _registry.items() if app in (None, label) for view in registration.views]
+
+
+def registered_models():
+    return [registration.model for registration in _registry.values()]
+
+
+class ViewURLConf:
+    """A URLconf (to use as ROOT_URLCONF) routing every registered view, and then the project's own URLs.
+    Made with the project's ROOT_URLCONF, before overriding it."""
+
+    def __init__(self, project_urlconf):
+        self.urlpatterns = [
+            *(path(view.route, view.view_func, name=view.url_name) for view in registered_views()),
+            path("", include(project_urlconf)),
+        ]
+
+
+class ViewError(Exception):
+    pass
+
+
+class ViewClient:
+    """Requests the registered views, in the current database (with ViewURLConf as the URLconf), as a new user who
+    is a member of a new team."""
+
+    def __init__(self):
+        user = get_user_model().objects.create_user(username="benchmark", email="benchmark@example.com")
+        self.team = Team.objects.create(name="Benchmark Team", slug="benchmark-team")
+        Membership.objects.create(team=self.team, user=user, role=ROLE_ADMIN)
+        for registration in _registry.values():
+            if registration.setup_user:
+                registration.setup_user(user)
+        self.client = Client()
+        self.client.force_login(user)
+        self.rows = 0
+
+    def seed(self, rows, seed=0):
+        """Add objects, so each model has rows objects (in the client's team, for the team models)."""
+        for model in registered_models():
+            team = self.team if is_team_model(model) else None
+            seeding.seed_objects(model, rows - self.rows, team=team, seed=seed + self.rows)
+        self.rows = rows
+
+    def _object(self, model):
+        return seeding.make_object(model, random.Random(self.rows), self.team)
+
+    def request(self, view):
+        """The request to make for the view, as a function of no arguments."""
+        kwargs = {"team_slug": self.team.slug} if is_team_model(view.model) else {}
+        obj = None
+        if view.new_object:
+            obj = self._object(view.model)
+            obj.save()
+        elif view.detail:
+            obj = view.model.objects.order_by("pk").first()
+        if obj is not None:
+            kwargs["pk"] = obj.pk
+        kwargs.update(view.url_kwargs)
+        url = reverse(view.url_name, kwargs=kwargs)
+        headers = {"HTTP_HX_REQUEST": "true", "HTTP_HX_TARGET": "object-list"} if view.htmx else {}
+        if view.data is None:
+            return lambda: self.client.get(url, view.params, **headers)
+        return lambda: self.client.post(url, view.data, **headers)
+
+    def capture_queries(self, view):
+        """The queries of one request (dicts of "sql" and "time"), after one request to warm up the caches."""
+        self.check(view, self.request(view)())
+        request = self.request(view)
+        with CaptureQueriesContext(connection) as queries:
+            self.check(view, request())
+        return queries.captured_queries
+
+    def count_queries(self, view):
+        return len(self.capture_queries(view))
+
+    def check(self, view, response):
+        if response.status_code >= 400:
+            raise ViewError(f"{view.name} returned {response.status_code}")
@@ -4,3 +4,41 @@ from django.apps import AppConfig
 class CrudExample1Config(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.crud_example1"
+
+    def ready(self):
+        from apps.crud_common.signals import track_model
+        from apps.crud_common.view_registry import register_views
+
+        from . import views
+        from .models import Thing
+
+        track_model(Thing, search_fields=["name", "notes"], tombstones=True, autocomplete_names=True)
+        # Every implementation of every view, for the benchmarks and the query budget and plan tests
+        # (see apps/crud_common/view_registry.py)
+        register_views(
+            self.label,
+            Thing,
+            {
+                ("list", "fbv"): views.thing_list_view,
+                ("list", "cbv"): views.ThingListView.as_view(),
+                ("list", "htmx"): views.ThingListHtmxView.as_view(),
+                ("list", "async_fbv"): views.thing_list_async_view,
+                ("list", "async_cbv"): views.ThingListAsyncView.as_view(),
+                ("detail", "fbv"): views.thing_detail_view,
+                ("detail", "cbv"): views.ThingDetailView.as_view(),
+                ("detail", "async_fbv"): views.thing_detail_async_view,
+                ("detail", "async_cbv"): views.ThingDetailAsyncView.as_view(),
+                ("create", "fbv"): views.thing_create_view,
+                ("create", "cbv"): views.ThingCreateView.as_view(),
+                ("update", "fbv"): views.thing_update_view,
+                ("update", "cbv"): views.ThingUpdateView.as_view(),
+                ("delete", "fbv"): views.thing_delete_view,
+                ("delete", "cbv"): views.ThingDeleteView.as_view(),
+                ("api", "list"): views.ThingViewSet.as_view({"get": "list"}),
+                ("api", "retrieve"): views.ThingViewSet.as_view({"get": "retrieve"}),
+                ("api", "async_list"): views.ThingAsyncAPIView.as_view(),
+                ("api", "async_retrieve"): views.ThingAsyncAPIView.as_view(),
+                ("autocomplete", "fbv"): views.thing_autocomplete_view,
+            },
+            form_data={"name": "Benchmark Thing", "number": 42, "notes": "Notes"},
+        )
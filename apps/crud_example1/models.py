@@ -18,3 +18,9 @@ class Thing(BaseModel):
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            # Serves the lists in order (by name, then id for the keyset pagination), without sorting the table
+            models.Index(fields=["name", "id"]),
+            # Serves the delta sync of the API (?since=), which reads the changes in (updated_at, id) order
+            models.Index(fields=["updated_at", "id"]),
+        ]
@@ -1,10 +1,16 @@
 from rest_framework import serializers
 
+from apps.crud_common.fieldsets import SparseFieldsetSerializerMixin
+from apps.crud_common.timing import TimedSerializerMixin
+from apps.crud_common.updates import SaveChangedFieldsSerializerMixin
+
 from .models import Thing
 
 
-# Used by the DRF views
-class ThingSerializer(serializers.ModelSerializer):
+# Used by the DRF views. Reads can ask for fewer fields with ?fields= or ?omit=, and updates only write what changed
+class ThingSerializer(
+    TimedSerializerMixin, SaveChangedFieldsSerializerMixin, SparseFieldsetSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Thing
         fields = ("id", "name", "number", "notes")
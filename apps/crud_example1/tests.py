@@ -1,3 +1,649 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, modify_settings, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.throttling import BaseThrottle
+
+from apps.crud_common import timing
+from apps.crud_common.benchmarks import BenchmarkRun, compare, load_baseline, result_key, save_baseline
+from apps.crud_common.budgets import QueryBudgetExceeded, get_query_budget
+from apps.crud_common.columns import EXCERPT_LENGTH
+from apps.crud_common.counts import CountingPaginator
+from apps.crud_common.fragment_cache import bump_version, get_version
+from apps.crud_common.models import Tombstone
+from apps.crud_common.pagination import CURSOR_PARAM, KeysetPaginator
+from apps.crud_common.replicas import PIN_COOKIE, ReplicaMiddleware, ReplicaRouter, read_from_primary_if_recent
+from apps.crud_common.seeding import seed_objects
+from apps.crud_common.sync import SINCE_PARAM, encode_token
+from apps.crud_common.testing import QueryBudgetTestMixin, QueryPlanTestMixin
+from apps.crud_common.view_registry import ViewURLConf, registered_views
+
+from . import views
+from .models import Thing
+
+
+def _cursor(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """Every view of crud_example1 stays within its query budget, at any number of objects."""
+
+    app = "crud_example1"
+
+
+class QueryPlanTests(QueryPlanTestMixin, TestCase):
+    """The list, detail and API queries of crud_example1 are served by indexes."""
+
+    app = "crud_example1"
+
+
+@modify_settings(MIDDLEWARE={"prepend": "apps.crud_common.budgets.QueryBudgetMiddleware"})
+class QueryBudgetMiddlewareTests(TestCase):
+    """QueryBudgetMiddleware warns about (or fails) a request that runs more queries than its view's budget."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="user")
+        cls.thing = Thing.objects.create(name="Thing")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse("crud_example1:thing_detail", kwargs={"pk": self.thing.pk})
+
+    def test_budgets_of_each_kind_of_view(self):
+        self.assertEqual(get_query_budget(views.thing_detail_view), views.DETAIL_QUERY_BUDGET)
+        self.assertEqual(get_query_budget(views.ThingDetailView.as_view()), views.DETAIL_QUERY_BUDGET)
+        self.assertEqual(get_query_budget(views.ThingViewSet.as_view({"get": "list"})), views.API_QUERY_BUDGET)
+        self.assertIsNone(get_query_budget(views.thing_export_view))
+        with self.settings(CRUD_QUERY_BUDGET_EXTRA=2):
+            self.assertEqual(get_query_budget(views.thing_detail_view), views.DETAIL_QUERY_BUDGET + 2)
+
+    def test_within_budget(self):
+        with self.assertNoLogs("apps.crud_common.budgets"):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @mock.patch.object(views.thing_detail_view, "query_budget", 0)
+    def test_over_budget(self):
+        with self.assertLogs("apps.crud_common.budgets", "WARNING") as logs:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertIn(f"GET {self.url} ran", logs.output[0])
+        with self.settings(CRUD_QUERY_BUDGET_RAISE=True), self.assertRaises(QueryBudgetExceeded):
+            self.client.get(self.url)
+
+
+@modify_settings(MIDDLEWARE={"prepend": "apps.crud_common.timing.ServerTimingMiddleware"})
+@override_settings(
+    CRUD_SERVER_TIMING_SINK="apps.crud_common.timing.collect_sink",
+    TEMPLATES=[{**settings.TEMPLATES[0], "BACKEND": "apps.crud_common.timing.TimedDjangoTemplates"}],
+)
+class ServerTimingTests(TestCase):
+    """ServerTimingMiddleware adds a Server-Timing header with the time spent in the database, templates and
+    serializers, and sends the same as a record to the sink."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="user")
+        cls.thing = Thing.objects.create(name="Thing")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        timing.collected.clear()
+
+    def test_api(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("crud_example1:thing-list"))
+        self.assertIn(f'db;desc="{len(queries)} queries";dur=', response["Server-Timing"])
+        for name in ("template", "serialize", "total"):
+            self.assertIn(f"{name};dur=", response["Server-Timing"])
+        [record] = timing.collected
+        self.assertEqual(record["view"], "crud_example1:thing-list")
+        self.assertEqual((record["method"], record["status"], record["queries"]), ("GET", 200, len(queries)))
+        self.assertLessEqual(record["db_ms"] + record["template_ms"] + record["serialize_ms"], record["total_ms"])
+
+    def test_page(self):
+        self.client.get(reverse("crud_example1:thing_list"))
+        [record] = timing.collected
+        self.assertGreater(record["template_ms"], 0)
+        self.assertEqual(record["serialize_ms"], 0)
+
+    @override_settings(CRUD_SERVER_TIMING_HEADER=False)
+    def test_without_header(self):
+        response = self.client.get(reverse("crud_example1:thing-list"))
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(len(timing.collected), 1)
+
+    @override_settings(CRUD_SERVER_TIMING_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        response = self.client.get(reverse("crud_example1:thing-list"))
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(len(timing.collected), 0)
+
+    def test_nested_times_are_exclusive(self):
+        timings = timing.RequestTimings()
+        with timings.timer("template"):
+            with timings.timer("db"):
+                time.sleep(0.01)
+        self.assertGreaterEqual(timings.durations["db"], 0.01)
+        self.assertLess(timings.durations["template"], 0.01)
+
+
+class KeysetPaginationTests(TestCase):
+    """KeysetPaginator pages through the Things in (name, id) order, and treats a bad cursor as no cursor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Two of each name, so the id breaks the ties
+        for name in "abcde":
+            Thing.objects.create(name=name)
+            Thing.objects.create(name=name)
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(Thing.objects.all(), 4)
+
+    def test_pages_forwards_and_backwards(self):
+        expected = list(Thing.objects.order_by("name", "id"))
+        first = self.paginator.page()
+        second = self.paginator.page(first.next_cursor)
+        third = self.paginator.page(second.next_cursor)
+        self.assertEqual([*first, *second, *third], expected)
+        self.assertFalse(first.has_previous())
+        self.assertFalse(third.has_next())
+        self.assertEqual(list(self.paginator.page(third.previous_cursor)), list(second))
+
+    def test_bad_cursors_give_the_first_page(self):
+        first = list(self.paginator.page())
+        for cursor in (
+            "not a cursor",
+            _cursor({"p": ["a"], "b": False}),
+            _cursor({"p": ["a", "x"], "b": False}),
+            _cursor({"p": ["a", None], "b": False}),
+            _cursor({"p": [None, 1], "b": False}),
+            _cursor({"p": ["a", [1]], "b": False}),
+        ):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(list(self.paginator.page(cursor)), first)
+
+    @mock.patch.object(views, "KEYSET_PAGINATION", True)
+    def test_list_view_with_a_tampered_cursor(self):
+        self.client.force_login(get_user_model().objects.create_user(username="user"))
+        cursor = _cursor({"p": ["a", "x"], "b": False})
+        response = self.client.get(reverse("crud_example1:thing_list"), {CURSOR_PARAM: cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["object_list"]), list(Thing.objects.order_by("name", "id")[:4]))
+
+
+@override_settings(CRUD_API_PAGE_SIZE=2, CRUD_API_MAX_PAGE_SIZE=3)
+class APIPaginationTests(TestCase):
+    """api/things/ lists the Things in (name, id) order, CRUD_API_PAGE_SIZE at a time, following the cursors."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="user")
+        for name in ("e", "d", "c", "b", "a"):
+            Thing.objects.create(name=name)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse("crud_example1:thing-list")
+
+    def _names(self, data):
+        return [thing["name"] for thing in data["results"]]
+
+    def test_pages(self):
+        first = self.client.get(self.url).json()
+        self.assertEqual(self._names(first), ["a", "b"])
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).json()
+        self.assertEqual(self._names(second), ["c", "d"])
+        third = self.client.get(second["next"]).json()
+        self.assertEqual(self._names(third), ["e"])
+        self.assertIsNone(third["next"])
+        self.assertEqual(self._names(self.client.get(third["previous"]).json()), ["c", "d"])
+
+    def test_page_size(self):
+        self.assertEqual(self._names(self.client.get(self.url, {"page_size": 1}).json()), ["a"])
+        # No more than CRUD_API_MAX_PAGE_SIZE
+        self.assertEqual(self._names(self.client.get(self.url, {"page_size": 100}).json()), ["a", "b", "c"])
+        self.assertEqual(self._names(self.client.get(self.url, {"page_size": "x"}).json()), ["a", "b"])
+
+
+class SparseFieldsetTests(TestCase):
+    """The API returns and loads only the fields asked for with ?fields= and ?omit=, and the list pages load
+    excerpts of the notes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="user")
+        cls.thing = Thing.objects.create(name="Thing", number=1, notes="x" * 1000)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _get(self, url, params):
+        """The response, and the SQL of the queries of the Things."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        return response, [query["sql"] for query in queries if "crud_example1_thing" in query["sql"]]
+
+    def test_fields(self):
+        url = reverse("crud_example1:thing-detail", kwargs={"pk": self.thing.pk})
+        response, queries = self._get(url, {"fields": "id,name"})
+        self.assertEqual(response.json(), {"id": self.thing.pk, "name": "Thing"})
+        self.assertTrue(queries)
+        self.assertFalse([sql for sql in queries if '"notes"' in sql])
+
+    def test_omit(self):
+        response, queries = self._get(reverse("crud_example1:thing-list"), {"omit": "notes"})
+        self.assertEqual(response.json()["results"], [{"id": self.thing.pk, "name": "Thing", "number": 1}])
+        self.assertFalse([sql for sql in queries if '"notes"' in sql])
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse("crud_example1:thing-list"), {"fields": "id,secret"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"fields": ["Unknown field(s): secret"]})
+
+    def test_writes_use_every_field(self):
+        url = reverse("crud_example1:thing-detail", kwargs={"pk": self.thing.pk})
+        response = self.client.patch(f"{url}?fields=id", {"number": 2}, "application/json")
+        self.assertEqual(response.json()["number"], 2)
+
+    def test_list_page_loads_an_excerpt(self):
+        response = self.client.get(reverse("crud_example1:thing_list"))
+        thing = response.context["object_list"][0]
+        self.assertIn("notes", thing.get_deferred_fields())
+        self.assertEqual(len(thing.notes_excerpt), EXCERPT_LENGTH + 1)
+
+
+class SaveChangedFieldsTests(TestCase):
+    """The update view and the API's PUT and PATCH only write the columns that changed, and nothing when none did."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="user")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.thing = Thing.objects.create(name="Thing", number=1, notes="Notes")
+
+    def _updates(self, request):
+        """The response, and the UPDATE statements of the Thing it ran."""
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        updates = [query["sql"] for query in queries if query["sql"].startswith('UPDATE "crud_example1_thing"')]
+        return response, updates
+
+    def _form(self, **data):
+        url = reverse("crud_example1:thing_update", kwargs={"pk": self.thing.pk})
+        return self._updates(lambda: self.client.post(url, {"name": "Thing", "number": 1, "notes": "Notes", **data}))
+
+    def _api(self, method, data):
+        url = reverse("crud_example1:thing-detail", kwargs={"pk": self.thing.pk})
+        return self._updates(lambda: getattr(self.client, method)(url, data, "application/json"))
+
+    def assertOnlyWrites(self, sql, fields):
+        columns = set(re.findall(r'"(\w+)" = ', sql.split(" WHERE ")[0]))
+        self.assertEqual(columns, {*fields, "updated_at"})
+
+    def test_update_view(self):
+        response, updates = self._form(number=2)
+        self.assertEqual(response.status_code, 302)
+        [sql] = updates
+        self.assertOnlyWrites(sql, ["number"])
+        self.thing.refresh_from_db()
+        self.assertEqual((self.thing.name, self.thing.number, self.thing.notes), ("Thing", 2, "Notes"))
+
+    def test_update_view_without_changes(self):
+        updated_at = self.thing.updated_at
+        response, updates = self._form()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(updates, [])
+        self.thing.refresh_from_db()
+        self.assertEqual(self.thing.updated_at, updated_at)
+
+    def test_api(self):
+        response, updates = self._api("patch", {"name": "Renamed", "number": 1})
+        self.assertEqual(response.json()["name"], "Renamed")
+        [sql] = updates
+        self.assertOnlyWrites(sql, ["name"])
+        response, updates = self._api("put", {"name": "Renamed", "number": 1, "notes": "Notes"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(updates, [])
+
+
+class ConditionalViewSetTests(TestCase):
+    """The API's ETags are shared between users for JSON, but not for the browsable API's HTML."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.thing = Thing.objects.create(name="Thing")
+        cls.alice = get_user_model().objects.create_user(username="alice")
+        cls.bob = get_user_model().objects.create_user(username="bob")
+
+    def _get(self, user, accept, etag=None):
+        self.client.force_login(user)
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        url = reverse("crud_example1:thing-detail", kwargs={"pk": self.thing.pk})
+        return self.client.get(url, HTTP_ACCEPT=accept, **headers)
+
+    def test_json_etag_is_shared(self):
+        etag = self._get(self.alice, "application/json")["ETag"]
+        self.assertEqual(self._get(self.bob, "application/json", etag).status_code, 304)
+
+    def test_html_etag_is_per_user(self):
+        response = self._get(self.alice, "text/html")
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertEqual(self._get(self.alice, "text/html", etag).status_code, 304)
+        self.assertEqual(self._get(self.bob, "text/html", etag).status_code, 200)
+        self.assertEqual(self._get(self.alice, "application/json", etag).status_code, 200)
+
+
+class BulkViewSetTests(TestCase):
+    """api/things/bulk/ creates, updates and deletes whole batches, all or nothing."""
+
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user(username="user"))
+        self.url = reverse("crud_example1:thing-bulk")
+
+    def test_create(self):
+        response = self.client.post(self.url, [{"name": "One"}, {"name": "Two", "number": 2}], "application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sorted(Thing.objects.values_list("name", "number")), [("One", 0), ("Two", 2)])
+
+    @mock.patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False)
+    def test_create_without_returned_ids(self):
+        # Like MySQL: the objects are saved one at a time, so they have their ids
+        response = self.client.post(self.url, [{"name": "Red one"}, {"name": "Two"}], "application/json")
+        self.assertEqual(response.status_code, 201)
+        ids = [thing["id"] for thing in response.json()]
+        self.assertEqual(ids, list(Thing.objects.order_by("name").values_list("pk", flat=True)))
+        response = self.client.get(reverse("crud_example1:thing-list"), {"q": "red"})
+        self.assertEqual([thing["id"] for thing in response.json()["results"]], ids[:1])
+
+    def test_create_is_all_or_nothing(self):
+        response = self.client.post(self.url, [{"name": "One"}, {"number": 2}], "application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"][0], {})
+        self.assertIn("name", response.json()["errors"][1])
+        self.assertFalse(Thing.objects.exists())
+
+    def test_update(self):
+        one, two = Thing.objects.create(name="One"), Thing.objects.create(name="Two")
+        items = [{"id": one.pk, "number": 1}, {"id": two.pk, "name": "Deux"}]
+        response = self.client.patch(self.url, items, "application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(Thing.objects.values_list("name", "number")), [("Deux", 0), ("One", 1)])
+
+    def test_delete(self):
+        one, two, three = (Thing.objects.create(name=name) for name in ("One", "Two", "Three"))
+        response = self.client.delete(self.url, {"ids": [one.pk, three.pk]}, "application/json")
+        self.assertEqual(response.json(), {"deleted": 2})
+        self.assertEqual(list(Thing.objects.all()), [two])
+        # Deleted objects leave tombstones for the delta sync
+        self.assertEqual(sorted(Tombstone.objects.values_list("object_id", flat=True)), [one.pk, three.pk])
+
+    def test_delete_with_missing_ids_deletes_nothing(self):
+        thing = Thing.objects.create(name="One")
+        response = self.client.delete(self.url, {"ids": [thing.pk, thing.pk + 1]}, "application/json")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"missing": [thing.pk + 1]})
+        self.assertTrue(Thing.objects.filter(pk=thing.pk).exists())
+
+    def test_ids_must_be_integers(self):
+        thing = Thing.objects.create(name="One")
+        for ids in ([True], [thing.pk, False], ["1"], [1.0], "1", [thing.pk, thing.pk]):
+            with self.subTest(ids=ids):
+                response = self.client.delete(self.url, {"ids": ids}, "application/json")
+                self.assertEqual(response.status_code, 400)
+        self.assertTrue(Thing.objects.filter(pk=thing.pk).exists())
+
+
+@override_settings(CRUD_SYNC_OVERLAP_SECONDS=0)
+class DeltaSyncTests(TestCase):
+    """api/things/?since= lists the Things changed and deleted since the token, a page at a time."""
+
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user(username="user"))
+        self.url = reverse("crud_example1:thing-list")
+
+    def _sync(self, since="", **params):
+        return self.client.get(self.url, {SINCE_PARAM: since, **params})
+
+    def _names(self, response):
+        return sorted(thing["name"] for thing in response.json()["results"])
+
+    def test_changes_and_deletions(self):
+        one, two = Thing.objects.create(name="One"), Thing.objects.create(name="Two")
+        first = self._sync().json()
+        self.assertEqual(self._names(self._sync()), ["One", "Two"])
+        self.assertEqual(first["deleted"], [])
+
+        two.name = "Deux"
+        two.save()
+        one_pk = one.pk
+        one.delete()
+        response = self._sync(first[SINCE_PARAM])
+        self.assertEqual(self._names(response), ["Deux"])
+        self.assertEqual(response.json()["deleted"], [one_pk])
+
+        response = self._sync(response.json()[SINCE_PARAM])
+        self.assertEqual(response.json()["results"], [])
+        self.assertEqual(response.json()["deleted"], [])
+
+    @override_settings(CRUD_SYNC_OVERLAP_SECONDS=60)
+    def test_recent_changes_are_sent_again(self):
+        Thing.objects.create(name="One")
+        token = self._sync().json()[SINCE_PARAM]
+        # A transaction committing late could still add changes from the last minute, so they are sent again
+        self.assertEqual(self._names(self._sync(token)), ["One"])
+
+    def test_pages(self):
+        for name in ("One", "Two", "Three"):
+            Thing.objects.create(name=name)
+        first = self._sync(page_size=2).json()
+        self.assertEqual(len(first["results"]), 2)
+        self.assertTrue(first["more"])
+        second = self._sync(first[SINCE_PARAM], page_size=2).json()
+        self.assertEqual(len(second["results"]), 1)
+        self.assertFalse(second["more"])
+        names = [thing["name"] for thing in first["results"] + second["results"]]
+        self.assertEqual(sorted(names), ["One", "Three", "Two"])
+
+    def test_old_token_is_gone(self):
+        old = timezone.now() - timedelta(days=31)
+        response = self._sync(encode_token((old, 0), (old, 0)))
+        self.assertEqual(response.status_code, 410)
+
+    def test_bad_tokens(self):
+        now = timezone.now().isoformat()
+        naive = timezone.now().replace(tzinfo=None).isoformat()
+        for data in (
+            {"changed": [now, 0], "deleted": None},
+            {"changed": None, "deleted": [now, 0]},
+            {"changed": [now, 0], "deleted": [naive, 0]},
+            {"changed": [now, 0], "deleted": [now, "x"]},
+            {"changed": [now, 0]},
+            [],
+        ):
+            with self.subTest(data=data):
+                response = self._sync(_cursor(data))
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {SINCE_PARAM: ["Invalid token."]})
+        self.assertEqual(self._sync("not a token").status_code, 400)
+
+
+@override_settings(CRUD_EXACT_COUNT_LIMIT=3)
+class SeedingTests(TestCase):
+    """Seeding without bookkeeping still keeps the cached row counts, which CountingPaginator trusts once they are
+    at CRUD_EXACT_COUNT_LIMIT."""
+
+    def _count(self):
+        return CountingPaginator(Thing.objects.all(), 10).count
+
+    def test_counts_are_kept_without_bookkeeping(self):
+        seed_objects(Thing, 3)
+        self.assertEqual(self._count(), 3)
+        seed_objects(Thing, 4, seed=1, bookkeeping=False)
+        self.assertEqual(Thing.objects.count(), 7)
+        self.assertEqual(self._count(), 7)
+
+
+class BenchmarkTests(TestCase):
+    """BenchmarkRun requests the registered views and measures them, and compare() flags what got worse than the
+    baseline."""
+
+    def setUp(self):
+        urlconf = override_settings(ROOT_URLCONF=ViewURLConf(settings.ROOT_URLCONF))
+        urlconf.enable()
+        self.addCleanup(urlconf.disable)
+
+    def test_run(self):
+        run = BenchmarkRun(requests=3, warmup=1)
+        run.seed(5)
+        self.assertEqual(Thing.objects.count(), 5)
+        for view in registered_views("crud_example1"):
+            with self.subTest(view.name):
+                result = run.run(view)
+                self.assertLessEqual(result["p50"], result["p99"])
+                self.assertGreater(result["queries"], 0)
+                self.assertGreater(result["peak_kb"], 0)
+
+    def test_compare(self):
+        baseline = {"p50": 10.0, "queries": 3}
+        self.assertEqual(compare({"p50": 11.0, "queries": 3}, baseline, 0.2), [])
+        self.assertEqual(compare({"p50": 13.0, "queries": 3}, None, 0.2), [])
+        worse = compare({"p50": 13.0, "queries": 4}, baseline, 0.2)
+        self.assertEqual(worse, ["p50 10.00 -> 13.00 ms", "queries 3 -> 4"])
+
+    def test_baseline_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "views.json")
+            self.assertEqual(load_baseline(path), {})
+            results = {result_key("crud_example1.list.htmx", 10): {"p50": 1.5, "queries": 2}}
+            save_baseline(path, results)
+            self.assertEqual(load_baseline(path), results)
+
+
+@override_settings(CRUD_REPLICA_DATABASES=["replica"])
+class ReplicaTests(TestCase):
+    """ReplicaMiddleware lets GETs read Things from the replica, except right after a write, or when they fill a
+    cache with a recent version stamp."""
+
+    def _database(self, method="GET", cookies=None, view=None):
+        """The database the request reads Things from (after view(), if given), and the response."""
+        used = []
+
+        def get_response(request):
+            if view:
+                view()
+            used.append(ReplicaRouter().db_for_read(Thing) or "default")
+            return HttpResponse()
+
+        request = RequestFactory().generic(method, "/")
+        request.COOKIES.update(cookies or {})
+        response = ReplicaMiddleware(get_response)(request)
+        return used[0], response
+
+    def test_get_reads_from_the_replica(self):
+        self.assertEqual(self._database()[0], "replica")
+
+    def test_write_pins_to_the_primary(self):
+        database, response = self._database("POST")
+        self.assertEqual(database, "default")
+        cookies = {PIN_COOKIE: response.cookies[PIN_COOKIE].value}
+        self.assertEqual(self._database(cookies=cookies)[0], "default")
+        self.assertEqual(self._database(cookies={PIN_COOKIE: str(time.time() - 1)})[0], "replica")
+
+    def test_get_version_does_not_route(self):
+        bump_version(Thing)
+        self.assertEqual(self._database(view=lambda: get_version(Thing))[0], "replica")
+
+    def test_recent_version_reads_from_the_primary(self):
+        def view():
+            read_from_primary_if_recent(get_version(Thing))
+
+        bump_version(Thing)
+        self.assertEqual(self._database(view=view)[0], "default")
+        old = time.time_ns() - 60 * 1_000_000_000
+        self.assertEqual(self._database(view=lambda: read_from_primary_if_recent(old))[0], "replica")
+
+
+class NoRequestsThrottle(BaseThrottle):
+    def allow_request(self, request, view):
+        return False
+
+    def wait(self):
+        return 30
+
+
+class AsyncAPITests(TestCase):
+    """ThingAsyncAPIView lists and retrieves Things, with the authentication, permissions and throttles of
+    ThingViewSet."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="user", password="password")
+        cls.things = [Thing.objects.create(name=name) for name in ("One", "Three", "Two")]
+
+    def setUp(self):
+        # The async API isn't routed by urls.py, so use the routes of every view (see view_registry.py)
+        urlconf = override_settings(ROOT_URLCONF=ViewURLConf(settings.ROOT_URLCONF))
+        urlconf.enable()
+        self.addCleanup(urlconf.disable)
+        self.list_url = reverse("benchmark-crud_example1-api-async_list")
+
+    def test_list_and_retrieve(self):
+        self.client.force_login(self.user)
+        first = self.client.get(self.list_url, {"page_size": 2}).json()
+        self.assertEqual([thing["name"] for thing in first["results"]], ["One", "Three"])
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([thing["name"] for thing in second["results"]], ["Two"])
+        self.assertIsNone(second["next"])
+
+        url = reverse("benchmark-crud_example1-api-async_retrieve", kwargs={"pk": self.things[0].pk})
+        self.assertEqual(self.client.get(url).json()["name"], "One")
+        url = reverse("benchmark-crud_example1-api-async_retrieve", kwargs={"pk": self.things[-1].pk + 1})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_only_get(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post(self.list_url, {"name": "Four"}).status_code, 405)
+
+    def test_unauthenticated(self):
+        # SessionAuthentication has no WWW-Authenticate challenge, so like the viewset, it's a 403 and not a redirect
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("detail", response.json())
+
+    @mock.patch.object(views.ThingViewSet, "authentication_classes", [BasicAuthentication, SessionAuthentication])
+    def test_api_client(self):
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(response["WWW-Authenticate"].startswith("Basic"))
+        credentials = base64.b64encode(b"user:password").decode()
+        response = self.client.get(self.list_url, HTTP_AUTHORIZATION=f"Basic {credentials}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 3)
+
+    @mock.patch.object(views.ThingViewSet, "throttle_classes", [NoRequestsThrottle])
+    def test_throttled(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
@@ -30,6 +30,23 @@ urlpatterns = [
     #  URL path for the htmx pagination implementation of a CBV list
     #
     # path("", views.ThingListHtmxView.as_view(), name="thing_list"),
+    #
+    # URL paths for the async implementation, for when the site is served with ASGI
+    #
+    # path("", views.thing_list_async_view, name="thing_list"),
+    # path("<int:pk>/", views.thing_detail_async_view, name="thing_detail"),
+    # path("", views.ThingListAsyncView.as_view(), name="thing_list"),
+    # path("<int:pk>/", views.ThingDetailAsyncView.as_view(), name="thing_detail"),
+    #
+    # Async API list and retrieve, next to the viewset's URLs rather than over them: they only answer GET, without
+    # the viewset's extras (bulk/, lookup/, ?since=, ?ids=, ?q=, ?fields=, see AsyncModelAPIView)
+    # path("api/async/things/", views.ThingAsyncAPIView.as_view(), name="thing-async-list"),
+    # path("api/async/things/<int:pk>/", views.ThingAsyncAPIView.as_view(), name="thing-async-detail"),
+    #
+    # Streaming export of all Things, as NDJSON or CSV
+    path("export/", views.thing_export_view, name="thing_export"),
+    # Names starting with ?q=, for the type-ahead box on the lists
+    path("autocomplete/", views.thing_autocomplete_view, name="thing_autocomplete"),
 ]
 
 # drf config
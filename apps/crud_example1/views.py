@@ -1,12 +1,47 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.core.paginator import EmptyPage, PageNotAnInteger
 from django.http.response import HttpResponseRedirect
-from django.shortcuts import get_object_or_404, render
+from django.shortcuts import aget_object_or_404, get_object_or_404, render
+from django.template.response import TemplateResponse
 from django.urls import reverse, reverse_lazy
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
 from rest_framework import viewsets
 
+from apps.crud_common.async_views import (
+    AsyncDetailView,
+    AsyncListView,
+    AsyncLoginRequiredMixin,
+    AsyncModelAPIView,
+    apage,
+    async_login_required,
+)
+from apps.crud_common.autocomplete import autocomplete_response
+from apps.crud_common.budgets import query_budget
+from apps.crud_common.bulk import BulkViewSetMixin
+from apps.crud_common.columns import ListColumnsMixin, only_columns
+from apps.crud_common.conditional import (
+    AsyncConditionalGetMixin,
+    ConditionalGetMixin,
+    ConditionalViewSetMixin,
+    conditional_get,
+)
+from apps.crud_common.counts import CountingPaginator
+from apps.crud_common.export import export_response
+from apps.crud_common.fieldsets import SparseFieldsetViewSetMixin
+from apps.crud_common.fragment_cache import FragmentCacheMixin
+from apps.crud_common.pagination import CURSOR_PARAM, KeysetPaginator, ListPaginationMixin, NameCursorPagination
+from apps.crud_common.search import (
+    AsyncSearchMixin,
+    SearchMixin,
+    SearchViewSetMixin,
+    asearch_queryset,
+    search_query,
+    search_queryset,
+)
+from apps.crud_common.sync import DeltaSyncViewSetMixin
+from apps.crud_common.updates import SaveChangedFieldsMixin, save_changed
+
 from .forms import ThingForm
 from .models import Thing
 from .serializers import ThingSerializer
@@ -19,37 +54,76 @@ PAGINATE_BY = 4
 # For pagination, we use get_elided_page_range() to give a list of pages that always has some
 # pages at the beginning and end, and some on either side of current, with ellipsis where needed.
 
+# Set KEYSET_PAGINATION to True to page by seeking on (name, id) with opaque next/previous cursors, instead of by
+# page number. Deep pages then cost the same as the first page, at the price of having no numbered page links.
+KEYSET_PAGINATION = False
+
+# The columns the list pages show, which are all they load. The notes are shown as an excerpt, so the full text
+# never leaves the database (updated_at is part of the row cache key). See apps/crud_common/columns.py
+LIST_COLUMNS = ["name", "number", "updated_at"]
+LIST_EXCERPTS = ["notes"]
+
+# The fields included in an export
+EXPORT_FIELDS = ["id", "name", "number", "notes", "created_at", "updated_at"]
+
+# Query budgets: the most queries each kind of view may run, however many objects there are. Each is the most that
+# QueryBudgetTests measured for that kind of view, plus one to spare. They include looking up the session and the
+# user. See apps/crud_common/budgets.py
+LIST_QUERY_BUDGET = 6
+DETAIL_QUERY_BUDGET = 4
+FORM_QUERY_BUDGET = 7
+DELETE_QUERY_BUDGET = 8
+API_QUERY_BUDGET = 4
+OTHER_QUERY_BUDGET = 3
+
 # --------------------------------------------------------------------------------
 
 # Thing (non-team-specific CRUD example) Function-Based View implementation
 
 
+@query_budget(LIST_QUERY_BUDGET)
 @login_required
 def thing_list_view(request):
     """Function-Based View list of Things."""
     context = {}
 
-    thing_list = Thing.objects.all()
-
-    paginator = Paginator(thing_list, PAGINATE_BY)
-    page = request.GET.get("page", 1)
-    try:
-        page = paginator.page(page)
-    except PageNotAnInteger:
-        page = paginator.page(1)
-    except EmptyPage:
-        page = paginator.page(paginator.num_pages)
+    # Load only the columns the list shows
+    thing_list = only_columns(Thing.objects.all(), LIST_COLUMNS, LIST_EXCERPTS)
+
+    # Narrow the list down to the ?q= search results, if any, best match first
+    query = search_query(request)
+    if query:
+        thing_list = search_queryset(thing_list, query)
+
+    if KEYSET_PAGINATION and not query:
+        page = KeysetPaginator(thing_list, PAGINATE_BY).page(request.GET.get(CURSOR_PARAM))
+    else:
+        # Things aren't filtered at all, so once there are a lot of them we can use the database's row estimate.
+        # Search results are in rank order (so they don't get keyset pages), and are counted exactly
+        paginator = CountingPaginator(thing_list, PAGINATE_BY, estimate=not query, counted=not query)
+        page = request.GET.get("page", 1)
+        try:
+            page = paginator.page(page)
+        except PageNotAnInteger:
+            page = paginator.page(1)
+        except EmptyPage:
+            page = paginator.page(paginator.num_pages)
 
     # Lets crud_example_nav.html highlight "Things" in the nav-bar
     context["active_tab"] = "crud_example1"
+    context["search_query"] = query
     context["page_obj"] = page
     context["object_list"] = page.object_list
     context["is_paginated"] = page.has_other_pages
-    context["elided_page_range"] = list(paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1))
+    context["elided_page_range"] = list(
+        page.paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1)
+    )
     return render(request, "crud_example1/thing_list.html", context)
 
 
+@query_budget(DETAIL_QUERY_BUDGET)
 @login_required
+@conditional_get(Thing)
 def thing_detail_view(request, pk):
     """Function-Based View to see Thing details."""
     context = {}
@@ -59,6 +133,7 @@ def thing_detail_view(request, pk):
     return render(request, "crud_example1/thing_detail.html", context)
 
 
+@query_budget(FORM_QUERY_BUDGET)
 @login_required
 def thing_create_view(request):
     """Function-Based View to create a Thing."""
@@ -73,6 +148,7 @@ def thing_create_view(request):
     return render(request, "crud_example1/thing_form.html", context)
 
 
+@query_budget(FORM_QUERY_BUDGET)
 @login_required
 def thing_update_view(request, pk):
     """Function-Based View to update a Thing."""
@@ -80,7 +156,7 @@ def thing_update_view(request, pk):
     obj = get_object_or_404(Thing, id=pk)
     form = ThingForm(request.POST or None, instance=obj)
     if form.is_valid():
-        form.save()
+        save_changed(form)
         return HttpResponseRedirect(reverse("crud_example1:thing_detail", kwargs={"pk": pk}))
     # Lets crud_example_nav.html highlight "Things" in the nav-bar
     context["active_tab"] = "crud_example1"
@@ -89,6 +165,7 @@ def thing_update_view(request, pk):
     return render(request, "crud_example1/thing_form.html", context)
 
 
+@query_budget(DELETE_QUERY_BUDGET)
 @login_required
 def thing_delete_view(request, pk):
     """Function-Based View to delete a Thing."""
@@ -97,16 +174,34 @@ def thing_delete_view(request, pk):
     return HttpResponseRedirect(reverse("crud_example1:thing_list"))
 
 
+@login_required
+def thing_export_view(request):
+    """Function-Based View to download all Things, streamed as NDJSON or CSV."""
+    return export_response(request, Thing.objects.all(), EXPORT_FIELDS, "things")
+
+
+@query_budget(OTHER_QUERY_BUDGET)
+@login_required
+def thing_autocomplete_view(request):
+    """Function-Based View completing Thing names for the type-ahead box (see apps/crud_common/autocomplete.py)."""
+    return autocomplete_response(request, Thing.objects.all(), "crud_example1:thing_detail")
+
+
 # --------------------------------------------------------------------------------
 
 # Thing (non-team-specific CRUD example) Class-Based View implementation
 
 
-class ThingListView(LoginRequiredMixin, ListView):
+class ThingListView(LoginRequiredMixin, ListPaginationMixin, ListColumnsMixin, SearchMixin, ListView):
     """Class-Based View list of Things."""
 
     model = Thing
     paginate_by = PAGINATE_BY
+    keyset_pagination = KEYSET_PAGINATION
+    list_columns = LIST_COLUMNS
+    list_excerpts = LIST_EXCERPTS
+    estimate_count = True
+    query_budget = LIST_QUERY_BUDGET
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -119,10 +214,11 @@ class ThingListView(LoginRequiredMixin, ListView):
         return context
 
 
-class ThingDetailView(LoginRequiredMixin, DetailView):
+class ThingDetailView(LoginRequiredMixin, ConditionalGetMixin, DetailView):
     """Class-Based View to see Thing details."""
 
     model = Thing
+    query_budget = DETAIL_QUERY_BUDGET
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -135,6 +231,7 @@ class ThingCreateView(LoginRequiredMixin, CreateView):
 
     model = Thing
     form_class = ThingForm
+    query_budget = FORM_QUERY_BUDGET
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -142,11 +239,12 @@ class ThingCreateView(LoginRequiredMixin, CreateView):
         return context
 
 
-class ThingUpdateView(LoginRequiredMixin, UpdateView):
+class ThingUpdateView(LoginRequiredMixin, SaveChangedFieldsMixin, UpdateView):
     """Class-Based View to update a Thing."""
 
     model = Thing
     form_class = ThingForm
+    query_budget = FORM_QUERY_BUDGET
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -159,6 +257,7 @@ class ThingDeleteView(LoginRequiredMixin, DeleteView):
 
     model = Thing
     success_url = reverse_lazy("crud_example1:thing_list")
+    query_budget = DELETE_QUERY_BUDGET
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -166,15 +265,23 @@ class ThingDeleteView(LoginRequiredMixin, DeleteView):
         return context
 
 
-class ThingListHtmxView(LoginRequiredMixin, ListView):
+class ThingListHtmxView(
+    LoginRequiredMixin, FragmentCacheMixin, ListPaginationMixin, ListColumnsMixin, SearchMixin, ListView
+):
     """Enhanced Class-Based View list of Things.
     Uses htmx to implement pagination with clean visuals when updating.
     We configure a single URL endpoint to use for both the full-page render, and the htmx update
     (see get_template_names())
+    The htmx partial is served from the fragment cache while no Thing has changed.
     """
 
     model = Thing
     paginate_by = PAGINATE_BY
+    keyset_pagination = KEYSET_PAGINATION
+    list_columns = LIST_COLUMNS
+    list_excerpts = LIST_EXCERPTS
+    estimate_count = True
+    query_budget = LIST_QUERY_BUDGET
 
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
@@ -201,8 +308,122 @@ class ThingListHtmxView(LoginRequiredMixin, ListView):
 # Thing (non-team-specific CRUD example) DRF views
 
 
-class ThingViewSet(viewsets.ModelViewSet):
-    """Class-Based ViewSet for REST API access to Things."""
+class ThingViewSet(
+    ConditionalViewSetMixin,
+    DeltaSyncViewSetMixin,
+    BulkViewSetMixin,
+    SearchViewSetMixin,
+    SparseFieldsetViewSetMixin,
+    viewsets.ModelViewSet,
+):
+    """Class-Based ViewSet for REST API access to Things.
+    Also offers bulk create/update/delete at api/things/bulk/, and lookups of many ids with ?ids= or at
+    api/things/lookup/ (see BulkViewSetMixin).
+    Reads can ask for only some fields with ?fields= or ?omit= (see SparseFieldsetViewSetMixin).
+    Lists can be searched with ?q= (see SearchViewSetMixin).
+    ?since= lists only the changes since the last sync (see DeltaSyncViewSetMixin)."""
 
     serializer_class = ThingSerializer
     queryset = Thing.objects.all()
+    pagination_class = NameCursorPagination
+    query_budget = API_QUERY_BUDGET
+
+
+# --------------------------------------------------------------------------------
+
+# Thing (non-team-specific CRUD example) async implementation
+# The list and detail views, and the API's list and retrieve, as async views for when the site is served with ASGI.
+# They await the database rather than holding a thread while it works (see apps/crud_common/async_views.py).
+
+
+@query_budget(LIST_QUERY_BUDGET)
+@async_login_required
+async def thing_list_async_view(request):
+    """Async Function-Based View list of Things."""
+    context = {}
+
+    # Load only the columns the list shows
+    thing_list = only_columns(Thing.objects.all(), LIST_COLUMNS, LIST_EXCERPTS)
+
+    # Narrow the list down to the ?q= search results, if any, best match first
+    query = search_query(request)
+    if query:
+        thing_list = await asearch_queryset(thing_list, query)
+
+    if KEYSET_PAGINATION and not query:
+        page = await KeysetPaginator(thing_list, PAGINATE_BY).apage(request.GET.get(CURSOR_PARAM))
+    else:
+        # Things aren't filtered at all, so once there are a lot of them we can use the database's row estimate.
+        # Search results are in rank order (so they don't get keyset pages), and are counted exactly
+        paginator = CountingPaginator(thing_list, PAGINATE_BY, estimate=not query, counted=not query)
+        page = await apage(paginator, request.GET.get("page", 1))
+
+    # Lets crud_example_nav.html highlight "Things" in the nav-bar
+    context["active_tab"] = "crud_example1"
+    context["search_query"] = query
+    context["page_obj"] = page
+    context["object_list"] = page.object_list
+    context["is_paginated"] = page.has_other_pages
+    context["elided_page_range"] = list(
+        page.paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1)
+    )
+    # Django renders a TemplateResponse after the view returns, in a thread
+    return TemplateResponse(request, "crud_example1/thing_list.html", context)
+
+
+@query_budget(DETAIL_QUERY_BUDGET)
+@async_login_required
+@conditional_get(Thing)
+async def thing_detail_async_view(request, pk):
+    """Async Function-Based View to see Thing details."""
+    context = {}
+    # Lets crud_example_nav.html highlight "Things" in the nav-bar
+    context["active_tab"] = "crud_example1"
+    context["object"] = await aget_object_or_404(Thing, id=pk)
+    return TemplateResponse(request, "crud_example1/thing_detail.html", context)
+
+
+class ThingListAsyncView(AsyncLoginRequiredMixin, AsyncSearchMixin, AsyncListView):
+    """Async Class-Based View list of Things, with htmx pagination like ThingListHtmxView."""
+
+    model = Thing
+    paginate_by = PAGINATE_BY
+    keyset_pagination = KEYSET_PAGINATION
+    list_columns = LIST_COLUMNS
+    list_excerpts = LIST_EXCERPTS
+    estimate_count = True
+    query_budget = LIST_QUERY_BUDGET
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["active_tab"] = "crud_example1"
+        return context
+
+    def get_template_names(self):
+        """If we are receiving an htmx request for the object-list, return the
+        corresponding partial template, else the whole-page template."""
+        if self.request.htmx.target == "object-list":
+            return ["crud_example1/thing_list_htmx_partial.html"]
+        else:
+            # Use the full template
+            return ["crud_example1/thing_list_htmx.html"]
+
+
+class ThingDetailAsyncView(AsyncLoginRequiredMixin, AsyncConditionalGetMixin, AsyncDetailView):
+    """Async Class-Based View to see Thing details."""
+
+    model = Thing
+    query_budget = DETAIL_QUERY_BUDGET
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["active_tab"] = "crud_example1"
+        return context
+
+
+class ThingAsyncAPIView(AsyncModelAPIView):
+    """Async, read-only counterpart of ThingViewSet's list and retrieve."""
+
+    model = Thing
+    viewset_class = ThingViewSet
+    query_budget = API_QUERY_BUDGET
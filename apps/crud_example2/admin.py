@@ -1,4 +1,7 @@
 from django.contrib import admin
+
+from apps.crud_common.counts import ChangeListPaginator
+
 from .models import TeamThing
 
 
@@ -6,5 +9,8 @@ from .models import TeamThing
 class TeamThingAdmin(admin.ModelAdmin):
     # Fields to include in admin's list view
     list_display = ["name", "number"]
+    # Avoid a full COUNT(*) of a big table on every changelist page
+    paginator = ChangeListPaginator
+    show_full_result_count = False
     # Filters to include in admin's list view
     list_filter = ["team"]
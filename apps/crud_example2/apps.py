@@ -4,3 +4,45 @@ from django.apps import AppConfig
 class CrudExample2Config(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.crud_example2"
+
+    def ready(self):
+        from apps.crud_common.signals import track_model
+        from apps.crud_common.view_registry import register_views
+
+        from . import views
+        from .models import TeamThing
+
+        track_model(
+            TeamThing, search_fields=["name", "notes"], rollup_field="number", tombstones=True, autocomplete_names=True
+        )
+        # Every implementation of every view, for the benchmarks and the query budget and plan tests
+        # (see apps/crud_common/view_registry.py)
+        register_views(
+            self.label,
+            TeamThing,
+            {
+                ("list", "fbv"): views.teamthing_list_view,
+                ("list", "cbv"): views.TeamThingListView.as_view(),
+                ("list", "htmx"): views.TeamThingListHtmxView.as_view(),
+                ("list", "async_fbv"): views.teamthing_list_async_view,
+                ("list", "async_cbv"): views.TeamThingListAsyncView.as_view(),
+                ("detail", "fbv"): views.teamthing_detail_view,
+                ("detail", "cbv"): views.TeamThingDetailView.as_view(),
+                ("detail", "async_fbv"): views.teamthing_detail_async_view,
+                ("detail", "async_cbv"): views.TeamThingDetailAsyncView.as_view(),
+                ("create", "fbv"): views.teamthing_create_view,
+                ("create", "cbv"): views.TeamThingCreateView.as_view(),
+                ("update", "fbv"): views.teamthing_update_view,
+                ("update", "cbv"): views.TeamThingUpdateView.as_view(),
+                ("delete", "fbv"): views.teamthing_delete_view,
+                ("delete", "cbv"): views.TeamThingDeleteView.as_view(),
+                ("api", "list"): views.TeamThingViewSet.as_view({"get": "list"}),
+                ("api", "retrieve"): views.TeamThingViewSet.as_view({"get": "retrieve"}),
+                ("api", "async_list"): views.TeamThingAsyncAPIView.as_view(),
+                ("api", "async_retrieve"): views.TeamThingAsyncAPIView.as_view(),
+                ("autocomplete", "fbv"): views.teamthing_autocomplete_view,
+                ("stats", "fbv"): views.teamthing_stats_view,
+                ("import", "fbv"): views.teamthing_import_view,
+            },
+            form_data={"name": "Benchmark Thing", "number": 42, "notes": "Notes"},
+        )
@@ -18,3 +18,11 @@ class TeamThing(BaseTeamModel):
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            # Serves the team's lists in order (by name, then id for the keyset pagination), without sorting its rows
+            models.Index(fields=["team", "name", "id"]),
+            # Serves the delta sync of the API (?since=), which reads the team's changes in (updated_at, id) order
+            models.Index(fields=["team", "updated_at", "id"]),
+            # Lets the stats rollups recompute one bucket of numbers without reading all of the team's rows
+            models.Index(fields=["team", "number"]),
+        ]
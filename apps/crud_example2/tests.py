@@ -1,3 +1,531 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.crud_common import autocomplete, imports, search
+from apps.crud_common.counts import CountingPaginator, get_cached_count, set_cached_count
+from apps.crud_common.object_urls import object_url
+from apps.crud_common.rollups import get_stats
+from apps.crud_common.testing import QueryBudgetTestMixin, QueryPlanTestMixin
+from apps.crud_common.view_registry import ViewURLConf, registered_views
+from apps.teams.models import Membership, Team
+from apps.teams.roles import ROLE_ADMIN
+
+from .models import TeamThing
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """Every view of crud_example2 stays within its query budget, at any number of objects."""
+
+    app = "crud_example2"
+
+
+class QueryPlanTests(QueryPlanTestMixin, TestCase):
+    """The list, detail and API queries of crud_example2 are served by indexes."""
+
+    app = "crud_example2"
+
+
+class TeamTestCase(TestCase):
+    """A logged-in member of a team, and another team with TeamThings of its own."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="user")
+        cls.team = Team.objects.create(name="Team", slug="team")
+        Membership.objects.create(team=cls.team, user=cls.user, role=ROLE_ADMIN)
+        cls.other_team = Team.objects.create(name="Other Team", slug="other-team")
+        cls.other_thing = TeamThing.objects.create(team=cls.other_team, name="Not ours")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def url(self, name, **kwargs):
+        return reverse(f"crud_example2:{name}", kwargs={"team_slug": self.team.slug, **kwargs})
+
+
+@override_settings(CRUD_EXACT_COUNT_LIMIT=3)
+class CountingPaginatorTests(TeamTestCase):
+    """Each team's row count is kept by the save and delete signals. Small counts are checked against COUNT(*),
+    and big ones (from CRUD_EXACT_COUNT_LIMIT rows) are trusted without it."""
+
+    def _paginator(self, **kwargs):
+        return CountingPaginator(TeamThing.objects.filter(team=self.team), 10, team=self.team, **kwargs)
+
+    def test_small_counts_are_exact(self):
+        TeamThing.objects.create(team=self.team, name="One")
+        self.assertEqual(self._paginator().count, 1)
+        self.assertEqual(get_cached_count(TeamThing, self.team.pk), 1)
+        # A cached count that went wrong (e.g. after a raw SQL delete) is corrected
+        set_cached_count(TeamThing, self.team.pk, 2)
+        self.assertEqual(self._paginator().count, 1)
+        self.assertEqual(get_cached_count(TeamThing, self.team.pk), 1)
+
+    def test_signals_keep_the_count(self):
+        self.assertEqual(self._paginator().count, 0)
+        things = [TeamThing.objects.create(team=self.team, name=f"Thing {i}") for i in range(4)]
+        things[0].delete()
+        self.assertEqual(get_cached_count(TeamThing, self.team.pk), 3)
+        self.assertEqual(get_cached_count(TeamThing, self.other_team.pk), None)
+
+    def test_big_counts_are_trusted(self):
+        set_cached_count(TeamThing, self.team.pk, 1000)
+        with self.assertNumQueries(1):
+            self.assertEqual(self._paginator().count, 1000)
+        # Unless the list is filtered
+        self.assertEqual(self._paginator(counted=False).count, 0)
+
+
+class ObjectUrlTests(TeamTestCase):
+    """The list rows link to each TeamThing without a reverse() or a team query per row."""
+
+    def test_object_url(self):
+        for thing in (self.other_thing, TeamThing.objects.create(team=self.other_team, name="Other", id=12)):
+            url = object_url(None, "crud_example2:teamthing_detail", thing.pk, team_slug=self.other_team.slug)
+            self.assertEqual(url, thing.get_absolute_url())
+
+    def test_list_queries_dont_grow_with_rows(self):
+        def list_page():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    self.url("teamthing_list"), HTTP_HX_REQUEST="true", HTTP_HX_TARGET="object-list"
+                )
+            return response, len(queries)
+
+        # Warm up the caches, then measure pages just after a write (which bumps the version on commit), so not from
+        # the page cache
+        list_page()
+        with self.captureOnCommitCallbacks(execute=True):
+            TeamThing.objects.create(team=self.team, name="Thing 0")
+        response, few = list_page()
+        with self.captureOnCommitCallbacks(execute=True):
+            things = [TeamThing.objects.create(team=self.team, name=f"Thing {i}") for i in range(1, 4)]
+        # A full page
+        response, many = list_page()
+        self.assertEqual(many, few)
+        for thing in things:
+            self.assertContains(response, f'href="{thing.get_absolute_url()}"')
+
+
+class FragmentCacheTests(TeamTestCase):
+    """The htmx list partial is served from the cache until one of the team's TeamThings changes."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def _partial(self):
+        return self.client.get(self.url("teamthing_list"), HTTP_HX_REQUEST="true", HTTP_HX_TARGET="object-list")
+
+    def test_cached_until_the_team_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            thing = TeamThing.objects.create(team=self.team, name="Old name")
+        self.assertContains(self._partial(), "Old name")
+        # Neither a change the cache doesn't hear about, nor a write in another team, shows
+        TeamThing.objects.filter(pk=thing.pk).update(name="New name", updated_at=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            TeamThing.objects.create(team=self.other_team, name="Theirs")
+        self.assertContains(self._partial(), "Old name")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TeamThing.objects.create(team=self.team, name="Another")
+        response = self._partial()
+        self.assertContains(response, "New name")
+        self.assertContains(response, "Another")
+
+    def test_cached_page_skips_the_database(self):
+        self._partial()
+        with CaptureQueriesContext(connection) as queries:
+            self._partial()
+        self.assertFalse([query for query in queries if "crud_example2_teamthing" in query["sql"]])
+
+    def test_full_page_isnt_cached(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            thing = TeamThing.objects.create(team=self.team, name="Old name")
+        self.assertContains(self.client.get(self.url("teamthing_list")), "Old name")
+        TeamThing.objects.filter(pk=thing.pk).update(name="New name", updated_at=timezone.now())
+        self.assertContains(self.client.get(self.url("teamthing_list")), "New name")
+
+
+class SearchTests(TeamTestCase):
+    """?q= finds the team's TeamThings with all the words, best match (in the name) first, in the API and the lists."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.in_notes = TeamThing.objects.create(team=cls.team, name="Gadget", notes="a red widget")
+        cls.in_name = TeamThing.objects.create(team=cls.team, name="Red widget", notes="shiny")
+        TeamThing.objects.create(team=cls.team, name="Blue widget")
+        TeamThing.objects.create(team=cls.other_team, name="Red widget")
+
+    def _api_search(self, query):
+        response = self.client.get(self.url("teamthing-list"), {"q": query})
+        return [row["id"] for row in response.json()["results"]]
+
+    def test_api(self):
+        self.assertEqual(self._api_search("red widget"), [self.in_name.pk, self.in_notes.pk])
+        self.assertEqual(self._api_search("red widget shiny"), [self.in_name.pk])
+        self.assertEqual(self._api_search("green"), [])
+
+    def test_index_follows_changes(self):
+        self.in_notes.notes = "a green widget"
+        self.in_notes.save()
+        self.in_name.delete()
+        self.assertEqual(self._api_search("red"), [])
+        self.assertEqual(self._api_search("green"), [self.in_notes.pk])
+
+    def test_rebuild(self):
+        search.clear_index(TeamThing, "default")
+        self.assertEqual(self._api_search("red"), [])
+        call_command("rebuild_search_index", stdout=io.StringIO())
+        self.assertEqual(self._api_search("red"), [self.in_name.pk, self.in_notes.pk])
+
+    def test_list_page(self):
+        response = self.client.get(self.url("teamthing_list"), {"q": "red"})
+        self.assertEqual(list(response.context["object_list"]), [self.in_name, self.in_notes])
+        self.assertEqual(response.context["search_query"], "red")
+
+    def test_every_list_view(self):
+        # The async views too, so they do the same work as the sync ones in the benchmarks
+        urlconf = override_settings(ROOT_URLCONF=ViewURLConf(settings.ROOT_URLCONF))
+        urlconf.enable()
+        self.addCleanup(urlconf.disable)
+        for view in registered_views("crud_example2"):
+            if view.view == "list" and not view.htmx:
+                with self.subTest(view.name):
+                    response = self.client.get(reverse(view.url_name, kwargs={"team_slug": "team"}), {"q": "red"})
+                    self.assertEqual(list(response.context["object_list"]), [self.in_name, self.in_notes])
+                    self.assertEqual(response.context["search_query"], "red")
+
+
+class AutocompleteTests(TeamTestCase):
+    """autocomplete/ completes the names of the team's TeamThings from an in-memory index, which writes update."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for name in ("beta", "Alpha two", "alpha one", "Gamma"):
+            TeamThing.objects.create(team=cls.team, name=name)
+        TeamThing.objects.create(team=cls.other_team, name="Alpha three")
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        autocomplete.clear_indexes()
+        self.addCleanup(autocomplete.clear_indexes)
+
+    def _complete(self, prefix, **headers):
+        return self.client.get(self.url("teamthing_autocomplete"), {"q": prefix}, **headers)
+
+    def _names(self, prefix):
+        return [result["name"] for result in self._complete(prefix).json()["results"]]
+
+    def test_complete(self):
+        results = self._complete("ALP").json()["results"]
+        self.assertEqual([result["name"] for result in results], ["alpha one", "Alpha two"])
+        thing = TeamThing.objects.get(name="alpha one")
+        self.assertEqual(results[0], {"id": thing.pk, "name": "alpha one", "url": thing.get_absolute_url()})
+        self.assertEqual(self._names(""), [])
+        self.assertEqual(self._names("z"), [])
+
+    @override_settings(CRUD_AUTOCOMPLETE_LIMIT=1)
+    def test_limit(self):
+        self.assertEqual(self._names("alpha"), ["alpha one"])
+
+    def _assertNamesNotLoaded(self, prefix, expected):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._names(prefix), expected)
+        self.assertFalse([query for query in queries if "crud_example2_teamthing" in query["sql"]])
+
+    def test_index_is_kept_up_to_date_in_memory(self):
+        self._names("a")
+        self._assertNamesNotLoaded("g", ["Gamma"])
+        with self.captureOnCommitCallbacks(execute=True):
+            TeamThing.objects.create(team=self.team, name="Gamma two")
+        self._assertNamesNotLoaded("g", ["Gamma", "Gamma two"])
+
+        thing = TeamThing.objects.get(name="Gamma")
+        with self.captureOnCommitCallbacks(execute=True):
+            thing.name = "Delta"
+            thing.save()
+            TeamThing.objects.get(name="beta").delete()
+        self._assertNamesNotLoaded("g", ["Gamma two"])
+        self._assertNamesNotLoaded("d", ["Delta"])
+        self._assertNamesNotLoaded("b", [])
+        # Bulk creates do the same
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url("teamthing-bulk"), [{"name": "Bulk"}], "application/json")
+        self.assertEqual(response.status_code, 201)
+        self._assertNamesNotLoaded("b", ["Bulk"])
+
+    def test_write_in_another_process(self):
+        self._names("a")
+        # What a write in another process does: count the write, without changing this process's index
+        autocomplete._count_write(TeamThing, self.team.pk)
+        TeamThing.objects.filter(name="Gamma").update(name="Gamma two")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._names("g"), ["Gamma two"])
+        self.assertTrue([query for query in queries if "crud_example2_teamthing" in query["sql"]])
+
+    def test_prefix_index(self):
+        index = autocomplete.PrefixIndex([(1, "b"), (2, "a b"), (3, "A")])
+        self.assertEqual(index.lookup("a", 10), [(3, "A"), (2, "a b")])
+        index.set(3, "c")
+        index.set(4, "a")
+        index.remove(1)
+        index.remove(5)
+        self.assertEqual(index.lookup("", 10), [(4, "a"), (2, "a b"), (3, "c")])
+        self.assertEqual(index.lookup("a", 1), [(4, "a")])
+
+    @override_settings(CRUD_AUTOCOMPLETE_MAX_NAMES=2)
+    def test_too_many_names_for_memory(self):
+        # Completed by the database, in the order of its collation, which may put capitals first
+        self.assertCountEqual(self._names("alpha"), ["alpha one", "Alpha two"])
+
+    def test_htmx_partial(self):
+        response = self._complete("gam", HTTP_HX_REQUEST="true")
+        self.assertTemplateUsed(response, "web/components/autocomplete_results.html")
+        self.assertContains(response, "Gamma")
+
+
+class StatsTests(TeamTestCase):
+    """The stats of the team's numbers, kept in rollups as TeamThings change, match what the table holds."""
+
+    def _stats(self):
+        return self.client.get(self.url("teamthing_stats")).json()
+
+    def assertStatsMatchTable(self):
+        numbers = list(TeamThing.objects.filter(team=self.team).values_list("number", flat=True))
+        stats = self._stats()
+        expected = {
+            "count": len(numbers),
+            "sum": sum(numbers),
+            "min": min(numbers, default=None),
+            "max": max(numbers, default=None),
+        }
+        self.assertEqual({key: stats[key] for key in expected}, expected)
+        histogram = Counter(number // 10 * 10 for number in numbers)
+        self.assertEqual({row["start"]: row["count"] for row in stats["histogram"]}, histogram)
+
+    def test_follows_changes(self):
+        self.assertEqual(self._stats()["count"], 0)
+        things = [TeamThing.objects.create(team=self.team, name=f"Thing {n}", number=n) for n in (5, 12, 17, 40)]
+        self.assertStatsMatchTable()
+        # Moving the min and max of buckets out of them
+        things[1].number = 30
+        things[1].save()
+        things[3].number = 1
+        things[3].save()
+        self.assertStatsMatchTable()
+        # An update of a deferred number, and a save that doesn't touch it
+        thing = TeamThing.objects.only("id", "team").get(pk=things[2].pk)
+        thing.number = 18
+        thing.save()
+        thing = TeamThing.objects.get(pk=things[0].pk)
+        thing.name = "Renamed"
+        thing.save(update_fields=["name"])
+        self.assertStatsMatchTable()
+        things[3].delete()
+        self.assertStatsMatchTable()
+        # Bulk creates and deletes do the same bookkeeping
+        response = self.client.post(self.url("teamthing-bulk"), [{"name": "Bulk", "number": 99}], "application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertStatsMatchTable()
+        response = self.client.delete(self.url("teamthing-bulk"), {"ids": [things[0].pk]}, "application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertStatsMatchTable()
+
+    def test_change_saved_later(self):
+        # A save that doesn't write the number leaves its original value to the save that does
+        thing = TeamThing.objects.create(team=self.team, name="Thing", number=5)
+        thing.number = 20
+        thing.save(update_fields=["name"])
+        self.assertStatsMatchTable()
+        thing.save()
+        self.assertStatsMatchTable()
+
+    def test_rebuild(self):
+        for n in (3, 14, 15):
+            TeamThing.objects.create(team=self.team, name=f"Thing {n}", number=n)
+        TeamThing.objects.filter(number=3).update(number=50)
+        call_command("rebuild_rollups", stdout=io.StringIO())
+        self.assertStatsMatchTable()
+        self.assertEqual(get_stats(TeamThing, self.other_team.pk)["count"], 1)
+
+    def test_htmx_card(self):
+        TeamThing.objects.create(team=self.team, name="Thing", number=7)
+        response = self.client.get(self.url("teamthing_stats"), HTTP_HX_REQUEST="true")
+        self.assertTemplateUsed(response, "web/components/stats_card.html")
+
+
+class BatchLookupTests(TeamTestCase):
+    """?ids= and lookup/ fetch many of the team's TeamThings in one query, in the order asked for."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.things = [TeamThing.objects.create(team=cls.team, name=f"Thing {i}") for i in range(3)]
+
+    def _ids(self, response):
+        return [row["id"] for row in response.json()["results"]]
+
+    def test_ids_param(self):
+        ids = [self.things[2].pk, self.other_thing.pk, self.things[0].pk]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url("teamthing-list"), {"ids": ",".join(map(str, ids))})
+        self.assertEqual(self._ids(response), [self.things[2].pk, self.things[0].pk])
+        # Another team's TeamThing is as missing as one that doesn't exist
+        self.assertEqual(response.json()["missing"], [self.other_thing.pk])
+        self.assertEqual(len([query for query in queries if "crud_example2_teamthing" in query["sql"]]), 1)
+
+    def test_lookup(self):
+        ids = [self.things[1].pk, self.things[2].pk, 0]
+        response = self.client.post(self.url("teamthing-lookup"), {"ids": ids}, "application/json")
+        self.assertEqual(self._ids(response), ids[:2])
+        self.assertEqual(response.json()["missing"], [0])
+
+    @override_settings(CRUD_BULK_MAX_ITEMS=2)
+    def test_bad_ids(self):
+        for ids in ("1,x", "1,1", "1,2,3"):
+            with self.subTest(ids=ids):
+                self.assertEqual(self.client.get(self.url("teamthing-list"), {"ids": ids}).status_code, 400)
+        for data in ({"ids": [True]}, {"ids": "1"}, [1]):
+            with self.subTest(data=data):
+                response = self.client.post(self.url("teamthing-lookup"), data, "application/json")
+                self.assertEqual(response.status_code, 400)
+
+
+class ExportTests(TeamTestCase):
+    """The export streams all of the team's TeamThings, and only those."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.things = [TeamThing.objects.create(team=cls.team, name=f"Thing {i}", number=i) for i in range(3)]
+
+    def _export(self, **params):
+        response = self.client.get(self.url("teamthing_export"), params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self._export().decode().splitlines()]
+        expected = [(thing.pk, thing.name, thing.number) for thing in self.things]
+        self.assertEqual([(row["id"], row["name"], row["number"]) for row in rows], expected)
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO(self._export(format="csv").decode())))
+        self.assertEqual(rows[0], ["id", "name", "number", "notes", "created_at", "updated_at"])
+        self.assertEqual([row[1] for row in rows[1:]], [thing.name for thing in self.things])
+
+    def test_gzip(self):
+        self.assertEqual(gzip.decompress(self._export(gzip=1)), self._export())
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(self.url("teamthing_export"), {"format": "xml"}).status_code, 400)
+
+
+class AsyncAPITests(TeamTestCase):
+    """TeamThingAsyncAPIView only lists and retrieves the team's TeamThings."""
+
+    def setUp(self):
+        super().setUp()
+        # The async API isn't routed by urls.py, so use the routes of every view (see view_registry.py)
+        urlconf = override_settings(ROOT_URLCONF=ViewURLConf(settings.ROOT_URLCONF))
+        urlconf.enable()
+        self.addCleanup(urlconf.disable)
+
+    def _url(self, impl, **kwargs):
+        return reverse(f"benchmark-crud_example2-api-{impl}", kwargs={"team_slug": self.team.slug, **kwargs})
+
+    def test_only_the_teams_things(self):
+        thing = TeamThing.objects.create(team=self.team, name="Ours")
+        response = self.client.get(self._url("async_list"))
+        self.assertEqual([row["id"] for row in response.json()["results"]], [thing.pk])
+        self.assertEqual(self.client.get(self._url("async_retrieve", pk=thing.pk)).status_code, 200)
+        self.assertEqual(self.client.get(self._url("async_retrieve", pk=self.other_thing.pk)).status_code, 404)
+
+
+class DeferredExecutor:
+    """Stands in for the import thread pool: keeps the jobs until run() runs them, in a thread of their own."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, fn, *args):
+        self.jobs.append((fn, args))
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            while self.jobs:
+                fn, args = self.jobs.pop(0)
+                executor.submit(fn, *args).result()
+
+
+class ImportTests(TransactionTestCase):
+    """An upload is imported in a background thread: the valid rows are created in the team, the others reported."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="user")
+        self.team = Team.objects.create(name="Team", slug="team")
+        Membership.objects.create(team=self.team, user=self.user, role=ROLE_ADMIN)
+        self.client.force_login(self.user)
+        self.executor = DeferredExecutor()
+        patcher = mock.patch.object(imports, "_get_executor", return_value=self.executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Run any jobs a test left, so they remove their spooled files
+        self.addCleanup(self.executor.run)
+
+    def _upload(self, name, content):
+        url = reverse("crud_example2:teamthing_import", kwargs={"team_slug": self.team.slug})
+        response = self.client.post(url, {"file": SimpleUploadedFile(name, content.encode())})
+        self.assertEqual(response.status_code, 302)
+        return response.url.rstrip("/").rsplit("/", 1)[-1]
+
+    def _status(self, job_id):
+        return imports.get_import_status(job_id, self.user, self.team)
+
+    def test_csv(self):
+        job_id = self._upload("things.csv", "name,number,notes\nOne,1,\n,2,No name\nThree,x,\nFour,4,Notes\n")
+        self.assertEqual(self._status(job_id)["state"], "queued")
+        self.executor.run()
+        status = self._status(job_id)
+        self.assertEqual((status["state"], status["rows"], status["created"]), ("done", 4, 2))
+        self.assertEqual([error["row"] for error in status["errors"]], [2, 3])
+        things = TeamThing.objects.filter(team=self.team).values_list("name", "number")
+        self.assertEqual(sorted(things), [("Four", 4), ("One", 1)])
+
+    def test_ndjson(self):
+        job_id = self._upload("things.ndjson", '{"name": "One", "number": 1}\n\nnot json\n[1]\n')
+        self.executor.run()
+        status = self._status(job_id)
+        self.assertEqual((status["state"], status["created"], status["error_count"]), ("done", 1, 2))
+
+    def test_status_evicted_before_the_job_runs(self):
+        job_id = self._upload("things.csv", "name,number\nOne,1\n")
+        cache.delete(imports._status_key(job_id))
+        self.executor.run()
+        self.assertEqual(self._status(job_id)["state"], "done")
+        self.assertEqual(TeamThing.objects.count(), 1)
+
+    def test_status_is_only_for_the_user_and_team(self):
+        job_id = self._upload("things.csv", "name,number\nOne,1\n")
+        other_user = get_user_model().objects.create_user(username="other")
+        self.assertIsNone(imports.get_import_status(job_id, other_user, self.team))
+        self.assertIsNone(imports.get_import_status(job_id, self.user, Team.objects.create(name="T", slug="t")))
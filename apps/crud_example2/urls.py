@@ -31,6 +31,29 @@ urlpatterns = [
     #  URL path for the htmx pagination implementation of a CBV list
     #
     path("", views.TeamThingListHtmxView.as_view(), name="teamthing_list"),
+    #
+    # URL paths for the async implementation, for when the site is served with ASGI
+    #
+    # path("", views.teamthing_list_async_view, name="teamthing_list"),
+    # path("<int:pk>/", views.teamthing_detail_async_view, name="teamthing_detail"),
+    # path("", views.TeamThingListAsyncView.as_view(), name="teamthing_list"),
+    # path("<int:pk>/", views.TeamThingDetailAsyncView.as_view(), name="teamthing_detail"),
+    #
+    # Async API list and retrieve, next to the viewset's URLs rather than over them: they only answer GET, without
+    # the viewset's extras (bulk/, lookup/, ?since=, ?ids=, ?q=, ?fields=, see AsyncModelAPIView)
+    # path("api/async/teamthings/", views.TeamThingAsyncAPIView.as_view(), name="teamthing-async-list"),
+    # path("api/async/teamthings/<int:pk>/", views.TeamThingAsyncAPIView.as_view(), name="teamthing-async-detail"),
+    #
+    # Streaming export of all of the team's TeamThings, as NDJSON or CSV
+    path("export/", views.teamthing_export_view, name="teamthing_export"),
+    # Count, sum, min, max and histogram of the team's numbers, as JSON or as the htmx summary card
+    path("stats/", views.teamthing_stats_view, name="teamthing_stats"),
+    # Names starting with ?q=, for the type-ahead box on the lists
+    path("autocomplete/", views.teamthing_autocomplete_view, name="teamthing_autocomplete"),
+    #
+    # Background import of TeamThings from a CSV or NDJSON file, and the progress of an import
+    path("import/", views.teamthing_import_view, name="teamthing_import"),
+    path("import/<slug:job_id>/", views.teamthing_import_status_view, name="teamthing_import_status"),
 ]
 
 
@@ -1,10 +1,48 @@
+from django.http import Http404
 from django.http.response import HttpResponseRedirect
-from django.shortcuts import get_object_or_404, render
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.shortcuts import aget_object_or_404, get_object_or_404, render
+from django.template.response import TemplateResponse
+from django.core.paginator import EmptyPage, PageNotAnInteger
 from django.urls import reverse, reverse_lazy
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
 from rest_framework import viewsets
 
+from apps.crud_common.async_views import (
+    AsyncDetailView,
+    AsyncListView,
+    AsyncLoginAndTeamRequiredMixin,
+    AsyncModelAPIView,
+    apage,
+    async_login_and_team_required,
+)
+from apps.crud_common.autocomplete import autocomplete_response
+from apps.crud_common.budgets import query_budget
+from apps.crud_common.bulk import BulkViewSetMixin
+from apps.crud_common.columns import ListColumnsMixin, only_columns
+from apps.crud_common.conditional import (
+    AsyncConditionalGetMixin,
+    ConditionalGetMixin,
+    ConditionalViewSetMixin,
+    conditional_get,
+)
+from apps.crud_common.counts import CountingPaginator
+from apps.crud_common.export import export_response
+from apps.crud_common.fieldsets import SparseFieldsetViewSetMixin
+from apps.crud_common.forms import ImportFileForm
+from apps.crud_common.fragment_cache import FragmentCacheMixin
+from apps.crud_common.imports import get_import_status, start_import
+from apps.crud_common.pagination import CURSOR_PARAM, KeysetPaginator, ListPaginationMixin, NameCursorPagination
+from apps.crud_common.rollups import stats_response
+from apps.crud_common.search import (
+    AsyncSearchMixin,
+    SearchMixin,
+    SearchViewSetMixin,
+    asearch_queryset,
+    search_query,
+    search_queryset,
+)
+from apps.crud_common.sync import DeltaSyncViewSetMixin
+from apps.crud_common.updates import SaveChangedFieldsMixin, save_changed
 from apps.teams.decorators import login_and_team_required
 from apps.teams.mixins import LoginAndTeamRequiredMixin
 
@@ -20,38 +58,81 @@ PAGINATE_BY = 4
 # For pagination, we use get_elided_page_range() to give a list of pages that always has some
 # pages at the beginning and end, and some on either side of current, with ellipsis where needed.
 
+# Set KEYSET_PAGINATION to True to page by seeking on (name, id) with opaque next/previous cursors, instead of by
+# page number. Deep pages then cost the same as the first page, at the price of having no numbered page links.
+KEYSET_PAGINATION = False
+
+# The columns the list pages show, which are all they load. The notes are shown as an excerpt, so the full text
+# never leaves the database (updated_at is part of the row cache key, and the team is preloaded).
+# See apps/crud_common/columns.py
+LIST_COLUMNS = ["name", "number", "updated_at", "team"]
+LIST_EXCERPTS = ["notes"]
+
+# The fields included in an export
+EXPORT_FIELDS = ["id", "name", "number", "notes", "created_at", "updated_at"]
+
+# Query budgets: the most queries each kind of view may run, however many objects there are. Each is the most that
+# QueryBudgetTests measured for that kind of view, plus one to spare. They include looking up the session, the user,
+# the team and the membership. See apps/crud_common/budgets.py
+LIST_QUERY_BUDGET = 8
+DETAIL_QUERY_BUDGET = 6
+FORM_QUERY_BUDGET = 14
+DELETE_QUERY_BUDGET = 13
+API_QUERY_BUDGET = 6
+OTHER_QUERY_BUDGET = 6
+
 # --------------------------------------------------------------------------------
 
 # TeamThing (team-specific CRUD example) Function-Based View implementation
 
 
+@query_budget(LIST_QUERY_BUDGET)
 @login_and_team_required
 def teamthing_list_view(request, team_slug):
     """Function-Based View list of TeamThings."""
     context = {}
 
     # Filter the set of objects to view to only show this team's objects
-    teamthing_list = TeamThing.objects.filter(team=request.team)
-
-    paginator = Paginator(teamthing_list, PAGINATE_BY)
-    page = request.GET.get("page", 1)
-    try:
-        page = paginator.page(page)
-    except PageNotAnInteger:
-        page = paginator.page(1)
-    except EmptyPage:
-        page = paginator.page(paginator.num_pages)
+    # (select_related preloads the team, so nothing that touches object.team costs a query per row)
+    # and load only the columns the list shows
+    teamthing_list = only_columns(
+        TeamThing.objects.filter(team=request.team).select_related("team"), LIST_COLUMNS, LIST_EXCERPTS
+    )
+
+    # Narrow the list down to the ?q= search results, if any, best match first
+    query = search_query(request)
+    if query:
+        teamthing_list = search_queryset(teamthing_list, query, request.team)
+
+    if KEYSET_PAGINATION and not query:
+        page = KeysetPaginator(teamthing_list, PAGINATE_BY).page(request.GET.get(CURSOR_PARAM))
+    else:
+        # Gets this team's row count from the counter cache once there are a lot of objects.
+        # Search results are in rank order (so they don't get keyset pages), and are counted exactly
+        paginator = CountingPaginator(teamthing_list, PAGINATE_BY, team=request.team, counted=not query)
+        page = request.GET.get("page", 1)
+        try:
+            page = paginator.page(page)
+        except PageNotAnInteger:
+            page = paginator.page(1)
+        except EmptyPage:
+            page = paginator.page(paginator.num_pages)
 
     # Lets crud_example_nav.html highlight "TeamThings" in the nav-bar
     context["active_tab"] = "crud_example2"
+    context["search_query"] = query
     context["page_obj"] = page
     context["object_list"] = page.object_list
     context["is_paginated"] = page.has_other_pages
-    context["elided_page_range"] = list(paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1))
+    context["elided_page_range"] = list(
+        page.paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1)
+    )
     return render(request, "crud_example2/teamthing_list.html", context)
 
 
+@query_budget(DETAIL_QUERY_BUDGET)
 @login_and_team_required
+@conditional_get(TeamThing)
 def teamthing_detail_view(request, team_slug, pk):
     """Function-Based View to see TeamThing details."""
     context = {}
@@ -62,6 +143,7 @@ def teamthing_detail_view(request, team_slug, pk):
     return render(request, "crud_example2/teamthing_detail.html", context)
 
 
+@query_budget(FORM_QUERY_BUDGET)
 @login_and_team_required
 def teamthing_create_view(request, team_slug):
     """Function-Based View to create a TeamThing."""
@@ -81,6 +163,7 @@ def teamthing_create_view(request, team_slug):
     return render(request, "crud_example2/teamthing_form.html", context)
 
 
+@query_budget(FORM_QUERY_BUDGET)
 @login_and_team_required
 def teamthing_update_view(request, team_slug, pk):
     """Function-Based View to update a TeamThing."""
@@ -89,7 +172,7 @@ def teamthing_update_view(request, team_slug, pk):
     obj = get_object_or_404(TeamThing, id=pk, team=request.team)
     form = TeamThingForm(request.POST or None, instance=obj)
     if form.is_valid():
-        form.save()
+        save_changed(form)
         return HttpResponseRedirect(
             reverse("crud_example2:teamthing_detail", kwargs={"team_slug": team_slug, "pk": pk})
         )
@@ -101,6 +184,7 @@ def teamthing_update_view(request, team_slug, pk):
     return render(request, "crud_example2/teamthing_form.html", context)
 
 
+@query_budget(DELETE_QUERY_BUDGET)
 @login_and_team_required
 def teamthing_delete_view(request, team_slug, pk):
     """Function-Based View to delete a TeamThing."""
@@ -110,17 +194,85 @@ def teamthing_delete_view(request, team_slug, pk):
     return HttpResponseRedirect(reverse("crud_example2:teamthing_list", kwargs={"team_slug": team_slug}))
 
 
+@login_and_team_required
+def teamthing_export_view(request, team_slug):
+    """Function-Based View to download all of this team's TeamThings, streamed as NDJSON or CSV."""
+    return export_response(request, TeamThing.objects.filter(team=request.team), EXPORT_FIELDS, "teamthings")
+
+
+@query_budget(OTHER_QUERY_BUDGET)
+@login_and_team_required
+def teamthing_autocomplete_view(request, team_slug):
+    """Function-Based View completing TeamThing names for the type-ahead box (see apps/crud_common/autocomplete.py).
+    Only this team's TeamThings are completed."""
+    return autocomplete_response(
+        request, TeamThing.objects.filter(team=request.team), "crud_example2:teamthing_detail", team=request.team
+    )
+
+
+@query_budget(OTHER_QUERY_BUDGET)
+@login_and_team_required
+def teamthing_stats_view(request, team_slug):
+    """Function-Based View of the stats of this team's TeamThing numbers, as JSON or as the htmx summary card
+    (see apps/crud_common/rollups.py)."""
+    return stats_response(request, TeamThing, team=request.team)
+
+
+@query_budget(OTHER_QUERY_BUDGET)
+@login_and_team_required
+def teamthing_import_view(request, team_slug):
+    """Function-Based View to upload a CSV or NDJSON file of TeamThings, which is imported in the background."""
+    context = {}
+    form = ImportFileForm(request.POST or None, request.FILES or None)
+    if form.is_valid():
+        # Each row is validated with TeamThingForm, and the new objects belong to my team
+        job_id = start_import(form.cleaned_data["file"], TeamThingForm, request.user, request.team)
+        return HttpResponseRedirect(
+            reverse("crud_example2:teamthing_import_status", kwargs={"team_slug": team_slug, "job_id": job_id})
+        )
+    # Lets crud_example_nav.html highlight "TeamThings" in the nav-bar
+    context["active_tab"] = "crud_example2"
+    context["form"] = form
+    return render(request, "crud_example2/teamthing_import.html", context)
+
+
+@query_budget(OTHER_QUERY_BUDGET)
+@login_and_team_required
+def teamthing_import_status_view(request, team_slug, job_id):
+    """Function-Based View of the progress of an import, with the rows that couldn't be imported."""
+    context = {}
+    # Allow only if the job was started by me, for this team
+    job = get_import_status(job_id, request.user, request.team)
+    if job is None:
+        raise Http404("No such import")
+    context["job"] = job
+    if request.htmx:
+        # The status component polls for updates of itself
+        return render(request, "web/components/import_status.html", context)
+    # Lets crud_example_nav.html highlight "TeamThings" in the nav-bar
+    context["active_tab"] = "crud_example2"
+    return render(request, "crud_example2/teamthing_import.html", context)
+
+
 # --------------------------------------------------------------------------------
 
 # TeamThing (team-specific CRUD example) Class-Based View implementation
 
 
-class TeamThingListView(LoginAndTeamRequiredMixin, ListView):
+class TeamThingListView(LoginAndTeamRequiredMixin, ListPaginationMixin, ListColumnsMixin, SearchMixin, ListView):
     """Class-Based View list of TeamThings."""
 
     model = TeamThing
     paginate_by = PAGINATE_BY
+    keyset_pagination = KEYSET_PAGINATION
+    list_columns = LIST_COLUMNS
+    list_excerpts = LIST_EXCERPTS
     template_name = "crud_example2/teamthing_list.html"
+    query_budget = LIST_QUERY_BUDGET
+
+    def get_queryset(self):
+        # Filter the set of objects to view to only show this team's objects, with the team preloaded
+        return super().get_queryset().filter(team=self.request.team).select_related("team")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -134,10 +286,15 @@ class TeamThingListView(LoginAndTeamRequiredMixin, ListView):
         return context
 
 
-class TeamThingDetailView(LoginAndTeamRequiredMixin, DetailView):
+class TeamThingDetailView(LoginAndTeamRequiredMixin, ConditionalGetMixin, DetailView):
     """Class-Based View to see TeamThing details."""
 
     model = TeamThing
+    query_budget = DETAIL_QUERY_BUDGET
+
+    def get_queryset(self):
+        # Allow only if object belongs to this team
+        return super().get_queryset().filter(team=self.request.team)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -151,6 +308,7 @@ class TeamThingCreateView(LoginAndTeamRequiredMixin, CreateView):
 
     model = TeamThing
     form_class = TeamThingForm
+    query_budget = FORM_QUERY_BUDGET
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -163,11 +321,12 @@ class TeamThingCreateView(LoginAndTeamRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
-class TeamThingUpdateView(LoginAndTeamRequiredMixin, UpdateView):
+class TeamThingUpdateView(LoginAndTeamRequiredMixin, SaveChangedFieldsMixin, UpdateView):
     """Class-Based View to update a TeamThing."""
 
     model = TeamThing
     form_class = TeamThingForm
+    query_budget = FORM_QUERY_BUDGET
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -180,6 +339,7 @@ class TeamThingDeleteView(LoginAndTeamRequiredMixin, DeleteView):
     """Class-Based View to delete a TeamThing."""
 
     model = TeamThing
+    query_budget = DELETE_QUERY_BUDGET
 
     def get_success_url(self):
         return reverse_lazy("crud_example2:teamthing_list", kwargs={"team_slug": self.request.team.slug})
@@ -191,16 +351,27 @@ class TeamThingDeleteView(LoginAndTeamRequiredMixin, DeleteView):
         return context
 
 
-class TeamThingListHtmxView(LoginAndTeamRequiredMixin, ListView):
+class TeamThingListHtmxView(
+    LoginAndTeamRequiredMixin, FragmentCacheMixin, ListPaginationMixin, ListColumnsMixin, SearchMixin, ListView
+):
     """Enhanced Class-Based View list of TeamThings.
     Uses htmx to implement pagination with clean visuals when updating.
     We configure a single URL endpoint to use for both the full-page render, and the htmx update
     (see get_template_names())
+    The htmx partial is served from the fragment cache while this team's objects are unchanged.
     """
 
     model = TeamThing
     paginate_by = PAGINATE_BY
+    keyset_pagination = KEYSET_PAGINATION
+    list_columns = LIST_COLUMNS
+    list_excerpts = LIST_EXCERPTS
     template_name = "crud_example2/teamthing_list.html"
+    query_budget = LIST_QUERY_BUDGET
+
+    def get_queryset(self):
+        # Filter the set of objects to view to only show this team's objects, with the team preloaded
+        return super().get_queryset().filter(team=self.request.team).select_related("team")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -228,12 +399,142 @@ class TeamThingListHtmxView(LoginAndTeamRequiredMixin, ListView):
 # TeamThing (team-specific CRUD example) DRF views
 
 
-class TeamThingViewSet(viewsets.ModelViewSet):
-    """Class-Based ViewSet for REST API access to TeamThings."""
+class TeamThingViewSet(
+    ConditionalViewSetMixin,
+    DeltaSyncViewSetMixin,
+    BulkViewSetMixin,
+    SearchViewSetMixin,
+    SparseFieldsetViewSetMixin,
+    viewsets.ModelViewSet,
+):
+    """Class-Based ViewSet for REST API access to TeamThings.
+    Also offers bulk create/update/delete at api/teamthings/bulk/, and lookups of many ids with ?ids= or at
+    api/teamthings/lookup/ (see BulkViewSetMixin).
+    Reads can ask for only some fields with ?fields= or ?omit= (see SparseFieldsetViewSetMixin).
+    Lists can be searched with ?q= (see SearchViewSetMixin).
+    ?since= lists only the changes since the last sync (see DeltaSyncViewSetMixin)."""
 
     serializer_class = TeamThingSerializer
     queryset = TeamThing.objects.all()
+    pagination_class = NameCursorPagination
+    query_budget = API_QUERY_BUDGET
 
     def get_queryset(self):
         qs = super().get_queryset().filter(team=self.request.team)
         return qs
+
+
+# --------------------------------------------------------------------------------
+
+# TeamThing (team-specific CRUD example) async implementation
+# The list and detail views, and the API's list and retrieve, as async views for when the site is served with ASGI.
+# They await the database rather than holding a thread while it works (see apps/crud_common/async_views.py).
+
+
+@query_budget(LIST_QUERY_BUDGET)
+@async_login_and_team_required
+async def teamthing_list_async_view(request, team_slug):
+    """Async Function-Based View list of TeamThings."""
+    context = {}
+
+    # Filter the set of objects to view to only show this team's objects, with the team preloaded,
+    # and load only the columns the list shows
+    teamthing_list = only_columns(
+        TeamThing.objects.filter(team=request.team).select_related("team"), LIST_COLUMNS, LIST_EXCERPTS
+    )
+
+    # Narrow the list down to the ?q= search results, if any, best match first
+    query = search_query(request)
+    if query:
+        teamthing_list = await asearch_queryset(teamthing_list, query, request.team)
+
+    if KEYSET_PAGINATION and not query:
+        page = await KeysetPaginator(teamthing_list, PAGINATE_BY).apage(request.GET.get(CURSOR_PARAM))
+    else:
+        # Gets this team's row count from the counter cache once there are a lot of objects.
+        # Search results are in rank order (so they don't get keyset pages), and are counted exactly
+        paginator = CountingPaginator(teamthing_list, PAGINATE_BY, team=request.team, counted=not query)
+        page = await apage(paginator, request.GET.get("page", 1))
+
+    # Lets crud_example_nav.html highlight "TeamThings" in the nav-bar
+    context["active_tab"] = "crud_example2"
+    context["search_query"] = query
+    context["page_obj"] = page
+    context["object_list"] = page.object_list
+    context["is_paginated"] = page.has_other_pages
+    context["elided_page_range"] = list(
+        page.paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1)
+    )
+    # Django renders a TemplateResponse after the view returns, in a thread
+    return TemplateResponse(request, "crud_example2/teamthing_list.html", context)
+
+
+@query_budget(DETAIL_QUERY_BUDGET)
+@async_login_and_team_required
+@conditional_get(TeamThing)
+async def teamthing_detail_async_view(request, team_slug, pk):
+    """Async Function-Based View to see TeamThing details."""
+    context = {}
+    # Lets crud_example_nav.html highlight "TeamThings" in the nav-bar
+    context["active_tab"] = "crud_example2"
+    # Allow only if object belongs to this team
+    context["object"] = await aget_object_or_404(TeamThing, id=pk, team=request.team)
+    return TemplateResponse(request, "crud_example2/teamthing_detail.html", context)
+
+
+class TeamThingListAsyncView(AsyncLoginAndTeamRequiredMixin, AsyncSearchMixin, AsyncListView):
+    """Async Class-Based View list of TeamThings, with htmx pagination like TeamThingListHtmxView."""
+
+    model = TeamThing
+    paginate_by = PAGINATE_BY
+    keyset_pagination = KEYSET_PAGINATION
+    list_columns = LIST_COLUMNS
+    list_excerpts = LIST_EXCERPTS
+    query_budget = LIST_QUERY_BUDGET
+
+    def get_queryset(self):
+        # Filter the set of objects to view to only show this team's objects, with the team preloaded
+        return super().get_queryset().filter(team=self.request.team).select_related("team")
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Lets crud_example_nav.html highlight "TeamThings" in the nav-bar
+        context["active_tab"] = "crud_example2"
+        return context
+
+    def get_template_names(self):
+        """If we are receiving an htmx request for the object-list, return the
+        corresponding partial template, else the whole-page template."""
+        if self.request.htmx.target == "object-list":
+            return ["crud_example2/teamthing_list_htmx_partial.html"]
+        else:
+            # Use the full template
+            return ["crud_example2/teamthing_list_htmx.html"]
+
+
+class TeamThingDetailAsyncView(AsyncLoginAndTeamRequiredMixin, AsyncConditionalGetMixin, AsyncDetailView):
+    """Async Class-Based View to see TeamThing details."""
+
+    model = TeamThing
+    query_budget = DETAIL_QUERY_BUDGET
+
+    def get_queryset(self):
+        # Allow only if object belongs to this team
+        return super().get_queryset().filter(team=self.request.team)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Lets crud_example_nav.html highlight "TeamThings" in the nav-bar
+        context["active_tab"] = "crud_example2"
+        return context
+
+
+class TeamThingAsyncAPIView(AsyncModelAPIView):
+    """Async, read-only counterpart of TeamThingViewSet's list and retrieve."""
+
+    model = TeamThing
+    viewset_class = TeamThingViewSet
+    query_budget = API_QUERY_BUDGET
+
+    def get_queryset(self):
+        return super().get_queryset().filter(team=self.request.team)
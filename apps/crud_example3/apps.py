@@ -4,3 +4,43 @@ from django.apps import AppConfig
 class CrudExample3Config(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.crud_example3"
+
+    def ready(self):
+        from apps.crud_common.signals import track_model
+        from apps.crud_common.view_registry import register_views
+
+        from . import views
+        from .models import PermThing
+        from .permissions import PERM_LEVELS, set_permission_level, track_permission_changes
+
+        track_model(PermThing, search_fields=["name", "notes"], rollup_field="number")
+        track_permission_changes()
+        # Every implementation of every view, for the benchmarks and the query budget and plan tests
+        # (see apps/crud_common/view_registry.py)
+        register_views(
+            self.label,
+            PermThing,
+            {
+                ("list", "fbv"): views.permthing_list_view,
+                ("list", "htmx"): views.PermThingListHtmxView.as_view(),
+                ("list", "async_fbv"): views.permthing_list_async_view,
+                ("list", "async_cbv"): views.PermThingListAsyncView.as_view(),
+                ("detail", "fbv"): views.permthing_detail_view,
+                ("detail", "cbv"): views.PermThingDetailView.as_view(),
+                ("detail", "async_fbv"): views.permthing_detail_async_view,
+                ("detail", "async_cbv"): views.PermThingDetailAsyncView.as_view(),
+                ("create", "fbv"): views.permthing_create_view,
+                ("create", "cbv"): views.PermThingCreateView.as_view(),
+                ("update", "fbv"): views.permthing_update_view,
+                ("update", "cbv"): views.PermThingUpdateView.as_view(),
+                ("delete", "fbv"): views.permthing_delete_view,
+                ("delete", "cbv"): views.PermThingDeleteView.as_view(),
+                ("stats", "fbv"): views.permthing_stats_view,
+                ("set_perms", "fbv"): views.permthing_set_perms_view,
+            },
+            form_data={"name": "Benchmark Thing", "number": 42, "notes": "Notes"},
+            # All of the PermThing permissions, rather than a superuser, so the permission checks are the real ones
+            setup_user=lambda user: set_permission_level(user, len(PERM_LEVELS)),
+            # Sets the same permissions again
+            url_kwargs={"set_perms": {"perm_level": len(PERM_LEVELS)}},
+        )
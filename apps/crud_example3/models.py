@@ -18,6 +18,12 @@ class PermThing(BaseTeamModel):
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            # Serves the team's lists in order (by name, then id for the keyset pagination), without sorting its rows
+            models.Index(fields=["team", "name", "id"]),
+            # Lets the stats rollups recompute one bucket of numbers without reading all of the team's rows
+            models.Index(fields=["team", "number"]),
+        ]
         # In addition to the standard "view_permthing", "change_permthing", "add_permthing", and "delete_permthing"
         # permissions, let's make a custom one that will mean user can only see the summary-info about these objects
         permissions = [
@@ -0,0 +1,138 @@
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.mixins import UserPassesTestMixin
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete
+
+from apps.crud_common.fragment_cache import bump_version, get_version
+
+# A snapshot of the user's PermThing permissions, shared by the views and the templates.
+# Each has_perm() check, and each {% if perms... %} in a template, goes through the auth backends. Instead we look
+# the user's PermThing permissions up once, as a dict like {"view_permthing": True, ...}, and keep it on the request
+# for the views, and in the context as permthing_perms for the templates.
+# The snapshot is also cached across requests, so after the first request permission checks cost no queries at all.
+# The cache key has a version stamp that is bumped whenever group memberships, group permissions or user permissions
+# change, or a group, permission or user is deleted (which removes their memberships and grants without an
+# m2m_changed signal, and lets a new user reuse the id), and includes is_active and is_superuser, which also change
+# what a user may do.
+
+# The PermThing permissions, in order of the levels the demo controls set: level N grants the first N of these
+PERM_LEVELS = [
+    "view_summary_permthing",
+    "view_permthing",
+    "change_permthing",
+    "add_permthing",
+    "delete_permthing",
+]
+
+DEMO_GROUP_NAME = "Demo Permissions Group"
+
+# How long a snapshot is cached, in seconds. Changes are picked up straight away, this just limits the cache's size
+SNAPSHOT_TIMEOUT = 60 * 60
+
+
+def _snapshot_key(user):
+    version = get_version(Permission)
+    return f"crud_example3:perms:{version}:{user.pk}:{user.is_active:d}{user.is_superuser:d}"
+
+
+def get_permthing_perms(request):
+    """The user's PermThing permissions, as a dict of codename to True/False."""
+    snapshot = getattr(request, "_permthing_perms", None)
+    if snapshot is not None:
+        return snapshot
+    user = request.user
+    if not user.is_authenticated:
+        snapshot = dict.fromkeys(PERM_LEVELS, False)
+    else:
+        key = _snapshot_key(user)
+        snapshot = cache.get(key)
+        if snapshot is None:
+            granted = user.get_all_permissions()
+            snapshot = {codename: f"crud_example3.{codename}" in granted for codename in PERM_LEVELS}
+            cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+    request._permthing_perms = snapshot
+    return snapshot
+
+
+def has_permthing_perm(request, codename):
+    return get_permthing_perms(request)[codename]
+
+
+def permthing_perm_required(codename):
+    """Decorator for FBVs: a 403 unless the user has the PermThing permission (like permission_required(...,
+    raise_exception=True), but using the snapshot)."""
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _inner(request, *args, **kwargs):
+            if not has_permthing_perm(request, codename):
+                raise PermissionDenied
+            return view_func(request, *args, **kwargs)
+
+        return _inner
+
+    return decorator
+
+
+class PermThingPermsMixin(UserPassesTestMixin):
+    """Mixin for the CBVs: allow only users with the required_perm PermThing permission (if set), and put the
+    snapshot in the context as permthing_perms."""
+
+    required_perm = None
+
+    def test_func(self):
+        return self.required_perm is None or has_permthing_perm(self.request, self.required_perm)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["permthing_perms"] = get_permthing_perms(self.request)
+        return context
+
+
+def set_permission_level(user, level):
+    """Put the user in the demo group, and give the group the first level PERM_LEVELS permissions."""
+    group, _ = Group.objects.get_or_create(name=DEMO_GROUP_NAME)
+    user.groups.add(group)
+    # set() works out what to add and remove in one query, then does each in one more
+    group.permissions.set(
+        Permission.objects.filter(
+            content_type__app_label="crud_example3",
+            content_type__model="permthing",
+            codename__in=PERM_LEVELS[:level],
+        )
+    )
+
+
+def _bump_version_on_commit():
+    transaction.on_commit(lambda: bump_version(Permission))
+
+
+def _on_permissions_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        _bump_version_on_commit()
+
+
+def _on_deleted(sender, **kwargs):
+    _bump_version_on_commit()
+
+
+def track_permission_changes():
+    """Connect the signals that invalidate the cached snapshots. Called from the app's ready()."""
+    user_model = get_user_model()
+    for through in (user_model.groups.through, user_model.user_permissions.through, Group.permissions.through):
+        m2m_changed.connect(
+            _on_permissions_changed,
+            sender=through,
+            dispatch_uid=f"crud_example3_perms_{through._meta.label_lower}",
+        )
+    for model in (user_model, Group, Permission):
+        post_delete.connect(
+            _on_deleted,
+            sender=model,
+            dispatch_uid=f"crud_example3_perms_delete_{model._meta.label_lower}",
+        )
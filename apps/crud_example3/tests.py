@@ -1,3 +1,95 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from apps.crud_common.testing import QueryBudgetTestMixin, QueryPlanTestMixin
+from apps.teams.models import Membership, Team
+from apps.teams.roles import ROLE_ADMIN
+
+from .models import PermThing
+from .permissions import DEMO_GROUP_NAME, PERM_LEVELS, get_permthing_perms, set_permission_level
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """Every view of crud_example3 stays within its query budget, at any number of objects."""
+
+    app = "crud_example3"
+
+
+class QueryPlanTests(QueryPlanTestMixin, TestCase):
+    """The list, detail and API queries of crud_example3 are served by indexes."""
+
+    app = "crud_example3"
+
+
+class PermissionSnapshotTests(TestCase):
+    """The user's PermThing permissions are looked up once, kept on the request and in the cache, and looked up
+    again after they change."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="user")
+        cls.team = Team.objects.create(name="Team", slug="team")
+        Membership.objects.create(team=cls.team, user=cls.user, role=ROLE_ADMIN)
+        cls.thing = PermThing.objects.create(team=cls.team, name="Thing")
+
+    def setUp(self):
+        cache.clear()
+        # The version stamp isn't bumped by the changes of a TestCase (they never commit), and a later test's user
+        # may have the same id, so don't leave snapshots behind
+        self.addCleanup(cache.clear)
+
+    def _snapshot(self):
+        request = RequestFactory().get("/")
+        # A fresh user, without the permissions Django caches on the object
+        request.user = get_user_model().objects.get(pk=self.user.pk)
+        return request, get_permthing_perms(request)
+
+    def _set_level(self, level):
+        with self.captureOnCommitCallbacks(execute=True):
+            set_permission_level(self.user, level)
+
+    def test_levels(self):
+        self._set_level(2)
+        _, snapshot = self._snapshot()
+        self.assertEqual(snapshot, {codename: codename in PERM_LEVELS[:2] for codename in PERM_LEVELS})
+        self._set_level(4)
+        _, snapshot = self._snapshot()
+        self.assertEqual([codename for codename in PERM_LEVELS if snapshot[codename]], PERM_LEVELS[:4])
+
+    def test_deleted_group(self):
+        # Deleting the group removes the memberships and grants without an m2m_changed signal
+        self._set_level(2)
+        self.assertTrue(self._snapshot()[1]["view_permthing"])
+        with self.captureOnCommitCallbacks(execute=True):
+            Group.objects.get(name=DEMO_GROUP_NAME).delete()
+        self.assertEqual(self._snapshot()[1], dict.fromkeys(PERM_LEVELS, False))
+
+    def test_deleted_permission(self):
+        self._set_level(2)
+        self.assertTrue(self._snapshot()[1]["view_permthing"])
+        with self.captureOnCommitCallbacks(execute=True):
+            Permission.objects.get(codename="view_permthing").delete()
+        self.assertFalse(self._snapshot()[1]["view_permthing"])
+
+    def test_cached(self):
+        self._set_level(1)
+        request, _ = self._snapshot()
+        with self.assertNumQueries(0):
+            get_permthing_perms(request)
+        request = RequestFactory().get("/")
+        request.user = self.user
+        with self.assertNumQueries(0):
+            self.assertTrue(get_permthing_perms(request)["view_summary_permthing"])
+
+    def test_set_perms_view(self):
+        self.client.force_login(self.user)
+        detail_url = reverse("crud_example3:permthing_detail", kwargs={"team_slug": "team", "pk": self.thing.pk})
+        for level, status in ((1, 403), (2, 200), (1, 403)):
+            with self.subTest(level=level):
+                url = reverse("crud_example3:permthing_set_perms", kwargs={"team_slug": "team", "perm_level": level})
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.get(url)
+                self.assertEqual(self.client.get(detail_url).status_code, status)
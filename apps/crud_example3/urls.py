@@ -29,6 +29,18 @@ urlpatterns = [
     #
     # path("", views.PermThingListView.as_view(), name="permthing_list"),
     #
+    # URL paths for the async implementation, for when the site is served with ASGI
+    #
+    # path("", views.permthing_list_async_view, name="permthing_list"),
+    # path("<int:pk>/", views.permthing_detail_async_view, name="permthing_detail"),
+    # path("", views.PermThingListAsyncView.as_view(), name="permthing_list"),
+    # path("<int:pk>/", views.PermThingDetailAsyncView.as_view(), name="permthing_detail"),
+    #
+    # Streaming export of all of the team's PermThings, as NDJSON or CSV
+    path("export/", views.permthing_export_view, name="permthing_export"),
+    # Count, sum, min, max and histogram of the team's numbers, as JSON or as the htmx summary card
+    path("stats/", views.permthing_stats_view, name="permthing_stats"),
+    #
     # Special URL used to change my user's permissions, for demo purposes
     path("setperms/<int:perm_level>/", views.permthing_set_perms_view, name="permthing_set_perms"),
 ]
@@ -1,18 +1,42 @@
-from django.contrib.auth.mixins import UserPassesTestMixin
+from asgiref.sync import sync_to_async
 from django.http.response import HttpResponseRedirect
-from django.contrib.auth.decorators import permission_required
-from django.shortcuts import get_object_or_404, render
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.shortcuts import aget_object_or_404, get_object_or_404, render
+from django.template.response import TemplateResponse
+from django.core.paginator import EmptyPage, PageNotAnInteger
 from django.urls import reverse, reverse_lazy
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
-from django.contrib.auth.models import Group, Permission
-from django.contrib.contenttypes.models import ContentType
 
+from apps.crud_common.async_views import (
+    AsyncAccessMixin,
+    AsyncDetailView,
+    AsyncListView,
+    AsyncLoginAndTeamRequiredMixin,
+    apage,
+    async_access_check,
+    async_login_and_team_required,
+)
+from apps.crud_common.budgets import query_budget
+from apps.crud_common.columns import ListColumnsMixin, only_columns
+from apps.crud_common.conditional import AsyncConditionalGetMixin, ConditionalGetMixin, conditional_get
+from apps.crud_common.counts import CountingPaginator
+from apps.crud_common.export import export_response
+from apps.crud_common.fragment_cache import FragmentCacheMixin
+from apps.crud_common.pagination import CURSOR_PARAM, KeysetPaginator, ListPaginationMixin
+from apps.crud_common.rollups import stats_response
+from apps.crud_common.search import AsyncSearchMixin, SearchMixin, asearch_queryset, search_query, search_queryset
+from apps.crud_common.updates import SaveChangedFieldsMixin, save_changed
 from apps.teams.decorators import login_and_team_required
 from apps.teams.mixins import LoginAndTeamRequiredMixin
 
 from .forms import PermThingForm
 from .models import PermThing
+from .permissions import (
+    PermThingPermsMixin,
+    get_permthing_perms,
+    has_permthing_perm,
+    permthing_perm_required,
+    set_permission_level,
+)
 
 # --------------------------------------------------------------------------------
 
@@ -22,43 +46,38 @@ PAGINATE_BY = 4
 # For pagination, we use get_elided_page_range() to give a list of pages that always has some
 # pages at the beginning and end, and some on either side of current, with ellipsis where needed.
 
-# --------------------------------------------------------------------------------
-
+# Set KEYSET_PAGINATION to True to page by seeking on (name, id) with opaque next/previous cursors, instead of by
+# page number. Deep pages then cost the same as the first page, at the price of having no numbered page links.
+KEYSET_PAGINATION = False
+
+# The columns the list pages show, which are all they load. The notes are shown as an excerpt, so the full text
+# never leaves the database (updated_at is part of the row cache key, and the team is preloaded).
+# See apps/crud_common/columns.py
+LIST_COLUMNS = ["name", "number", "updated_at", "team"]
+LIST_EXCERPTS = ["notes"]
+
+# The fields included in an export
+EXPORT_FIELDS = ["id", "name", "number", "notes", "created_at", "updated_at"]
+
+# Query budgets: the most queries each kind of view may run, however many objects there are. Each is the most that
+# QueryBudgetTests measured for that kind of view, plus one to spare. They include looking up the session, the user,
+# the team and the membership. See apps/crud_common/budgets.py
+LIST_QUERY_BUDGET = 8
+DETAIL_QUERY_BUDGET = 6
+FORM_QUERY_BUDGET = 14
+DELETE_QUERY_BUDGET = 12
+OTHER_QUERY_BUDGET = 6
+# Changing the permissions: the group, the user's groups, and the permissions to add and remove
+SET_PERMS_QUERY_BUDGET = 9
 
-perms = [
-    "view_summary_permthing",
-    "view_permthing",
-    "change_permthing",
-    "add_permthing",
-    "delete_permthing",
-]
+# --------------------------------------------------------------------------------
 
 
+@query_budget(SET_PERMS_QUERY_BUDGET)
 @login_and_team_required
 def permthing_set_perms_view(request, team_slug, perm_level):
     """Function-Based View to change the user's permissions."""
-    # If this is our first time through, let's create a Group to hold the permissions
-    print(f"In permthing_set_perms_view. level {perm_level}")
-    group_name = "Demo Permissions Group"
-    try:
-        group = Group.objects.get(name=group_name)
-    except Group.DoesNotExist:
-        group = Group(name=group_name)
-        group.save()
-        print(f"Created Group {group_name}")
-    # And add the current user to the group
-    request.user.groups.add(group)
-
-    ct = ContentType.objects.filter(app_label="crud_example3").get(model="permthing")
-    print(f"{ct=}")
-    for p in Permission.objects.filter(content_type_id=ct):
-        if perm_level > perms.index(p.codename):
-            print(f"  Adding {p.codename}")
-            group.permissions.add(p)
-        else:
-            print(f"  Removing {p.codename}")
-            group.permissions.remove(p)
-
+    set_permission_level(request.user, perm_level)
     return HttpResponseRedirect(
         "", headers={"HX-Redirect": reverse("crud_example3:permthing_list", kwargs={"team_slug": team_slug})}
     )
@@ -71,34 +90,61 @@ def permthing_set_perms_view(request, team_slug, perm_level):
 
 # Note: This view should in theory require crud_example3.view_summary_permthing permission, however the
 # demo controls for setting permissions are on the page itself, so we need to always offer this view
+@query_budget(LIST_QUERY_BUDGET)
 @login_and_team_required
 def permthing_list_view(request, team_slug):
     """Function-Based View list of PermThings."""
     context = {}
 
     # Filter the set of objects to view to only show this team's objects
-    permthing_list = PermThing.objects.filter(team=request.team)
+    # (select_related preloads the team, so nothing that touches object.team costs a query per row)
+    # and load only the columns the list shows
+    permthing_list = only_columns(
+        PermThing.objects.filter(team=request.team).select_related("team"), LIST_COLUMNS, LIST_EXCERPTS
+    )
 
-    paginator = Paginator(permthing_list, PAGINATE_BY)
-    page = request.GET.get("page", 1)
-    try:
-        page = paginator.page(page)
-    except PageNotAnInteger:
-        page = paginator.page(1)
-    except EmptyPage:
-        page = paginator.page(paginator.num_pages)
+    # Narrow the list down to the ?q= search results, if any, best match first
+    query = search_query(request)
+    if query:
+        permthing_list = search_queryset(permthing_list, query, request.team)
+
+    if KEYSET_PAGINATION and not query:
+        page = KeysetPaginator(permthing_list, PAGINATE_BY).page(request.GET.get(CURSOR_PARAM))
+    else:
+        # Gets this team's row count from the counter cache once there are a lot of objects.
+        # Search results are in rank order (so they don't get keyset pages), and are counted exactly
+        paginator = CountingPaginator(permthing_list, PAGINATE_BY, team=request.team, counted=not query)
+        page = request.GET.get("page", 1)
+        try:
+            page = paginator.page(page)
+        except PageNotAnInteger:
+            page = paginator.page(1)
+        except EmptyPage:
+            page = paginator.page(paginator.num_pages)
 
     # Lets crud_example_nav.html highlight "PermThings" in the nav-bar
     context["active_tab"] = "crud_example3"
+    context["search_query"] = query
     context["page_obj"] = page
     context["object_list"] = page.object_list
     context["is_paginated"] = page.has_other_pages
-    context["elided_page_range"] = list(paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1))
+    context["elided_page_range"] = list(
+        page.paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1)
+    )
+    # Looked up once, for all the permission checks in the template
+    context["permthing_perms"] = get_permthing_perms(request)
     return render(request, "crud_example3/permthing_list.html", context)
 
 
-@permission_required("crud_example3.view_permthing", raise_exception=True)
+def permthing_perms(request):
+    """The user's PermThing permissions, which change what the PermThing pages show."""
+    return sorted(codename for codename, granted in get_permthing_perms(request).items() if granted)
+
+
+@query_budget(DETAIL_QUERY_BUDGET)
+@permthing_perm_required("view_permthing")
 @login_and_team_required
+@conditional_get(PermThing, vary=permthing_perms)
 def permthing_detail_view(request, team_slug, pk):
     """Function-Based View to see PermThing details."""
     context = {}
@@ -106,10 +152,13 @@ def permthing_detail_view(request, team_slug, pk):
     context["active_tab"] = "crud_example3"
     # Allow only if object belongs to this team
     context["object"] = get_object_or_404(PermThing, id=pk, team=request.team)
+    # Looked up once, for all the permission checks in the template
+    context["permthing_perms"] = get_permthing_perms(request)
     return render(request, "crud_example3/permthing_detail.html", context)
 
 
-@permission_required("crud_example3.add_permthing", raise_exception=True)
+@query_budget(FORM_QUERY_BUDGET)
+@permthing_perm_required("add_permthing")
 @login_and_team_required
 def permthing_create_view(request, team_slug):
     """Function-Based View to create a PermThing."""
@@ -129,7 +178,8 @@ def permthing_create_view(request, team_slug):
     return render(request, "crud_example3/permthing_form.html", context)
 
 
-@permission_required("crud_example3.change_permthing", raise_exception=True)
+@query_budget(FORM_QUERY_BUDGET)
+@permthing_perm_required("change_permthing")
 @login_and_team_required
 def permthing_update_view(request, team_slug, pk):
     """Function-Based View to update a PermThing."""
@@ -138,7 +188,7 @@ def permthing_update_view(request, team_slug, pk):
     obj = get_object_or_404(PermThing, id=pk, team=request.team)
     form = PermThingForm(request.POST or None, instance=obj)
     if form.is_valid():
-        form.save()
+        save_changed(form)
         return HttpResponseRedirect(
             reverse("crud_example3:permthing_detail", kwargs={"team_slug": team_slug, "pk": pk})
         )
@@ -150,7 +200,8 @@ def permthing_update_view(request, team_slug, pk):
     return render(request, "crud_example3/permthing_form.html", context)
 
 
-@permission_required("crud_example3.delete_permthing", raise_exception=True)
+@query_budget(DELETE_QUERY_BUDGET)
+@permthing_perm_required("delete_permthing")
 @login_and_team_required
 def permthing_delete_view(request, team_slug, pk):
     """Function-Based View to delete a PermThing."""
@@ -160,18 +211,41 @@ def permthing_delete_view(request, team_slug, pk):
     return HttpResponseRedirect(reverse("crud_example3:permthing_list", kwargs={"team_slug": team_slug}))
 
 
+@permthing_perm_required("view_permthing")
+@login_and_team_required
+def permthing_export_view(request, team_slug):
+    """Function-Based View to download all of this team's PermThings, streamed as NDJSON or CSV."""
+    return export_response(request, PermThing.objects.filter(team=request.team), EXPORT_FIELDS, "permthings")
+
+
+@query_budget(OTHER_QUERY_BUDGET)
+@permthing_perm_required("view_summary_permthing")
+@login_and_team_required
+def permthing_stats_view(request, team_slug):
+    """Function-Based View of the stats of this team's PermThing numbers, as JSON or as the htmx summary card
+    (see apps/crud_common/rollups.py)."""
+    return stats_response(request, PermThing, team=request.team)
+
+
 # --------------------------------------------------------------------------------
 
 # PermThing (team-specific CRUD example) Class-Based View implementation
 
 
-class PermThingDetailView(LoginAndTeamRequiredMixin, UserPassesTestMixin, DetailView):
+class PermThingDetailView(LoginAndTeamRequiredMixin, PermThingPermsMixin, ConditionalGetMixin, DetailView):
     """Class-Based View to see PermThing details."""
 
     model = PermThing
+    query_budget = DETAIL_QUERY_BUDGET
+
+    required_perm = "view_permthing"
+
+    def get_queryset(self):
+        # Allow only if object belongs to this team
+        return super().get_queryset().filter(team=self.request.team)
 
-    def test_func(self):
-        return self.request.user.has_perm("crud_example3.view_permthing")
+    def get_conditional_vary(self, request):
+        return permthing_perms(request)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -180,14 +254,14 @@ class PermThingDetailView(LoginAndTeamRequiredMixin, UserPassesTestMixin, Detail
         return context
 
 
-class PermThingCreateView(LoginAndTeamRequiredMixin, UserPassesTestMixin, CreateView):
+class PermThingCreateView(LoginAndTeamRequiredMixin, PermThingPermsMixin, CreateView):
     """Class-Based View to create a PermThing."""
 
     model = PermThing
     form_class = PermThingForm
+    query_budget = FORM_QUERY_BUDGET
 
-    def test_func(self):
-        return self.request.user.has_perm("crud_example3.add_permthing")
+    required_perm = "add_permthing"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -200,14 +274,14 @@ class PermThingCreateView(LoginAndTeamRequiredMixin, UserPassesTestMixin, Create
         return super().form_valid(form)
 
 
-class PermThingUpdateView(LoginAndTeamRequiredMixin, UserPassesTestMixin, UpdateView):
+class PermThingUpdateView(LoginAndTeamRequiredMixin, PermThingPermsMixin, SaveChangedFieldsMixin, UpdateView):
     """Class-Based View to update a PermThing."""
 
     model = PermThing
     form_class = PermThingForm
+    query_budget = FORM_QUERY_BUDGET
 
-    def test_func(self):
-        return self.request.user.has_perm("crud_example3.change_permthing")
+    required_perm = "change_permthing"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -216,13 +290,13 @@ class PermThingUpdateView(LoginAndTeamRequiredMixin, UserPassesTestMixin, Update
         return context
 
 
-class PermThingDeleteView(LoginAndTeamRequiredMixin, UserPassesTestMixin, DeleteView):
+class PermThingDeleteView(LoginAndTeamRequiredMixin, PermThingPermsMixin, DeleteView):
     """Class-Based View to delete a PermThing."""
 
     model = PermThing
+    query_budget = DELETE_QUERY_BUDGET
 
-    def test_func(self):
-        return self.request.user.has_perm("crud_example3.delete_permthing")
+    required_perm = "delete_permthing"
 
     def get_success_url(self):
         return reverse_lazy("crud_example3:permthing_list", kwargs={"team_slug": self.request.team.slug})
@@ -236,16 +310,33 @@ class PermThingDeleteView(LoginAndTeamRequiredMixin, UserPassesTestMixin, Delete
 
 # Note: This view should in theory require crud_example3.view_summary_permthing permission, however the
 # demo controls for setting permissions are on the page itself, so we need to always offer this view
-class PermThingListHtmxView(LoginAndTeamRequiredMixin, ListView):
+class PermThingListHtmxView(
+    LoginAndTeamRequiredMixin,
+    PermThingPermsMixin,
+    FragmentCacheMixin,
+    ListPaginationMixin,
+    ListColumnsMixin,
+    SearchMixin,
+    ListView,
+):
     """Enhanced Class-Based View list of PermThings.
     Uses htmx to implement pagination with clean visuals when updating.
     We configure a single URL endpoint to use for both the full-page render, and the htmx update
     (see get_template_names())
+    The htmx partial is served from the fragment cache while this team's objects are unchanged.
     """
 
     model = PermThing
     paginate_by = PAGINATE_BY
+    keyset_pagination = KEYSET_PAGINATION
+    list_columns = LIST_COLUMNS
+    list_excerpts = LIST_EXCERPTS
     template_name = "crud_example3/permthing_list.html"
+    query_budget = LIST_QUERY_BUDGET
+
+    def get_queryset(self):
+        # Filter the set of objects to view to only show this team's objects, with the team preloaded
+        return super().get_queryset().filter(team=self.request.team).select_related("team")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -266,3 +357,140 @@ class PermThingListHtmxView(LoginAndTeamRequiredMixin, ListView):
         else:
             # Use the full template
             return ["crud_example3/permthing_list_htmx.html"]
+
+    def get_fragment_cache_vary(self):
+        # Rows only link to the detail page if the user may view it, so cache separately for each case
+        return (has_permthing_perm(self.request, "view_permthing"),)
+
+
+# --------------------------------------------------------------------------------
+
+# PermThing (team-specific CRUD example) async implementation
+# The list and detail views as async views, for when the site is served with ASGI.
+# They await the database rather than holding a thread while it works (see apps/crud_common/async_views.py).
+
+
+def _view_permthing_required(view_func):
+    # The same checks, in the same order, as the decorators on permthing_detail_view
+    return permthing_perm_required("view_permthing")(login_and_team_required(view_func))
+
+
+async_view_permthing_required = async_access_check(_view_permthing_required)
+
+
+# Note: This view should in theory require crud_example3.view_summary_permthing permission, however the
+# demo controls for setting permissions are on the page itself, so we need to always offer this view
+@query_budget(LIST_QUERY_BUDGET)
+@async_login_and_team_required
+async def permthing_list_async_view(request, team_slug):
+    """Async Function-Based View list of PermThings."""
+    context = {}
+
+    # Filter the set of objects to view to only show this team's objects, with the team preloaded,
+    # and load only the columns the list shows
+    permthing_list = only_columns(
+        PermThing.objects.filter(team=request.team).select_related("team"), LIST_COLUMNS, LIST_EXCERPTS
+    )
+
+    # Narrow the list down to the ?q= search results, if any, best match first
+    query = search_query(request)
+    if query:
+        permthing_list = await asearch_queryset(permthing_list, query, request.team)
+
+    if KEYSET_PAGINATION and not query:
+        page = await KeysetPaginator(permthing_list, PAGINATE_BY).apage(request.GET.get(CURSOR_PARAM))
+    else:
+        # Gets this team's row count from the counter cache once there are a lot of objects.
+        # Search results are in rank order (so they don't get keyset pages), and are counted exactly
+        paginator = CountingPaginator(permthing_list, PAGINATE_BY, team=request.team, counted=not query)
+        page = await apage(paginator, request.GET.get("page", 1))
+
+    # Lets crud_example_nav.html highlight "PermThings" in the nav-bar
+    context["active_tab"] = "crud_example3"
+    context["search_query"] = query
+    context["page_obj"] = page
+    context["object_list"] = page.object_list
+    context["is_paginated"] = page.has_other_pages
+    context["elided_page_range"] = list(
+        page.paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1)
+    )
+    # The snapshot may need the database, the first time
+    context["permthing_perms"] = await sync_to_async(get_permthing_perms)(request)
+    # Django renders a TemplateResponse after the view returns, in a thread
+    return TemplateResponse(request, "crud_example3/permthing_list.html", context)
+
+
+@query_budget(DETAIL_QUERY_BUDGET)
+@async_view_permthing_required
+@conditional_get(PermThing, vary=permthing_perms)
+async def permthing_detail_async_view(request, team_slug, pk):
+    """Async Function-Based View to see PermThing details."""
+    context = {}
+    # Lets crud_example_nav.html highlight "PermThings" in the nav-bar
+    context["active_tab"] = "crud_example3"
+    # Allow only if object belongs to this team
+    context["object"] = await aget_object_or_404(PermThing, id=pk, team=request.team)
+    # Already looked up by the permission check
+    context["permthing_perms"] = get_permthing_perms(request)
+    return TemplateResponse(request, "crud_example3/permthing_detail.html", context)
+
+
+# Note: This view should in theory require crud_example3.view_summary_permthing permission, however the
+# demo controls for setting permissions are on the page itself, so we need to always offer this view
+class PermThingListAsyncView(AsyncLoginAndTeamRequiredMixin, AsyncSearchMixin, AsyncListView):
+    """Async Class-Based View list of PermThings, with htmx pagination like PermThingListHtmxView."""
+
+    model = PermThing
+    paginate_by = PAGINATE_BY
+    keyset_pagination = KEYSET_PAGINATION
+    list_columns = LIST_COLUMNS
+    list_excerpts = LIST_EXCERPTS
+    query_budget = LIST_QUERY_BUDGET
+
+    async def get(self, request, *args, **kwargs):
+        # The snapshot may need the database, the first time
+        self.permthing_perms = await sync_to_async(get_permthing_perms)(request)
+        return await super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        # Filter the set of objects to view to only show this team's objects, with the team preloaded
+        return super().get_queryset().filter(team=self.request.team).select_related("team")
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Lets crud_example_nav.html highlight "PermThings" in the nav-bar
+        context["active_tab"] = "crud_example3"
+        context["permthing_perms"] = self.permthing_perms
+        return context
+
+    def get_template_names(self):
+        """If we are receiving an htmx request for the object-list, return the
+        corresponding partial template, else the whole-page template."""
+        if self.request.htmx.target == "object-list":
+            return ["crud_example3/permthing_list_htmx_partial.html"]
+        else:
+            # Use the full template
+            return ["crud_example3/permthing_list_htmx.html"]
+
+
+class PermThingDetailAsyncView(AsyncAccessMixin, AsyncConditionalGetMixin, AsyncDetailView):
+    """Async Class-Based View to see PermThing details."""
+
+    model = PermThing
+    async_check = staticmethod(async_view_permthing_required)
+    query_budget = DETAIL_QUERY_BUDGET
+
+    def get_queryset(self):
+        # Allow only if object belongs to this team
+        return super().get_queryset().filter(team=self.request.team)
+
+    def get_conditional_vary(self, request):
+        return permthing_perms(request)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Lets crud_example_nav.html highlight "PermThings" in the nav-bar
+        context["active_tab"] = "crud_example3"
+        # Already looked up by the permission check
+        context["permthing_perms"] = get_permthing_perms(self.request)
+        return context
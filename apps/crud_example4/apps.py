@@ -4,3 +4,37 @@ from django.apps import AppConfig
 class CrudExample4Config(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.crud_example4"
+
+    def ready(self):
+        from apps.crud_common.signals import track_model
+        from apps.crud_common.view_registry import register_views
+
+        from . import views
+        from .models import InputThing
+
+        track_model(InputThing, search_fields=["name", "notes1", "notes2"], rollup_field="number")
+        # Every implementation of every view, for the benchmarks and the query budget and plan tests
+        # (see apps/crud_common/view_registry.py)
+        register_views(
+            self.label,
+            InputThing,
+            {
+                ("list", "htmx"): views.InputThingListHtmxView.as_view(),
+                ("list", "async_cbv"): views.InputThingListAsyncView.as_view(),
+                ("detail", "cbv"): views.InputThingDetailView.as_view(),
+                ("detail", "async_cbv"): views.InputThingDetailAsyncView.as_view(),
+                ("create", "cbv"): views.InputThingCreateView.as_view(),
+                ("update", "cbv"): views.InputThingUpdateView.as_view(),
+                ("delete", "cbv"): views.InputThingDeleteView.as_view(),
+                ("stats", "cbv"): views.InputThingStatsView.as_view(),
+                ("import", "cbv"): views.InputThingImportView.as_view(),
+            },
+            form_data={
+                "name": "Benchmark Thing",
+                "number": 42,
+                "birthdate": "2000-01-01",
+                "email": "bench@example.com",
+                "notes1": "Notes",
+                "notes2": "",
+            },
+        )
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from apps.web.templatetags.form_tags_x import clear_template_caches
+
+from ...forms import InputThingForm
+
+# The fields of crud_example4/inputthing_form.html, rendered with the same tags and arguments
+FORM_FIELDS_TEMPLATE = """{% load form_tags_x %}
+{% render_text_input form.name %}
+{% render_text_input form.birthdate type="date" %}
+{% render_text_input form.email xmodel="email" %}
+{% render_checkbox_input form.extra xmodel="extra" %}
+{% render_text_input form.number %}
+{% render_text_input form.blocked1 disabled=True %}
+{% render_text_input form.blocked2 locked=True %}
+{% render_text_input form.notes1 %}
+{% render_text_input form.notes2 rows=3 %}
+"""
+
+
+class Command(BaseCommand):
+    help = "Times rendering the InputThing form with the form_tags_x tags, with and without their template cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--renders", type=int, default=1000, help="How many times to render the form")
+
+    def handle(self, *args, **options):
+        renders = options["renders"]
+        fields_template = Template(FORM_FIELDS_TEMPLATE)
+        context = Context({"form": InputThingForm()})
+
+        def time_renders(cached):
+            start = time.perf_counter()
+            for _ in range(renders):
+                if not cached:
+                    # Compile every field's template again, as the tags did before they had a cache
+                    clear_template_caches()
+                fields_template.render(context)
+            return (time.perf_counter() - start) / renders * 1000
+
+        # Warm up, so neither run pays for first-time imports
+        time_renders(cached=True)
+        uncached = time_renders(cached=False)
+        cached = time_renders(cached=True)
+        self.stdout.write(f"Without the template cache: {uncached:.3f} ms per form render")
+        self.stdout.write(f"With the template cache:    {cached:.3f} ms per form render")
+        self.stdout.write(
+            self.style.SUCCESS(f"Saving: {uncached - cached:.3f} ms per form render ({1 - cached / uncached:.0%})")
+        )
@@ -24,3 +24,9 @@ class InputThing(BaseTeamModel):
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            # Serves the team's lists in order (by name, then id for the keyset pagination), without sorting its rows
+            models.Index(fields=["team", "name", "id"]),
+            # Lets the stats rollups recompute one bucket of numbers without reading all of the team's rows
+            models.Index(fields=["team", "number"]),
+        ]
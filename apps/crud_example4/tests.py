@@ -1,3 +1,63 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase
+
+from apps.crud_common.testing import QueryBudgetTestMixin, QueryPlanTestMixin
+from apps.web.templatetags.form_tags_x import _text_input_template, clear_template_caches
+
+from .forms import InputThingForm
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """Every view of crud_example4 stays within its query budget, at any number of objects."""
+
+    app = "crud_example4"
+
+
+class QueryPlanTests(QueryPlanTestMixin, TestCase):
+    """The list, detail and API queries of crud_example4 are served by indexes."""
+
+    app = "crud_example4"
+
+
+class FormTagsTemplateCacheTests(SimpleTestCase):
+    """The form_tags_x tags compile one template per combination of arguments, and render every field with it."""
+
+    def setUp(self):
+        clear_template_caches()
+        self.addCleanup(clear_template_caches)
+
+    def _render(self, text, **data):
+        form = InputThingForm(data=data or None)
+        return Template("{% load form_tags_x %}" + text).render(Context({"form": form}))
+
+    def test_one_template_per_combination(self):
+        html = self._render("{% render_text_input form.name %}{% render_text_input form.email %}")
+        self.assertIn('name="name"', html)
+        self.assertIn('name="email"', html)
+        self.assertEqual(_text_input_template.cache_info().currsize, 1)
+        self._render('{% render_text_input form.notes2 rows=3 %}{% render_text_input form.name %}')
+        info = _text_input_template.cache_info()
+        self.assertEqual((info.currsize, info.hits), (2, 2))
+
+    def test_renders_like_without_the_cache(self):
+        text = (
+            '{% render_text_input form.name xmodel="name" %}{% render_text_input form.blocked2 locked=True %}'
+            '{% render_checkbox_input form.extra %}'
+        )
+        cached = self._render(text + text, name="Thing")
+        clear_template_caches()
+        uncached = self._render(text, name="Thing")
+        self.assertEqual(cached, uncached * 2)
+        self.assertIn('x-model="name"', cached)
+        self.assertIn('value="Thing"', cached)
+        # A locked field has the lock icon, and a hidden copy that posts
+        self.assertIn("fa-lock", cached)
+        self.assertIn('type="hidden" name="blocked2"', cached)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_form_tags", renders=2, stdout=out)
+        self.assertIn("With the template cache", out.getvalue())
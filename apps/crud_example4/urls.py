@@ -16,4 +16,14 @@ urlpatterns = [
     path("new/", views.InputThingCreateView.as_view(), name="inputthing_create"),
     path("<int:pk>/update/", views.InputThingUpdateView.as_view(), name="inputthing_update"),
     path("<int:pk>/delete/", views.InputThingDeleteView.as_view(), name="inputthing_delete"),
+    # Async list and detail, for when the site is served with ASGI (in place of the list and detail paths above)
+    # path("", views.InputThingListAsyncView.as_view(), name="inputthing_list"),
+    # path("<int:pk>/", views.InputThingDetailAsyncView.as_view(), name="inputthing_detail"),
+    # Streaming export of all of the team's InputThings, as NDJSON or CSV
+    path("export/", views.InputThingExportView.as_view(), name="inputthing_export"),
+    # Count, sum, min, max and histogram of the team's numbers, as JSON or as the htmx summary card
+    path("stats/", views.InputThingStatsView.as_view(), name="inputthing_stats"),
+    # Background import of InputThings from a CSV or NDJSON file, and the progress of an import
+    path("import/", views.InputThingImportView.as_view(), name="inputthing_import"),
+    path("import/<slug:job_id>/", views.InputThingImportStatusView.as_view(), name="inputthing_import_status"),
 ]
@@ -1,6 +1,18 @@
-from django.urls import reverse_lazy
-from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
+from django.http import Http404
+from django.urls import reverse, reverse_lazy
+from django.views.generic import CreateView, DeleteView, DetailView, FormView, ListView, TemplateView, UpdateView, View
 
+from apps.crud_common.async_views import AsyncDetailView, AsyncListView, AsyncLoginAndTeamRequiredMixin
+from apps.crud_common.columns import ListColumnsMixin, only_columns
+from apps.crud_common.conditional import AsyncConditionalGetMixin, ConditionalGetMixin
+from apps.crud_common.export import export_response
+from apps.crud_common.forms import ImportFileForm
+from apps.crud_common.fragment_cache import FragmentCacheMixin
+from apps.crud_common.imports import get_import_status, start_import
+from apps.crud_common.pagination import ListPaginationMixin
+from apps.crud_common.rollups import stats_response
+from apps.crud_common.search import AsyncSearchMixin, SearchMixin
+from apps.crud_common.updates import SaveChangedFieldsMixin
 from apps.teams.mixins import LoginAndTeamRequiredMixin
 
 from .forms import InputThingForm
@@ -14,15 +26,55 @@ PAGINATE_BY = 4
 # For pagination, we use get_elided_page_range() to give a list of pages that always has some
 # pages at the beginning and end, and some on either side of current, with ellipsis where needed.
 
+# Set KEYSET_PAGINATION to True to page by seeking on (name, id) with opaque next/previous cursors, instead of by
+# page number. Deep pages then cost the same as the first page, at the price of having no numbered page links.
+KEYSET_PAGINATION = False
+
+# The columns the list pages show, which are all they load. The notes are shown as an excerpt, so the full text
+# never leaves the database (updated_at is part of the row cache key, and the team is preloaded).
+# See apps/crud_common/columns.py
+LIST_COLUMNS = ["name", "number", "updated_at", "team"]
+LIST_EXCERPTS = ["notes1"]
+
+# The fields included in an export
+EXPORT_FIELDS = [
+    "id",
+    "name",
+    "birthdate",
+    "email",
+    "extra",
+    "number",
+    "notes1",
+    "notes2",
+    "blocked1",
+    "blocked2",
+    "created_at",
+    "updated_at",
+]
+
+# Query budgets: the most queries each kind of view may run, however many objects there are. Each is the most that
+# QueryBudgetTests measured for that kind of view, plus one to spare. They include looking up the session, the user,
+# the team and the membership. See apps/crud_common/budgets.py
+LIST_QUERY_BUDGET = 8
+DETAIL_QUERY_BUDGET = 6
+FORM_QUERY_BUDGET = 14
+DELETE_QUERY_BUDGET = 12
+OTHER_QUERY_BUDGET = 6
+
 # --------------------------------------------------------------------------------
 
 # InputThing (team-specific CRUD example) Class-Based View implementation
 
 
-class InputThingDetailView(LoginAndTeamRequiredMixin, DetailView):
+class InputThingDetailView(LoginAndTeamRequiredMixin, ConditionalGetMixin, DetailView):
     """Class-Based View to see InputThing details."""
 
     model = InputThing
+    query_budget = DETAIL_QUERY_BUDGET
+
+    def get_queryset(self):
+        # Allow only if object belongs to this team
+        return super().get_queryset().filter(team=self.request.team)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -36,6 +88,7 @@ class InputThingCreateView(LoginAndTeamRequiredMixin, CreateView):
 
     model = InputThing
     form_class = InputThingForm
+    query_budget = FORM_QUERY_BUDGET
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -48,11 +101,12 @@ class InputThingCreateView(LoginAndTeamRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
-class InputThingUpdateView(LoginAndTeamRequiredMixin, UpdateView):
+class InputThingUpdateView(LoginAndTeamRequiredMixin, SaveChangedFieldsMixin, UpdateView):
     """Class-Based View to update a InputThing."""
 
     model = InputThing
     form_class = InputThingForm
+    query_budget = FORM_QUERY_BUDGET
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -65,6 +119,7 @@ class InputThingDeleteView(LoginAndTeamRequiredMixin, DeleteView):
     """Class-Based View to delete a InputThing."""
 
     model = InputThing
+    query_budget = DELETE_QUERY_BUDGET
 
     def get_success_url(self):
         return reverse_lazy("crud_example4:inputthing_list", kwargs={"team_slug": self.request.team.slug})
@@ -76,16 +131,93 @@ class InputThingDeleteView(LoginAndTeamRequiredMixin, DeleteView):
         return context
 
 
-class InputThingListHtmxView(LoginAndTeamRequiredMixin, ListView):
+class InputThingExportView(LoginAndTeamRequiredMixin, View):
+    """Class-Based View to download all of this team's InputThings, streamed as NDJSON or CSV."""
+
+    def get(self, request, *args, **kwargs):
+        return export_response(request, InputThing.objects.filter(team=request.team), EXPORT_FIELDS, "inputthings")
+
+
+class InputThingStatsView(LoginAndTeamRequiredMixin, View):
+    """Class-Based View of the stats of this team's InputThing numbers, as JSON or as the htmx summary card
+    (see apps/crud_common/rollups.py)."""
+
+    query_budget = OTHER_QUERY_BUDGET
+
+    def get(self, request, *args, **kwargs):
+        return stats_response(request, InputThing, team=request.team)
+
+
+class InputThingImportView(LoginAndTeamRequiredMixin, FormView):
+    """Class-Based View to upload a CSV or NDJSON file of InputThings, which is imported in the background."""
+
+    form_class = ImportFileForm
+    template_name = "crud_example4/inputthing_import.html"
+    query_budget = OTHER_QUERY_BUDGET
+
+    def form_valid(self, form):
+        # Each row is validated with InputThingForm, and the new objects belong to my team
+        self.job_id = start_import(form.cleaned_data["file"], InputThingForm, self.request.user, self.request.team)
+        return super().form_valid(form)
+
+    def get_success_url(self):
+        return reverse(
+            "crud_example4:inputthing_import_status",
+            kwargs={"team_slug": self.request.team.slug, "job_id": self.job_id},
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Lets crud_example_nav.html highlight "InputThings" in the nav-bar
+        context["active_tab"] = "crud_example4"
+        return context
+
+
+class InputThingImportStatusView(LoginAndTeamRequiredMixin, TemplateView):
+    """Class-Based View of the progress of an import, with the rows that couldn't be imported."""
+
+    template_name = "crud_example4/inputthing_import.html"
+    query_budget = OTHER_QUERY_BUDGET
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Allow only if the job was started by me, for this team
+        context["job"] = get_import_status(kwargs["job_id"], self.request.user, self.request.team)
+        if context["job"] is None:
+            raise Http404("No such import")
+        # Lets crud_example_nav.html highlight "InputThings" in the nav-bar
+        context["active_tab"] = "crud_example4"
+        return context
+
+    def get_template_names(self):
+        """The status component polls for updates of itself, with htmx."""
+        if self.request.htmx:
+            return ["web/components/import_status.html"]
+        else:
+            return [self.template_name]
+
+
+class InputThingListHtmxView(
+    LoginAndTeamRequiredMixin, FragmentCacheMixin, ListPaginationMixin, ListColumnsMixin, SearchMixin, ListView
+):
     """Enhanced Class-Based View list of InputThings.
     Uses htmx to implement pagination with clean visuals when updating.
     We configure a single URL endpoint to use for both the full-page render, and the htmx update
     (see get_template_names())
+    The htmx partial is served from the fragment cache while this team's objects are unchanged.
     """
 
     model = InputThing
     paginate_by = PAGINATE_BY
+    keyset_pagination = KEYSET_PAGINATION
+    list_columns = LIST_COLUMNS
+    list_excerpts = LIST_EXCERPTS
     template_name = "crud_example4/inputthing_list.html"
+    query_budget = LIST_QUERY_BUDGET
+
+    def get_queryset(self):
+        # Filter the set of objects to view to only show this team's objects, with the team preloaded
+        return super().get_queryset().filter(team=self.request.team).select_related("team")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -106,3 +238,57 @@ class InputThingListHtmxView(LoginAndTeamRequiredMixin, ListView):
         else:
             # Use the full template
             return ["crud_example4/inputthing_list_htmx.html"]
+
+
+# --------------------------------------------------------------------------------
+
+# InputThing (team-specific CRUD example) async implementation
+# The list and detail views as async views, for when the site is served with ASGI.
+# They await the database rather than holding a thread while it works (see apps/crud_common/async_views.py).
+
+
+class InputThingListAsyncView(AsyncLoginAndTeamRequiredMixin, AsyncSearchMixin, AsyncListView):
+    """Async Class-Based View list of InputThings, with htmx pagination like InputThingListHtmxView."""
+
+    model = InputThing
+    paginate_by = PAGINATE_BY
+    keyset_pagination = KEYSET_PAGINATION
+    list_columns = LIST_COLUMNS
+    list_excerpts = LIST_EXCERPTS
+    query_budget = LIST_QUERY_BUDGET
+
+    def get_queryset(self):
+        # Filter the set of objects to view to only show this team's objects, with the team preloaded
+        return super().get_queryset().filter(team=self.request.team).select_related("team")
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Lets crud_example_nav.html highlight "InputThings" in the nav-bar
+        context["active_tab"] = "crud_example4"
+        return context
+
+    def get_template_names(self):
+        """If we are receiving an htmx request for the object-list, return the
+        corresponding partial template, else the whole-page template."""
+        if self.request.htmx.target == "object-list":
+            return ["crud_example4/inputthing_list_htmx_partial.html"]
+        else:
+            # Use the full template
+            return ["crud_example4/inputthing_list_htmx.html"]
+
+
+class InputThingDetailAsyncView(AsyncLoginAndTeamRequiredMixin, AsyncConditionalGetMixin, AsyncDetailView):
+    """Async Class-Based View to see InputThing details."""
+
+    model = InputThing
+    query_budget = DETAIL_QUERY_BUDGET
+
+    def get_queryset(self):
+        # Allow only if object belongs to this team
+        return super().get_queryset().filter(team=self.request.team)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Lets crud_example_nav.html highlight "InputThings" in the nav-bar
+        context["active_tab"] = "crud_example4"
+        return context
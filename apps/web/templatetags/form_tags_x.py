@@ -1,6 +1,6 @@
-from django import template
+from functools import lru_cache
 
-from .form_tags import _render_field
+from django import template
 
 # Django template tags based on the bulma-styled Pegasus form_tags.py, with extra capabilities
 
@@ -10,6 +10,9 @@ from .form_tags import _render_field
 
 register = template.Library()
 
+# How many compiled templates to keep, for each tag. Each combination of tag arguments used in the project needs one
+TEMPLATE_CACHE_SIZE = 128
+
 
 # General notes:
 # - django-widget-tweaks:
@@ -23,6 +26,12 @@ register = template.Library()
 #     hidden non-disabled copy that will post. Otherwise our form validation needs to be
 #     overridden to allow disabled field values to be "missing" at post.
 # - I use F-strings, which means any literal { } within have to be doubled
+# - Compiled templates are cached:
+#   - Each tag builds its template text from its arguments, and compiling that text is most of the cost of
+#     rendering a field. So the text is built and compiled once for each combination of arguments (type, rows,
+#     disabled, locked, xmodel, xref), and kept in an LRU cache. Only rendering is done on every call.
+#   - The form field itself is passed in the context, so the same compiled template serves every field
+#   - See the benchmark_form_tags management command (crud_example4) for the saving
 
 
 @register.simple_tag
@@ -36,6 +45,11 @@ def render_text_input(form_field, disabled=False, locked=False, rows=None, type=
     - xmodel: Optional, AlpineJS variable to use as x-model
     - xref: Optional, name to use as AlpineJS x-ref"""
     disabled = disabled or locked
+    return _render_compiled(_text_input_template(disabled, locked, rows, type, xmodel, xref), form_field)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _text_input_template(disabled, locked, rows, type, xmodel, xref):
     rows_attr = f"rows={rows}" if rows else ""
     type_attr = f'type="{type}" class="input"' if type else ""
     x_model_attr = f'x-model="{xmodel}"' if xmodel else ""
@@ -58,7 +72,7 @@ def render_text_input(form_field, disabled=False, locked=False, rows=None, type=
         {{{{ form_field.errors }}}}
     </div>
     """
-    return _render_field(TEXT_INPUT_TEMPLATE, form_field)
+    return template.Template(TEXT_INPUT_TEMPLATE)
 
 
 # ZZZ: Add is-fullwidth to select_class makes most buttons look better (fix any overwide ones with layout)
@@ -72,12 +86,15 @@ def render_select_input(form_field, disabled=False, locked=False, xmodel=None, x
     - xref: Optional, name to use as AlpineJS x-ref
     In addition, it handles widgets that specify multi-selection."""
     disabled = disabled or locked
-    select_class = "select"
     # Handle multi-select widgets (Note: in the case the field is hidden, the form_field is a string,
     # not a field object, so I have to test so I don't fail when I look at .widget_type)
-    if hasattr(form_field, "widget_type") and form_field.widget_type == "selectmultiple":
-        select_class = "select is-multiple"
+    multiple = hasattr(form_field, "widget_type") and form_field.widget_type == "selectmultiple"
+    return _render_compiled(_select_input_template(disabled, locked, multiple, xmodel, xref), form_field)
 
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _select_input_template(disabled, locked, multiple, xmodel, xref):
+    select_class = "select is-multiple" if multiple else "select"
     x_model_attr = f'x-model="{xmodel}"' if xmodel else ""
     x_ref_attr = f'x-ref="{xref}"' if xref else ""
     disabled_attr = 'disabled="disabled"' if disabled else ""
@@ -100,7 +117,7 @@ def render_select_input(form_field, disabled=False, locked=False, xmodel=None, x
             {{{{ form_field.errors }}}}
         </div>
     """
-    return _render_field(SELECT_INPUT_TEMPLATE, form_field)
+    return template.Template(SELECT_INPUT_TEMPLATE)
 
 
 @register.simple_tag
@@ -112,6 +129,11 @@ def render_checkbox_input(form_field, disabled=False, locked=False, xmodel=None,
     - xmodel: Optional, AlpineJS variable to use as x-model
     - xref: Optional, name to use as AlpineJS x-ref"""
     disabled = disabled or locked
+    return _render_compiled(_checkbox_input_template(disabled, locked, xmodel, xref), form_field)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _checkbox_input_template(disabled, locked, xmodel, xref):
     x_model_attr = f'x-model="{xmodel}"' if xmodel else ""
     x_ref_attr = f'x-ref="{xref}"' if xref else ""
     disabled_attr = 'disabled="disabled"' if disabled else ""
@@ -135,8 +157,7 @@ def render_checkbox_input(form_field, disabled=False, locked=False, xmodel=None,
             {{{{ form_field.errors }}}}
         </div>
     """
-
-    return _render_field(CHECKBOX_INPUT_TEMPLATE, form_field)
+    return template.Template(CHECKBOX_INPUT_TEMPLATE)
 
 
 # Version for CheckboxSelectMultiple that takes a model name to bind to x-model, for AlpineJS
@@ -146,6 +167,11 @@ def render_checkboxlist_input(form_field, xmodel=None):
     """Enhanced tag for rendering a list of checkbox widgets. Related to Pegasus-standard render_select_input,
     but renders as a list of checkboxes, and supports additional parameters:
     - xmodel: AlpineJS model variable to use as the array of checked boxes"""
+    return _render_compiled(_checkboxlist_input_template(xmodel), form_field)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _checkboxlist_input_template(xmodel):
     x_model_attr = f'x-model="{xmodel}"' if xmodel else ""
 
     CHECKBOX_SELECT_MULTIPLE_INPUT_TEMPLATE = f"""<div class="field" id="id_{{{{ item.data.name }}}}">
@@ -164,7 +190,17 @@ def render_checkboxlist_input(form_field, xmodel=None):
         {{{{ form_field.errors }}}}
     </div>
     """
-    return _render_field(CHECKBOX_SELECT_MULTIPLE_INPUT_TEMPLATE, form_field)
+    return template.Template(CHECKBOX_SELECT_MULTIPLE_INPUT_TEMPLATE)
+
+
+def _render_compiled(compiled_template, form_field):
+    return compiled_template.render(template.Context({"form_field": form_field}))
+
+
+def clear_template_caches():
+    """Empty the compiled-template caches (used by the benchmark, to measure rendering without them)."""
+    for builder in TEMPLATE_BUILDERS:
+        builder.cache_clear()
 
 
 def _expand_disabled(disabled, form_field_x):
@@ -178,3 +214,11 @@ def _expand_label(locked):
     """Add a lock icon to the label if the locked property is set."""
     icon = '<span class="pg-icon mr-1"><i class="fa fa-xs fa-lock"></i></span>' if locked else ""
     return icon + "{{ form_field.label }}"
+
+
+TEMPLATE_BUILDERS = [
+    _text_input_template,
+    _select_input_template,
+    _checkbox_input_template,
+    _checkboxlist_input_template,
+]